@@ -15,6 +15,7 @@ LOW_LEVEL_JWT_ERROR_CODES = {
 
 class ErrorMessages:
     INVALID_PHONE_NUMBER = 'err_invalid_phone_number'
+    ERR_INVALID_CURSOR = 'err_invalid_cursor'
 
 
 EMAIL_VERIFICATION_FROM_ID = 'MadeBeauty <noreply@madebeauty.com>'
@@ -0,0 +1,97 @@
+import base64
+import binascii
+import datetime
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from dateutil.parser import parse
+from django.db import models
+from rest_framework.exceptions import ValidationError
+
+from core.utils import post_or_get
+from .constants import ErrorMessages
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """
+    Encode position of the last returned item of a keyset-paginated list into
+    an opaque string, which is passed back by the client to get the next page
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps(position, separators=(',', ':')).encode('utf-8')
+    ).decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Decode cursor produced by `encode_cursor`.
+
+    :raises ValidationError: if cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError):
+        position = None
+    if not isinstance(position, dict):
+        raise ValidationError({'cursor': [{'code': ErrorMessages.ERR_INVALID_CURSOR}]})
+    return position
+
+
+def get_page_limit(request, max_limit: int) -> int:
+    """
+    Return page size requested in `limit` parameter, between 1 and `max_limit`;
+    `max_limit` if parameter is missing or malformed
+    """
+    try:
+        limit = int(post_or_get(request, 'limit', max_limit))
+    except ValueError:
+        limit = max_limit
+    return max(min(limit, max_limit), 1)
+
+
+def get_appointments_page(
+        queryset: models.QuerySet, cursor: Optional[Dict], limit: int,
+        descending: bool=False
+) -> Tuple[List[models.Model], Optional[Dict]]:
+    """
+    Return page of appointments ordered by (datetime_start_at, id), which follows
+    position given by the cursor.
+
+    :param cursor: position of the last appointment of the previous page, i.e. dict
+      with `datetime_start_at` and `id`; None for the first page
+    :param descending: whether appointments go from the latest to the earliest
+    :return: tuple of appointments and position of the last of them if there are
+      more appointments to return
+    """
+    if cursor:
+        try:
+            cursor_datetime: datetime.datetime = parse(cursor['datetime_start_at'])
+            cursor_id = int(cursor['id'])
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise ValidationError({'cursor': [{'code': ErrorMessages.ERR_INVALID_CURSOR}]})
+        if descending:
+            queryset = queryset.filter(
+                models.Q(datetime_start_at__lt=cursor_datetime) |
+                models.Q(datetime_start_at=cursor_datetime, id__lt=cursor_id)
+            )
+        else:
+            queryset = queryset.filter(
+                models.Q(datetime_start_at__gt=cursor_datetime) |
+                models.Q(datetime_start_at=cursor_datetime, id__gt=cursor_id)
+            )
+    if descending:
+        queryset = queryset.order_by('-datetime_start_at', '-id')
+    else:
+        queryset = queryset.order_by('datetime_start_at', 'id')
+    # fetch one extra appointment to know if there is next page
+    appointments = list(queryset[:limit + 1])
+    if len(appointments) <= limit:
+        return appointments, None
+    appointments = appointments[:limit]
+    last_appointment = appointments[-1]
+    return appointments, {
+        'datetime_start_at': last_appointment.datetime_start_at.isoformat(),
+        'id': last_appointment.id,
+    }
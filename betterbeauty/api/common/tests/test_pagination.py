@@ -0,0 +1,53 @@
+import datetime
+
+import pytest
+import pytz
+from django_dynamic_fixture import G
+from rest_framework.exceptions import ValidationError
+
+from api.common.pagination import (
+    decode_cursor,
+    encode_cursor,
+    get_appointments_page,
+)
+from appointment.models import Appointment
+from salon.models import Stylist
+
+
+class TestGetAppointmentsPage(object):
+    @pytest.mark.django_db
+    def test_pages(self):
+        stylist = G(Stylist)
+        start = datetime.datetime(2018, 5, 14, 10, 0, tzinfo=pytz.UTC)
+        appointments = [
+            G(Appointment, stylist=stylist,
+              datetime_start_at=start + datetime.timedelta(hours=i // 2))
+            for i in range(5)
+        ]
+        queryset = Appointment.objects.filter(stylist=stylist)
+        ascending = sorted(appointments, key=lambda a: (a.datetime_start_at, a.id))
+
+        for descending, expected in [(False, ascending), (True, ascending[::-1])]:
+            paged_appointments = []
+            cursor = None
+            for page in range(5):
+                page_appointments, next_position = get_appointments_page(
+                    queryset, cursor=cursor, limit=2, descending=descending
+                )
+                paged_appointments += page_appointments
+                if next_position is None:
+                    break
+                # cursor makes round trip through the client
+                cursor = decode_cursor(encode_cursor(next_position))
+            assert(next_position is None)
+            assert(paged_appointments == expected)
+
+    @pytest.mark.django_db
+    def test_invalid_cursor(self):
+        with pytest.raises(ValidationError):
+            get_appointments_page(
+                Appointment.objects.all(), cursor={'datetime_start_at': 'bad', 'id': 1},
+                limit=2
+            )
+        with pytest.raises(ValidationError):
+            decode_cursor('bad')
@@ -4,11 +4,13 @@ from django.conf import settings
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.urls import reverse
-from django.utils.http import urlencode
+from django.utils.http import parse_etags, quote_etag, urlencode
+from rest_framework import status
+from rest_framework.response import Response
 
 from api.common.constants import EMAIL_VERIFICATION_FROM_ID
 from client.models import Client
@@ -38,7 +40,9 @@ def save_profile_photo(
     image_file_record.file.close()
 
 
-def send_email_verification(object: Union[Client, Stylist], role: str, request=None):
+def get_email_verification_message(
+        object: Union[Client, Stylist], role: str, request=None
+) -> EmailMessage:
 
     subject = '{0} MadeBeauty – Email Verification'.format(object.get_full_name())
 
@@ -61,13 +65,11 @@ def send_email_verification(object: Union[Client, Stylist], role: str, request=N
 
     from_email = EMAIL_VERIFICATION_FROM_ID
     recipient_list = [object.email, ]
-    send_mail(
-        subject,
-        message_body,
-        from_email,
-        recipient_list,
-        fail_silently=False,
-    )
+    return EmailMessage(subject, message_body, from_email, recipient_list)
+
+
+def send_email_verification(object: Union[Client, Stylist], role: str, request=None):
+    get_email_verification_message(object, role, request).send(fail_silently=False)
 
 
 class EmailVerificaitonTokenGenerator(PasswordResetTokenGenerator):
@@ -94,3 +96,18 @@ class EmailVerificaitonTokenGenerator(PasswordResetTokenGenerator):
 
 
 email_verification_token = EmailVerificaitonTokenGenerator()
+
+
+def get_etag_response(request, etag: str, data) -> Response:
+    """
+    Return 304 Not Modified if request's If-None-Match contains the etag,
+    otherwise response with the data; both carry the ETag header
+    """
+    quoted_etag = quote_etag(etag)
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', None)
+    if if_none_match:
+        # weak comparison, as If-None-Match requires
+        request_etags = [tag.replace('W/', '', 1) for tag in parse_etags(if_none_match)]
+        if '*' in request_etags or quoted_etag in request_etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': quoted_etag})
+    return Response(data, headers={'ETag': quoted_etag})
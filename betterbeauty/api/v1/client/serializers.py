@@ -40,25 +40,25 @@ from client.types import CLIENT_PRIVACY_CHOICES, ClientPrivacy
 from core.models import User
 from core.types import AppointmentPrices, UserRole
 from core.utils import calculate_appointment_prices
-from integrations.slack import (
-    send_slack_auto_booking_notification,
-    send_slack_client_profile_update,
-)
+from integrations.outbox import enqueue_outbox_job
+from integrations.slack import send_slack_client_profile_update
+from integrations.types import OutboxJobType
 from notifications.utils import (
     cancel_new_appointment_notification,
     generate_appointment_reschedule_notification,
     generate_client_cancelled_appointment_notification,
-    generate_new_appointment_notification,
 )
 from pricing import CalculatedPrice, DiscountType
 from salon.models import (
     Invitation,
-    ServiceCategory,
     Stylist,
     StylistService,
 )
 from salon.types import InvitationStatus
-from salon.utils import calculate_price_and_discount_for_client_on_date
+from salon.utils import (
+    calculate_price_and_discount_for_client_on_date,
+    get_stylist_services_grouped_by_category,
+)
 
 
 class ClientProfileSerializer(FormattedErrorMessageMixin, serializers.ModelSerializer):
@@ -322,12 +322,10 @@ class StylistServiceListSerializer(FormattedErrorMessageMixin, serializers.Model
         model = Stylist
 
     def get_categories(self, stylist: Stylist):
-        category_queryset = ServiceCategory.objects.all().order_by(
-            '-weight', 'name', 'uuid'
-        ).distinct('weight', 'name', 'uuid')
+        categories, services_by_category = get_stylist_services_grouped_by_category(stylist)
         return StylistServiceCategoryDetailsSerializer(
-            category_queryset,
-            context={'stylist': stylist},
+            categories,
+            context={'stylist': stylist, 'services_by_category': services_by_category},
             many=True
         ).data
 
@@ -612,8 +610,14 @@ class AppointmentSerializer(FormattedErrorMessageMixin,
                 setattr(appointment, k, v)
             appointment.save()
             appointment.append_status_history(updated_by=stylist.user)
-        generate_new_appointment_notification(appointment)
-        send_slack_auto_booking_notification(appointment)
+            # notifications and external integrations are run by outbox worker
+            # after the booking is committed
+            for job_type in [
+                OutboxJobType.NEW_APPOINTMENT_NOTIFICATION,
+                OutboxJobType.SLACK_AUTO_BOOKING,
+                OutboxJobType.GOOGLE_CALENDAR_SYNC,
+            ]:
+                enqueue_outbox_job(job_type, {'appointment_id': appointment.id})
         return appointment
 
 
@@ -725,12 +729,10 @@ class AppointmentUpdateSerializer(AppointmentPaymentValidationMixin, Appointment
             appointment.save(**kwargs)
             if is_appointment_reschedule:
                 # appointment is rescheduled, so if it was added to Google calendars
-                # we need to re-create it. We will delete the source event if it was
-                # added, and periodic script will re-create it with new date and time
-                if appointment.client_google_calendar_id:
-                    appointment.cancel_client_google_calendar_event()
-                if appointment.stylist_google_calendar_id:
-                    appointment.cancel_stylist_google_calendar_event(ignore_status=True)
+                # we need to re-create it; outbox worker will do it after commit
+                enqueue_outbox_job(OutboxJobType.GOOGLE_CALENDAR_SYNC, {
+                    'appointment_id': appointment.id, 'reschedule': True
+                })
             # If status is changing try to cancel new appointment notification if it's not
             # sent yet
             if (
@@ -821,6 +823,7 @@ class HomeSerializer(serializers.Serializer):
 
 class HistorySerializer(serializers.Serializer):
     appointments = AppointmentSerializer(many=True)
+    next_cursor = serializers.CharField(allow_null=True, read_only=True)
 
 
 class AppointmentPreviewRequestSerializer(
@@ -910,26 +913,14 @@ class AppointmentPreviewResponseSerializer(serializers.Serializer):
 class FollowerSerializer(serializers.ModelSerializer):
     first_name = serializers.CharField(source='user.first_name')
     last_name = serializers.CharField(source='user.last_name')
-    booking_count = serializers.SerializerMethodField()
+    # annotated by annotate_clients_with_booking_count
+    booking_count = serializers.IntegerField(read_only=True)
     photo_url = serializers.CharField(source='get_profile_photo_url', allow_null=True)
 
     class Meta:
         model = Client
         fields = ['uuid', 'first_name', 'last_name', 'booking_count', 'photo_url', ]
 
-    def get_booking_count(self, client: Client):
-        stylist: Stylist = self.context['stylist']
-        return Appointment.objects.filter(
-            stylist=stylist,
-            client=client,
-        ).exclude(
-            status__in=[
-                AppointmentStatus.NO_SHOW,
-                AppointmentStatus.CANCELLED_BY_CLIENT,
-                AppointmentStatus.CANCELLED_BY_STYLIST
-            ]
-        ).count()
-
 
 class SearchStylistSerializer(
     FormattedErrorMessageMixin,
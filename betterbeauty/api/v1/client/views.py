@@ -4,9 +4,10 @@ from typing import List, Optional
 
 from dateutil.parser import parse
 
+from django.conf import settings
 from django.contrib.gis.geos import Point
 from django.db import models, transaction
-from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models import Case, IntegerField, Value, When
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from ipware import get_client_ip
@@ -21,6 +22,12 @@ from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
 from stripe.error import CardError, StripeError, StripeErrorWithParamCode
 
+from api.common.pagination import (
+    decode_cursor,
+    encode_cursor,
+    get_appointments_page,
+    get_page_limit,
+)
 from api.common.permissions import ClientPermission
 
 from api.v1.client.constants import (ErrorMessages as client_errors,
@@ -52,17 +59,21 @@ from appointment.constants import ErrorMessages as appt_constants
 from appointment.models import Appointment
 from appointment.preview import AppointmentPreviewRequest, build_appointment_preview_dict
 from appointment.types import AppointmentStatus
+from appointment.utils import select_appointment_list_related
 from billing.constants import ErrorMessages as billing_errors
 from billing.utils import create_new_payment_method
-from client.models import Client, PreferredStylist, StylistSearchRequest
+from client.models import Client, PreferredStylist
+from client.search_log import log_search_request
 from client.types import ClientPrivacy
 from core.types import UserRole
 from core.utils import post_or_get
 from core.utils import post_or_get_or_data
-from integrations.ipstack import get_lat_lng_for_ip_address
+from integrations.geoip import get_lat_lng_for_ip_address
 from salon.models import Invitation, Stylist, StylistService
+from salon.search import build_search_cache_key, cache_stylist_ids, get_cached_stylist_ids
 from salon.types import ClientPriceOnDate, ClientPricingHint, InvitationStatus
 from salon.utils import (
+    annotate_clients_with_booking_count,
     generate_client_prices_for_stylist_services,
     generate_client_pricing_hints,
     get_default_service_uuids,
@@ -199,7 +210,7 @@ class SearchStylistView(generics.ListAPIView):
     def save_search_request(self, location, stylists):
         ip, is_routable = get_client_ip(self.request)
         stylists_found = list(map(lambda s: s.id, stylists))
-        StylistSearchRequest.objects.create(
+        log_search_request(
             requested_by=self.request.user,
             user_ip_addr=ip,
             user_location=location,
@@ -218,11 +229,140 @@ class SearchStylistView(generics.ListAPIView):
             location = get_lat_lng_for_ip_address(ip)
         country: Optional[str] = self.request.user.client.country or 'US'
         client_id: int = self.request.user.client.id
-        stylists = SearchStylistView._search_stylists(query, address_query, location,
-                                                      country, client_id)
+        stylists = SearchStylistView._search_stylists_cached(query, address_query, location,
+                                                             country, client_id)
         self.save_search_request(location=location, stylists=stylists)
         return stylists
 
+    @staticmethod
+    def _search_stylists_cached(query: str, address_query: str, location: Point,
+                                country: str, client_id: int) -> List[Stylist]:
+        """
+        Return search results, using ranked stylist ids cached for the location's
+        geohash cell, normalized query terms and country. On a cache hit, only
+        the stylists found previously are loaded, and the client's preference_uuid
+        is applied on top of them.
+        """
+        if not settings.STYLIST_SEARCH_CACHE_ENABLED:
+            return list(SearchStylistView._search_stylists(
+                query, address_query, location, country, client_id))
+        cache_key = build_search_cache_key(query, address_query, location, country)
+        stylist_ids: Optional[List[int]] = get_cached_stylist_ids(cache_key)
+        if stylist_ids is None:
+            stylists = list(SearchStylistView._search_stylists(
+                query, address_query, location, country, client_id))
+            cache_stylist_ids(cache_key, [stylist.id for stylist in stylists])
+            return stylists
+        return SearchStylistView._get_stylists_by_ids(stylist_ids, client_id)
+
+    @staticmethod
+    def _get_stylists_by_ids(stylist_ids: List[int], client_id: int) -> List[Stylist]:
+        """
+        Load stylists with the same fields as _search_stylists returns, preserving
+        the order of given ids. Unlike search, aggregates are only computed for
+        the given stylists.
+        """
+        if not stylist_ids:
+            return []
+        stylists = Stylist.objects.raw(
+            '''
+            SELECT
+                st.id as id,
+                st.uuid as uuid,
+                st.website_url,
+                st.instagram_url,
+                st.has_business_hours_set,
+                first_name as user__first_name,
+                last_name as user__last_name,
+                "user".photo as user__photo,
+                "user".phone as user__phone,
+                "salon"."public_phone" as "salon__public_phone",
+                salon.name AS salon__name,
+                salon.address AS salon__address,
+                salon.city AS salon__city,
+                salon.state AS salon__state,
+                salon.zip_code AS salon__zip_code,
+                sp.text AS sp_text,
+                services_count,
+                followers_count,
+                cast((average_rating*100) as int) as rating_percentage
+            FROM
+                stylist as st
+            JOIN "user" on
+                "user".id = st.user_id
+            JOIN salon on
+                salon.id = st.salon_id
+            LEFT JOIN (
+                SELECT
+                    se.stylist_id,
+                    COUNT(se."id") AS services_count
+                FROM
+                    stylist_service as se
+                WHERE
+                    se.stylist_id = ANY(%(stylist_ids)s) AND
+                    se.deleted_at ISNULL AND
+                    se.is_enabled IS TRUE
+                GROUP BY
+                    se.stylist_id ) se ON
+                st.id = se.stylist_id
+            LEFT JOIN (
+                    SELECT
+                        COUNT(ps.id) AS followers_count,
+                        ps.stylist_id
+                    FROM
+                        preferred_stylist as ps
+                    LEFT JOIN client cli on ps.client_id = cli.id
+                    WHERE
+                        ps.stylist_id = ANY(%(stylist_ids)s) AND
+                        cli.privacy = 'public' AND
+                        ps.deleted_at IS NULL
+                    GROUP BY
+                        ps.stylist_id
+                    ) ps ON
+                    st.id = ps.stylist_id
+            LEFT JOIN (
+                SELECT
+                    sp.stylist_id,
+                    string_agg(speciality."name", ',') AS text
+                FROM
+                    stylist_specialities AS sp
+                JOIN speciality ON
+                    speciality.id = sp.speciality_id
+                WHERE
+                    sp.stylist_id = ANY(%(stylist_ids)s)
+                GROUP BY
+                    sp.stylist_id ) sp ON
+                st.id = sp.stylist_id
+            LEFT JOIN (
+                SELECT
+                    AVG(apnt.rating) as average_rating,
+                    apnt.stylist_id
+                FROM
+                    appointment as apnt
+                WHERE
+                    apnt.stylist_id = ANY(%(stylist_ids)s) AND
+                    apnt.rating IS NOT NULL
+                GROUP BY
+                    apnt.stylist_id) AS apnt ON
+                st.id=apnt.stylist_id
+            WHERE
+                st.id = ANY(%(stylist_ids)s) AND
+                st.deactivated_at ISNULL
+            ''', {'stylist_ids': stylist_ids}
+        )
+        stylists_by_id = {stylist.id: stylist for stylist in stylists}
+        preference_uuids = dict(PreferredStylist.objects.filter(
+            client_id=client_id, stylist_id__in=stylist_ids
+        ).values_list('stylist_id', 'uuid'))
+        ordered_stylists: List[Stylist] = []
+        for stylist_id in stylist_ids:
+            stylist = stylists_by_id.get(stylist_id, None)
+            if stylist is None:
+                continue
+            stylist.preference_uuid = preference_uuids.get(stylist_id, None)
+            ordered_stylists.append(stylist)
+        return ordered_stylists
+
     @staticmethod
     def _search_stylists(query: str, address_query: str, location: Point, country: str,
                          client_id: int) -> models.query.RawQuerySet:
@@ -549,16 +689,27 @@ class HistoryView(generics.ListAPIView):
     serializer_class = HistorySerializer
 
     def get(self, request, *args, **kwargs):
+        """
+        Return page of past appointments, newest first. Next page is requested by
+        passing `next_cursor` value of the previous response as `cursor` parameter;
+        last page has null `next_cursor`.
+        """
         client = self.request.user.client
-        historical_appointments = list(self.get_historical_appointments(client))
+        limit = get_page_limit(request, MAX_APPOINTMENTS_PER_REQUEST)
+        cursor = decode_cursor(post_or_get(request, 'cursor', None))
+        historical_appointments, next_position = get_appointments_page(
+            self.get_historical_appointments(client),
+            cursor=cursor, limit=limit, descending=True
+        )
         serializer = self.get_serializer({
             'appointments': historical_appointments,
+            'next_cursor': encode_cursor(next_position) if next_position else None,
         })
         return Response(serializer.data)
 
     @staticmethod
     def get_historical_appointments(client) -> models.QuerySet:
-        return client.get_past_appointments()
+        return select_appointment_list_related(client.get_past_appointments())
 
 
 class StylistFollowersView(views.APIView):
@@ -582,23 +733,17 @@ class StylistFollowersView(views.APIView):
         """
         Ordering
         ========
-        We are ordering clients by profile_completeness and then by distance
-
-        Profile completeness ranking is calculated in the following order
+        We are ordering clients by stored name_and_photo_completeness rank
+        (see Client.get_name_and_photo_completeness), i.e. in the following order
          1. Has first name, has photo
          2. Has first name, no photo
          3. No first name, has photo
          4. No first name, No photo
         """
-        followers = stylist.get_preferred_clients().filter(
-            privacy=ClientPrivacy.PUBLIC
-        ).annotate(name_and_photo_completeness=Case(
-            When((Q(user__first_name='', user__photo='')), then=Value(4)),
-            When((Q(user__first_name='') & ~Q(user__photo='')), then=Value(3)),
-            When(Q(user__first_name__isnull=False, user__photo=''), then=Value(2)),
-            When(Q(user__first_name__isnull=False) & ~Q(user__photo=''), then=Value(1)),
-            output_field=IntegerField(),
-        )).order_by('name_and_photo_completeness')
+        followers = annotate_clients_with_booking_count(
+            stylist.get_preferred_clients().filter(privacy=ClientPrivacy.PUBLIC),
+            stylist=stylist
+        ).select_related('user').order_by('name_and_photo_completeness', 'id')
 
         return Response({
             'followers': FollowerSerializer(
@@ -1,8 +1,20 @@
 import logging
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from django.db import IntegrityError
+from django.db.models import (
+    Avg,
+    Count,
+    Exists,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    UUIDField,
+    Value,
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from oauth2client.client import Error as OauthError
 from rest_framework import generics, parsers, permissions, status, views
@@ -15,7 +27,10 @@ from api.common.permissions import ClientOrStylistPermission
 from api.v1.stylist.serializers import AppointmentRatingSerializer, StylistProfileDetailsSerializer
 from appointment.models import Appointment
 from billing.constants import ErrorMessages as billing_errors
+from client.models import Client, PreferredStylist
+from client.types import ClientPrivacy
 from core.models import User
+from core.types import UserRole
 from core.utils import post_or_get_or_data
 from integrations.google.types import IntegrationErrors, IntegrationType
 from integrations.google.utils import add_google_calendar_integration_for_user
@@ -24,7 +39,7 @@ from integrations.push.types import PushRegistrationIdType
 from integrations.push.utils import register_device, unregister_device
 from notifications.models import Notification
 from notifications.types import NotificationChannel
-from salon.models import Stylist
+from salon.models import Stylist, StylistService, StylistWeekdayDiscount
 from salon.utils import create_stripe_account_for_stylist
 
 from .serializers import (
@@ -178,27 +193,59 @@ class CommonStylistDetailView(views.APIView):
     def get(self, request, *args, **kwargs):
         stylist_uuid = kwargs['stylist_uuid']
         request_role: str = post_or_get_or_data(self.request, 'role', '')
-        serializer = StylistProfileDetailsSerializer(self.get_object(stylist_uuid),
+        context = self.get_serializer_context(request_role)
+        stylist = self.get_object(stylist_uuid, client=(
+            context['client'] if request_role == UserRole.CLIENT else None
+        ))
+        context['stylist'] = stylist
+        serializer = StylistProfileDetailsSerializer(stylist,
                                                      many=False,
-                                                     context=self.get_serializer_context(
-                                                         stylist_uuid, request_role))
+                                                     context=context)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
-    def get_object(self, stylist_uuid) -> Stylist:
-        stylist: Stylist = Stylist.objects.get(uuid=stylist_uuid)
+    def get_object(self, stylist_uuid, client: Optional[Client]=None) -> Stylist:
+        """
+        Select stylist together with everything the profile is made of: counters,
+        rating and client's preference are annotated, so the whole profile takes
+        one query plus one for prefetched weekday availability
+        """
+        public_followers_count = PreferredStylist.objects.filter(
+            stylist=OuterRef('pk'), deleted_at__isnull=True, client__privacy=ClientPrivacy.PUBLIC
+        ).order_by().values('stylist').annotate(count=Count('id')).values('count')
+        avg_rating = Appointment.objects.filter(
+            stylist=OuterRef('pk'), rating__isnull=False
+        ).order_by().values('stylist').annotate(avg=Avg('rating')).values('avg')
+        if client:
+            preference_uuid = Subquery(PreferredStylist.objects.filter(
+                client=client, stylist=OuterRef('pk'), deleted_at=None
+            ).order_by('-id').values('uuid')[:1])
+        else:
+            preference_uuid = Value(None, output_field=UUIDField())
+        stylist: Stylist = Stylist.objects.select_related(
+            'user', 'salon'
+        ).prefetch_related('available_days').annotate(
+            public_followers_count=Coalesce(
+                Subquery(public_followers_count, output_field=IntegerField()), 0
+            ),
+            avg_rating=Subquery(avg_rating, output_field=FloatField()),
+            preference_uuid=preference_uuid,
+            has_enabled_services=Exists(StylistService.objects.filter(
+                stylist=OuterRef('pk'), is_enabled=True, deleted_at__isnull=True
+            )),
+            has_deal_of_week_discount=Exists(StylistWeekdayDiscount.objects.filter(
+                stylist=OuterRef('pk'), is_deal_of_week=True
+            )),
+        ).get(uuid=stylist_uuid)
         return stylist
 
-    def get_serializer_context(self, stylist_uuid, request_role):
-        stylist = None
+    def get_serializer_context(self, request_role):
         client = None
-        if stylist_uuid:
-            stylist = Stylist.objects.get(uuid=stylist_uuid)
         user = self.request.user
         if user.is_client():
             client = user.client
         return {
             'user': self.request.user,
-            'stylist': stylist,
+            'stylist': None,
             'client': client,
             'request_role': request_role
         }
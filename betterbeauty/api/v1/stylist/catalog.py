@@ -0,0 +1,130 @@
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+
+from salon.models import ServiceCategory, ServiceTemplate, ServiceTemplateSet
+from salon.service_templates import get_service_template_catalog_version
+from .serializers import (
+    ServiceTemplateCategoryDetailsSerializer,
+    ServiceTemplateSetListSerializer,
+)
+
+
+class ServiceTemplateCatalog(NamedTuple):
+    version: int
+    built_at: float
+    # hash of catalog rows; same rows give same etag in every process
+    etag: str
+    template_sets: List[Dict]
+    # template set details by set uuid, without stylist-specific fields
+    template_set_details: Dict[str, Dict]
+
+
+_catalog: Optional[ServiceTemplateCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_service_template_catalog_etag(
+        template_sets: List[ServiceTemplateSet], categories: List[ServiceCategory],
+        templates: List[ServiceTemplate]
+) -> str:
+    """
+    Hash catalog rows rather than serialized catalog, since the latter contains
+    image URLs which are pre-signed anew on every build in staging and production
+    """
+    rows = [
+        [
+            (s.id, str(s.uuid), s.name, s.description, s.sort_weight,
+             s.image.name if s.image else None)
+            for s in sorted(template_sets, key=lambda s: s.id)
+        ],
+        [
+            (c.id, str(c.uuid), c.name, c.category_code, c.weight)
+            for c in sorted(categories, key=lambda c: c.id)
+        ],
+        [
+            (t.id, str(t.uuid), t.templateset_id, t.category_id, t.name, t.description,
+             t.regular_price, t.duration, t.is_addon)
+            for t in sorted(templates, key=lambda t: t.id)
+        ],
+    ]
+    content = json.dumps(rows, cls=DjangoJSONEncoder)
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def build_service_template_catalog(version: int) -> ServiceTemplateCatalog:
+    """
+    Serialize all service template sets in 3 queries: sets with template counts,
+    categories and templates
+    """
+    template_sets = list(ServiceTemplateSet.objects.annotate(
+        services_count=Count('templates')
+    ).order_by('sort_weight', 'id'))
+    categories = list(ServiceCategory.objects.all().order_by(
+        '-weight', 'name', 'uuid'
+    ).distinct('weight', 'name', 'uuid'))
+    templates = list(ServiceTemplate.objects.order_by('-regular_price', 'id'))
+    templates_by_set_and_category: Dict[int, Dict[int, List[ServiceTemplate]]] = defaultdict(
+        lambda: defaultdict(list))
+    for template in templates:
+        templates_by_set_and_category[template.templateset_id][template.category_id].append(
+            template)
+
+    template_set_details: Dict[str, Dict] = {}
+    for template_set in template_sets:
+        template_set_details[str(template_set.uuid)] = {
+            'uuid': str(template_set.uuid),
+            'name': template_set.name,
+            'description': template_set.description,
+            'categories': ServiceTemplateCategoryDetailsSerializer(
+                categories, many=True, context={
+                    'templates_by_category': templates_by_set_and_category[template_set.id]
+                }
+            ).data,
+            'image_url': template_set.get_image_url(),
+        }
+    return ServiceTemplateCatalog(
+        version=version,
+        built_at=time.monotonic(),
+        etag=get_service_template_catalog_etag(template_sets, categories, templates),
+        template_sets=ServiceTemplateSetListSerializer(template_sets, many=True).data,
+        template_set_details=template_set_details,
+    )
+
+
+def get_service_template_catalog() -> ServiceTemplateCatalog:
+    """
+    Return in-process catalog snapshot, rebuilding it if catalog version changed
+    since it was built or if it is older than SERVICE_TEMPLATE_CATALOG_MAX_AGE_SECONDS
+    (which covers changes that bypass model save, e.g. queryset updates)
+    """
+    global _catalog
+    version = get_service_template_catalog_version()
+    catalog = _catalog
+    if catalog is not None and catalog.version == version and (
+            time.monotonic() - catalog.built_at <
+            settings.SERVICE_TEMPLATE_CATALOG_MAX_AGE_SECONDS
+    ):
+        return catalog
+    with _catalog_lock:
+        # another thread might have rebuilt it while we were waiting
+        catalog = _catalog
+        if catalog is None or catalog.version != version or (
+                time.monotonic() - catalog.built_at >=
+                settings.SERVICE_TEMPLATE_CATALOG_MAX_AGE_SECONDS
+        ):
+            catalog = build_service_template_catalog(version)
+            _catalog = catalog
+    return catalog
+
+
+def clear_service_template_catalog():
+    global _catalog
+    _catalog = None
@@ -2,10 +2,16 @@ MAX_SERVICE_TEMPLATE_PREVIEW_COUNT = 50
 
 MAX_APPOINTMENTS_PER_REQUEST = 100
 
+MAX_APPOINTMENT_CHANGES_PER_REQUEST = 500
+
 MIN_VALID_ADDR_LEN = 10
 
 NEARBY_CLIENTS_ACCURACY = 1600000
 
+NEARBY_CLIENTS_LIMIT = 1000
+
+CLIENT_LIST_LIMIT = 1000
+
 
 class ErrorMessages:
     ERR_UNIQUE_STYLIST_PHONE = 'err_unique_stylist_phone'
@@ -18,3 +24,4 @@ class ErrorMessages:
     ERR_STYLIST_LOCATION_UNAVAILABLE = 'err_stylist_location_unavailable'
     ERR_STYLIST_SPECIAL_DATE_NOT_FOUND = 'err_stylist_special_availability_date_not_found'
     ERR_INVALID_DATE_RANGE = 'err_invalid_date_range'
+    ERR_INVALID_CHANGE_TOKEN = 'err_invalid_change_token'
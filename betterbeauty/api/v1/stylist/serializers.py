@@ -23,6 +23,7 @@ from appointment.constants import (
 )
 from appointment.models import Appointment, AppointmentService
 from appointment.types import AppointmentStatus
+from appointment.utils import select_appointment_list_related
 from billing.constants import ErrorMessages as billing_errors
 from client.models import Client, PreferredStylist
 from client.types import ClientPrivacy
@@ -32,7 +33,9 @@ from core.types import AppointmentPrices, UserRole, Weekday
 from core.utils import (
     calculate_appointment_prices,
 )
+from integrations.outbox import enqueue_outbox_job
 from integrations.slack import send_slack_stylist_profile_update
+from integrations.types import OutboxJobType
 from notifications.utils import generate_stylist_cancelled_appointment_notification
 from salon.models import (
     Invitation,
@@ -53,6 +56,7 @@ from salon.utils import (
     create_stylist_profile_for_user,
     generate_prices_for_stylist_service,
     get_last_appointment_for_client,
+    get_stylist_services_grouped_by_category,
 )
 from .constants import ErrorMessages, MAX_SERVICE_TEMPLATE_PREVIEW_COUNT, MIN_VALID_ADDR_LEN
 from .fields import DurationMinuteField
@@ -415,6 +419,10 @@ class ServiceTemplateSetListSerializer(serializers.ModelSerializer):
         return ServiceTemplateSerializer(templates, many=True).data
 
     def get_services_count(self, template_set: ServiceTemplateSet):
+        # use count annotated by the caller, if any
+        services_count = getattr(template_set, 'services_count', None)
+        if services_count is not None:
+            return services_count
         return template_set.templates.count()
 
 
@@ -427,6 +435,12 @@ class ServiceTemplateCategoryDetailsSerializer(serializers.ModelSerializer):
         fields = ['name', 'uuid', 'services', 'category_code']
 
     def get_services(self, service_category: ServiceCategory):
+        # templates may be preloaded by the caller, grouped by category id
+        templates_by_category = self.context.get('templates_by_category', None)
+        if templates_by_category is not None:
+            return ServiceTemplateDetailsSerializer(
+                templates_by_category.get(service_category.id, []), many=True
+            ).data
         templates = service_category.templates.order_by('-regular_price')
         if 'service_template_set' in self.context:
             templates = templates.filter(templateset=self.context['service_template_set'])
@@ -442,8 +456,14 @@ class StylistServiceCategoryDetailsSerializer(serializers.ModelSerializer):
         fields = ['name', 'uuid', 'services', 'category_code', 'weight']
 
     def get_services(self, service_category: ServiceCategory):
-        stylist: Stylist = self.context['stylist']
-        services = stylist.services.filter(category=service_category).order_by('-regular_price')
+        # services may be preloaded by the caller, grouped by category id
+        services_by_category = self.context.get('services_by_category', None)
+        if services_by_category is not None:
+            services = services_by_category.get(service_category.id, [])
+        else:
+            stylist: Stylist = self.context['stylist']
+            services = stylist.services.filter(
+                category=service_category).order_by('-regular_price')
         return StylistServiceSerializer(services, many=True).data
 
 
@@ -489,12 +509,10 @@ class StylistServiceListSerializer(
         model = Stylist
 
     def get_categories(self, stylist: Stylist):
-        category_queryset = ServiceCategory.objects.all().order_by(
-            '-weight', 'name', 'uuid'
-        ).distinct('weight', 'name', 'uuid')
+        categories, services_by_category = get_stylist_services_grouped_by_category(stylist)
         return StylistServiceCategoryDetailsSerializer(
-            category_queryset,
-            context={'stylist': stylist},
+            categories,
+            context={'stylist': stylist, 'services_by_category': services_by_category},
             many=True
         ).data
 
@@ -1003,6 +1021,9 @@ class AppointmentSerializer(
                 setattr(appointment, k, v)
             appointment.save()
             appointment.append_status_history(updated_by=stylist.user)
+            enqueue_outbox_job(
+                OutboxJobType.GOOGLE_CALENDAR_SYNC, {'appointment_id': appointment.id}
+            )
 
         return appointment
 
@@ -1266,12 +1287,10 @@ class AppointmentUpdateSerializer(
             appointment.save(**kwargs)
             if is_appointment_reschedule:
                 # appointment is rescheduled, so if it was added to Google calendars
-                # we need to re-create it. We will delete the source event if it was
-                # added, and periodic script will re-create it with new date and time
-                if appointment.client_google_calendar_id:
-                    appointment.cancel_client_google_calendar_event()
-                if appointment.stylist_google_calendar_id:
-                    appointment.cancel_stylist_google_calendar_event(ignore_status=True)
+                # we need to re-create it; outbox worker will do it after commit
+                enqueue_outbox_job(OutboxJobType.GOOGLE_CALENDAR_SYNC, {
+                    'appointment_id': appointment.id, 'reschedule': True
+                })
         return appointment
 
     def save(self, **kwargs):
@@ -1380,12 +1399,13 @@ class StylistHomeSerializer(serializers.ModelSerializer):
     upcoming_visits_count = serializers.SerializerMethodField()
     followers = serializers.SerializerMethodField()
     today_slots = serializers.SerializerMethodField()
+    next_cursor = serializers.SerializerMethodField()
 
     class Meta:
         model = Stylist
         fields = [
             'appointments', 'today_visits_count', 'upcoming_visits_count',
-            'followers', 'today_slots'
+            'followers', 'today_slots', 'next_cursor',
         ]
 
     def validate(self, attrs):
@@ -1410,12 +1430,22 @@ class StylistHomeSerializer(serializers.ModelSerializer):
     def get_followers(self, stylist: Stylist) -> Optional[int]:
         return stylist.get_preferred_clients().count()
 
+    def get_next_cursor(self, stylist: Stylist) -> Optional[str]:
+        """Cursor of the next page of past visits, if there is one"""
+        return self.context.get('next_cursor', None)
+
     def get_appointments(self, stylist: Stylist):
         query = self.context['query']
+        # page of past visits may be already selected by the view
+        appointments = self.context.get('appointments', None)
+        if appointments is not None:
+            return AppointmentSerializer(
+                appointments, many=True
+            ).data
         if query == "upcoming":
             appointments = stylist.get_upcoming_visits()
         if query == "past":
-            appointments = stylist.get_past_visits().order_by('-datetime_start_at')
+            appointments = stylist.get_past_visits().order_by('-datetime_start_at', '-id')
         if query == "today":
             appointments = stylist.get_today_appointments(
                 upcoming_only=False,
@@ -1425,7 +1455,7 @@ class StylistHomeSerializer(serializers.ModelSerializer):
                     AppointmentStatus.CHECKED_OUT
                 ]
             )
-        appointments = appointments.prefetch_related('services').select_related('client__user')
+        appointments = select_appointment_list_related(appointments)
         return AppointmentSerializer(
             appointments, many=True
         ).data
@@ -1530,20 +1560,26 @@ class ClientDetailsSerializer(ClientSerializer):
             'email', 'last_visit_datetime', 'last_services_names',
         ]
 
-    def get_last_visit_datetime(self, client):
+    def _get_last_appointment(self, client: Client) -> Optional[Appointment]:
+        # prefetched by annotate_clients_with_last_visit
+        if hasattr(client, 'last_appointments'):
+            return client.last_appointments[0] if client.last_appointments else None
         stylist: Stylist = self.context['stylist']
-        last_appointment: Optional[Appointment] = get_last_appointment_for_client(
-            stylist=stylist, client=client
-        )
-        if not last_appointment:
+        return get_last_appointment_for_client(stylist=stylist, client=client)
+
+    def get_last_visit_datetime(self, client):
+        if hasattr(client, 'last_visit_datetime'):
+            last_visit_datetime: Optional[datetime.datetime] = client.last_visit_datetime
+        else:
+            last_appointment: Optional[Appointment] = self._get_last_appointment(client)
+            last_visit_datetime = last_appointment.datetime_start_at if (
+                last_appointment) else None
+        if not last_visit_datetime:
             return None
-        return last_appointment.datetime_start_at.isoformat()
+        return last_visit_datetime.isoformat()
 
     def get_last_services_names(self, client):
-        stylist: Stylist = self.context['stylist']
-        last_appointment: Optional[Appointment] = get_last_appointment_for_client(
-            stylist=stylist, client=client
-        )
+        last_appointment: Optional[Appointment] = self._get_last_appointment(client)
         if not last_appointment:
             return []
         return [service.service_name for service in last_appointment.services.all()]
@@ -1810,15 +1846,12 @@ class StylistProfileDetailsSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_preferred(self, stylist: Stylist) -> bool:
-        role = self.context['request_role']
-        user = self.context['user']
-        if role == UserRole.CLIENT and user.client:
-            return PreferredStylist.objects.filter(client=user.client,
-                                                   stylist=stylist,
-                                                   deleted_at=None).exists()
-        return False
+        return self.get_preference_uuid(stylist) is not None
 
     def get_preference_uuid(self, stylist: Stylist) -> Optional[str]:
+        # may be annotated, see api.v1.common.views.CommonStylistDetailView
+        if hasattr(stylist, 'preference_uuid'):
+            return str(stylist.preference_uuid) if stylist.preference_uuid else None
         role = self.context['request_role']
         user = self.context['user']
         if role == UserRole.CLIENT and user.client:
@@ -1830,9 +1863,15 @@ class StylistProfileDetailsSerializer(serializers.ModelSerializer):
         return None
 
     def get_working_hours(self, stylist: Stylist) -> dict:
-        return StylistAvailableWeekDayListSerializer(stylist).data
+        return {
+            'weekdays': StylistAvailableWeekDaySerializer(
+                stylist.get_weekday_availability_with_defaults(), many=True
+            ).data
+        }
 
     def get_followers_count(self, stylist: Stylist) -> Optional[int]:
+        if hasattr(stylist, 'public_followers_count'):
+            return stylist.public_followers_count
         return stylist.get_preferred_clients().filter(
             privacy=ClientPrivacy.PUBLIC
         ).count()
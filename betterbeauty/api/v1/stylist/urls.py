@@ -10,6 +10,7 @@ from .views import (
     NearbyClientsView,
     ServiceTemplateSetDetailsView,
     ServiceTemplateSetListView,
+    StylistAppointmentChangesView,
     StylistAppointmentListCreateView,
     StylistAppointmentPreviewView,
     StylistAppointmentRetrieveUpdateCancelView,
@@ -32,9 +33,10 @@ app_name = 'stylist'
 urlpatterns = [
     url('^profile$', StylistView.as_view(), name='profile'),
     url('^settings$', StylistSettingsRetrieveView.as_view(), name='settings'),
-    url('^service-template-sets$', ServiceTemplateSetListView.as_view()),
+    url('^service-template-sets$', ServiceTemplateSetListView.as_view(),
+        name='service-template-set-list'),
     url('^service-template-sets/(?P<template_set_uuid>[0-9a-f\-]+)$',
-        ServiceTemplateSetDetailsView.as_view()),
+        ServiceTemplateSetDetailsView.as_view(), name='service-template-set-details'),
     url('^services$', StylistServiceListView.as_view()),
     url('^services/(?P<uuid>[0-9a-f\-]+)$', StylistServiceView.as_view(), name='service'),
     url('^services/pricing$', StylistServicePricingView.as_view(), name='service-pricing'),
@@ -47,6 +49,8 @@ urlpatterns = [
     url('^home$', StylistHomeView.as_view(), name='home'),
     url('^appointments$', StylistAppointmentListCreateView.as_view(), name='appointments'),
     url('^appointments/oneday$', AppointmentsOnADayView.as_view(), name='one-day-appointments'),
+    url('^appointments/changes$', StylistAppointmentChangesView.as_view(),
+        name='appointment-changes'),
     url('^appointments/dates-with-appointments$',
         DatesWithAppointmentsView.as_view(), name='dates-with-appointments'),
     url('^appointments/preview$', StylistAppointmentPreviewView.as_view(),
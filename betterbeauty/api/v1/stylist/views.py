@@ -1,47 +1,66 @@
 import datetime
+import hashlib
 import uuid
 from decimal import Decimal
-from typing import Any, Dict, List, NamedTuple, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 from annoying.functions import get_object_or_None
 from dateutil.parser import parse
-from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import D
 
 from django.db import models, transaction
-from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.http import Http404
 
 from rest_framework import generics, permissions, status, views
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from api.common.constants import HIGH_LEVEL_API_ERROR_CODES
+from api.common.constants import ErrorMessages as common_errors, HIGH_LEVEL_API_ERROR_CODES
+from api.common.pagination import (
+    decode_cursor,
+    encode_cursor,
+    get_appointments_page,
+    get_page_limit,
+)
 from api.common.permissions import (
     StylistPermission,
     StylistRegisterUpdatePermission,
 )
-from appointment.models import Appointment
+from api.common.utils import get_etag_response
+from appointment.models import Appointment, AppointmentChange
 from appointment.preview import (
     AppointmentPreviewRequest,
     build_appointment_preview_dict,
 )
 from appointment.types import AppointmentStatus
+from appointment.utils import select_appointment_list_related
 from client.models import Client
 from core.utils import (
     post_or_get,
 )
 from salon.models import (
-    ServiceTemplateSet,
     Stylist,
     StylistAvailableWeekDay,
     StylistService,
 )
 from salon.types import ClientPriceOnDate
 from salon.utils import (
+    annotate_clients_with_last_visit,
     generate_client_prices_for_stylist_services,
     get_default_service_uuids)
-from .constants import ErrorMessages, MAX_APPOINTMENTS_PER_REQUEST, NEARBY_CLIENTS_ACCURACY
+from .catalog import get_service_template_catalog
+from .constants import (
+    CLIENT_LIST_LIMIT,
+    ErrorMessages,
+    MAX_APPOINTMENT_CHANGES_PER_REQUEST,
+    MAX_APPOINTMENTS_PER_REQUEST,
+    NEARBY_CLIENTS_ACCURACY,
+    NEARBY_CLIENTS_LIMIT,
+)
+from .fields import DurationMinuteField
 from .serializers import (
     AppointmentPreviewRequestSerializer,
     AppointmentPreviewResponseSerializer,
@@ -56,8 +75,6 @@ from .serializers import (
     InvitationSerializer,
     MaximumDiscountSerializer,
     NearbyClientSerializer,
-    ServiceTemplateSetDetailsSerializer,
-    ServiceTemplateSetListSerializer,
     StylistAvailableWeekDayListSerializer,
     StylistAvailableWeekDaySerializer,
     StylistDiscountsSerializer,
@@ -112,31 +129,42 @@ class StylistView(
 
 
 class ServiceTemplateSetListView(views.APIView):
-    serializer_class = ServiceTemplateSetListSerializer
+    """
+    Serves service template sets from in-process catalog snapshot; response
+    carries ETag, so that clients with unchanged catalog get 304 Not Modified
+    """
     permission_classes = [StylistPermission, permissions.IsAuthenticated]
 
     def get(self, request):
-        return Response(
-            {
-                'service_template_sets': self.serializer_class(self.get_queryset(), many=True).data
-            }
+        catalog = get_service_template_catalog()
+        return get_etag_response(
+            request, etag=catalog.etag,
+            data={'service_template_sets': catalog.template_sets}
         )
 
-    def get_queryset(self):
-        return ServiceTemplateSet.objects.all().order_by('sort_weight')
-
 
-class ServiceTemplateSetDetailsView(generics.RetrieveAPIView):
+class ServiceTemplateSetDetailsView(views.APIView):
+    """
+    Serves service template set details from in-process catalog snapshot. ETag
+    also depends on stylist's service time gap, which is part of the response
+    """
     permission_classes = [StylistPermission, permissions.IsAuthenticated]
-    serializer_class = ServiceTemplateSetDetailsSerializer
-    lookup_field = 'uuid'
-    lookup_url_kwarg = 'template_set_uuid'
-
-    def get_queryset(self):
-        return ServiceTemplateSet.objects.all()
 
-    def get_serializer_context(self):
-        return {'stylist': self.request.user.stylist}
+    def get(self, request, template_set_uuid: str):
+        catalog = get_service_template_catalog()
+        template_set_details = catalog.template_set_details.get(template_set_uuid, None)
+        if template_set_details is None:
+            raise Http404()
+        stylist: Stylist = self.request.user.stylist
+        service_time_gap_minutes = DurationMinuteField().to_representation(
+            stylist.service_time_gap
+        )
+        data = dict(template_set_details)
+        data['service_time_gap_minutes'] = service_time_gap_minutes
+        etag = hashlib.md5('{0}:{1}:{2}'.format(
+            catalog.etag, template_set_uuid, service_time_gap_minutes
+        ).encode('utf-8')).hexdigest()
+        return get_etag_response(request, etag=etag, data=data)
 
 
 class StylistServiceListView(generics.RetrieveUpdateAPIView):
@@ -258,8 +286,22 @@ class StylistHomeView(views.APIView):
 
     def get(self, request):
         query = request.query_params['query']
-        serializer = StylistHomeSerializer(self.get_object(),
-                                           context={'query': query},
+        context = {'query': query}
+        stylist: Optional[Stylist] = self.get_object()
+        if query == 'past' and stylist:
+            # past visits are paginated, newest first
+            limit = get_page_limit(request, MAX_APPOINTMENTS_PER_REQUEST)
+            cursor = decode_cursor(post_or_get(request, 'cursor', None))
+            appointments, next_position = get_appointments_page(
+                select_appointment_list_related(stylist.get_past_visits()),
+                cursor=cursor, limit=limit, descending=True
+            )
+            context.update({
+                'appointments': appointments,
+                'next_cursor': encode_cursor(next_position) if next_position else None,
+            })
+        serializer = StylistHomeSerializer(stylist,
+                                           context=context,
                                            data=request.data)
         serializer.is_valid(raise_exception=True)
         return Response(serializer.data)
@@ -290,7 +332,6 @@ class StylistAppointmentListCreateView(generics.ListCreateAPIView):
                 AppointmentStatus.CANCELLED_BY_CLIENT,
                 AppointmentStatus.CANCELLED_BY_STYLIST
             ]
-        limit = int(post_or_get(self.request, 'limit', MAX_APPOINTMENTS_PER_REQUEST))
 
         datetime_from = None
         datetime_to = None
@@ -303,10 +344,77 @@ class StylistAppointmentListCreateView(generics.ListCreateAPIView):
             datetime_to = (parse(date_to_str) + datetime.timedelta(days=1)).replace(
                 hour=0, minute=0, second=0
             )
-        return stylist.get_appointments_in_datetime_range(
+        return select_appointment_list_related(stylist.get_appointments_in_datetime_range(
             datetime_from, datetime_to,
             exclude_statuses=exclude_statuses
-        )[:limit]
+        ))
+
+    def list(self, request, *args, **kwargs):
+        """
+        Return page of appointments ordered by start time. If there are more
+        appointments, cursor of the next page is returned in X-Next-Cursor header,
+        and the page is requested by passing it as `cursor` parameter.
+        """
+        limit = get_page_limit(request, MAX_APPOINTMENTS_PER_REQUEST)
+        cursor = decode_cursor(post_or_get(request, 'cursor', None))
+        appointments, next_position = get_appointments_page(
+            self.get_queryset(), cursor=cursor, limit=limit
+        )
+        serializer = self.get_serializer(appointments, many=True)
+        response = Response(serializer.data)
+        if next_position:
+            response['X-Next-Cursor'] = encode_cursor(next_position)
+        return response
+
+
+class StylistAppointmentChangesView(views.APIView):
+    permission_classes = [StylistPermission, permissions.IsAuthenticated]
+
+    def get(self, request):
+        """
+        Return appointments changed since change token passed in `since` parameter
+        (all appointments if it's missing), in the order of changes, and uuids of
+        appointments deleted since then. Returned `since` token is passed to get
+        the next changes; `has_more` is true if there are more changes already.
+        """
+        stylist: Stylist = self.request.user.stylist
+        try:
+            since = int(post_or_get(request, 'since', 0))
+        except ValueError:
+            since = -1
+        if since < 0:
+            raise ValidationError({'non_field_errors': [
+                {'code': ErrorMessages.ERR_INVALID_CHANGE_TOKEN}
+            ]})
+        limit = get_page_limit(request, MAX_APPOINTMENT_CHANGES_PER_REQUEST)
+        changes: List[AppointmentChange] = list(AppointmentChange.objects.filter(
+            stylist=stylist, change_seq__gt=since
+        ).order_by('change_seq')[:limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        appointments_by_uuid: Dict[uuid.UUID, Appointment] = {
+            appointment.uuid: appointment for appointment in
+            select_appointment_list_related(stylist.appointments.filter(
+                uuid__in=[c.appointment_uuid for c in changes if not c.is_deleted]
+            ))
+        }
+        appointments: List[Appointment] = []
+        deleted_uuids: List[uuid.UUID] = []
+        for change in changes:
+            appointment = appointments_by_uuid.get(change.appointment_uuid, None)
+            if appointment is None:
+                # deleted, or deleted after the change was read
+                deleted_uuids.append(change.appointment_uuid)
+            else:
+                appointments.append(appointment)
+        return Response({
+            'appointments': AppointmentSerializer(
+                appointments, many=True, context={'stylist': stylist}
+            ).data,
+            'deleted': [str(appointment_uuid) for appointment_uuid in deleted_uuids],
+            'since': str(changes[-1].change_seq if changes else since),
+            'has_more': has_more,
+        })
 
 
 class AppointmentsOnADayView(views.APIView):
@@ -490,20 +598,37 @@ class StylistServicePricingView(views.APIView):
 
 
 class ClientListView(generics.ListAPIView):
+    """
+    Return page of stylist's clients ordered by id. Next page is requested by passing
+    `next_cursor` value of the previous response as `cursor` parameter; last page
+    has null `next_cursor`.
+    """
     permission_classes = [StylistPermission, permissions.IsAuthenticated]
     serializer_class = ClientSerializer
 
     def get(self, request, *args, **kwargs):
-        serializer = ClientSerializer(self.get_queryset(),
+        limit = get_page_limit(request, CLIENT_LIST_LIMIT)
+        cursor = decode_cursor(post_or_get(request, 'cursor', None)) or {}
+        try:
+            cursor_id = int(cursor.get('id', 0))
+        except (TypeError, ValueError):
+            raise ValidationError({'cursor': [{'code': common_errors.ERR_INVALID_CURSOR}]})
+        # fetch one extra client to know if there is next page
+        clients: List[Client] = list(
+            self.get_queryset().filter(id__gt=cursor_id).order_by('id')[:limit + 1]
+        )
+        next_position = {'id': clients[limit - 1].id} if len(clients) > limit else None
+        serializer = ClientSerializer(clients[:limit],
                                       many=True, context=self.get_serializer_context())
         response_dict = {
-            'clients': serializer.data
+            'clients': serializer.data,
+            'next_cursor': encode_cursor(next_position) if next_position else None,
         }
         return Response(response_dict, status=status.HTTP_200_OK)
 
     def get_queryset(self):
         stylist: Stylist = self.request.user.stylist
-        queryset = stylist.get_preferred_clients()
+        queryset = stylist.get_preferred_clients().select_related('user')
         return queryset
 
     def get_serializer_context(self):
@@ -519,7 +644,9 @@ class ClientView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         stylist: Stylist = self.request.user.stylist
-        queryset = stylist.get_preferred_clients()
+        queryset = annotate_clients_with_last_visit(
+            stylist.get_preferred_clients().select_related('user'), stylist=stylist
+        )
         return queryset
 
     def get_serializer_context(self):
@@ -527,69 +654,132 @@ class ClientView(generics.RetrieveAPIView):
 
 
 class NearbyClientsView(views.APIView):
+    """
+    Return page of clients near stylist's salon. Next page is requested by passing
+    `next_cursor` value of the previous response as `cursor` parameter; last page
+    has null `next_cursor`.
+    """
     permission_classes = [StylistPermission, permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        serializer = NearbyClientSerializer(self.get_queryset(), many=True)
+        limit = get_page_limit(request, NEARBY_CLIENTS_LIMIT)
+        cursor = decode_cursor(post_or_get(request, 'cursor', None))
+        clients, next_position = self.get_clients_page(cursor=cursor, limit=limit)
+        serializer = NearbyClientSerializer(clients, many=True)
         response_dict = {
-            'clients': serializer.data
+            'clients': serializer.data,
+            'next_cursor': encode_cursor(next_position) if next_position else None,
         }
         return Response(response_dict, status=status.HTTP_200_OK)
 
-    def get_queryset(self):
+    def get_clients_page(
+            self, cursor: Optional[Dict], limit: int
+    ) -> Tuple[List[Client], Optional[Dict]]:
         salon = self.request.user.stylist.salon
         if salon:
             location = salon.location
             if location:
                 return NearbyClientsView._search_clients(
-                    location=location, country=salon.country)
+                    location=location, country=salon.country, cursor=cursor, limit=limit)
 
         raise ValidationError(
             {'non_field_errors': [{'code': ErrorMessages.ERR_STYLIST_LOCATION_UNAVAILABLE}]})
 
     @staticmethod
-    def _search_clients(location: Point, country: str) -> models.QuerySet:
+    def _search_clients(
+            location: Point, country: str, cursor: Optional[Dict]=None,
+            limit: int=NEARBY_CLIENTS_LIMIT
+    ) -> Tuple[List[Client], Optional[Dict]]:
         """
         Ordering
         ========
-        We are ordering clients by profile_completeness and then by distance
-
-        Profile completeness ranking is calculated in the following order
-         1. Has first name, has photo
-         2. Has first name, no photo
-         3. No first name, has photo
-         4. No first name, No photo
+        We are ordering clients by stored name_and_photo_completeness rank
+        (see Client.get_name_and_photo_completeness), then by distance, then by id.
+        Clients without location go last within their rank.
+
+        Every rank is read separately, so that clients with location are read
+        with KNN ordering over GiST index on (name_and_photo_completeness, location)
+        and only as many rows as still fit the page are fetched.
+
+        :param cursor: position of the last client of the previous page, i.e.
+          dict with `rank`, `located` (whether the client has location) and `id`.
+          Distance of the last client is recomputed from its location rather than
+          stored in the cursor, since float read back from the DB is rounded and
+          wouldn't compare equal to itself
+        :return: tuple of clients and position of the last of them if there may
+          be more clients to return
         """
-        queryset = Client.objects.filter(country__iexact=country)
-
-        nearby_clients = NearbyClientsView._get_nearby_clients(queryset, location)
+        cursor = cursor or {}
+        try:
+            cursor_rank = int(cursor.get('rank', 1))
+            cursor_located = bool(cursor.get('located', False))
+            cursor_id = int(cursor.get('id', 0))
+        except (TypeError, ValueError):
+            raise ValidationError({'cursor': [{'code': common_errors.ERR_INVALID_CURSOR}]})
+        is_within_cursor_rank = 'id' in cursor
+        base_queryset = Client.objects.filter(country__iexact=country).select_related('user')
+
+        clients: List[Client] = []
+        for rank in range(cursor_rank, 5):
+            remaining_count = limit - len(clients)
+            continues_cursor_rank = is_within_cursor_rank and rank == cursor_rank
+            if not continues_cursor_rank or cursor_located:
+                located_clients = NearbyClientsView._get_nearby_clients(
+                    base_queryset.filter(name_and_photo_completeness=rank), location)
+                if continues_cursor_rank:
+                    cursor_distance = NearbyClientsView._get_knn_distance_of_client(
+                        cursor_id, location)
+                    located_clients = located_clients.filter(
+                        Q(knn_distance__gt=cursor_distance) |
+                        Q(knn_distance=cursor_distance, id__gt=cursor_id))
+                clients += list(located_clients[:remaining_count])
+                remaining_count = limit - len(clients)
+            if remaining_count > 0:
+                unlocated_clients = base_queryset.filter(
+                    name_and_photo_completeness=rank, location__isnull=True
+                )
+                if continues_cursor_rank and not cursor_located:
+                    unlocated_clients = unlocated_clients.filter(id__gt=cursor_id)
+                clients += list(unlocated_clients.order_by('id')[:remaining_count])
+            if len(clients) >= limit:
+                last_client = clients[-1]
+                return clients, {
+                    'rank': last_client.name_and_photo_completeness,
+                    'located': hasattr(last_client, 'knn_distance'),
+                    'id': last_client.id,
+                }
+        return clients, None
 
-        queryset = nearby_clients.annotate(name_and_photo_completeness=Case(
-            When((Q(user__first_name='', user__photo='')), then=Value(4)),
-            When((Q(user__first_name='') & ~Q(user__photo='')), then=Value(3)),
-            When(Q(user__first_name__isnull=False, user__photo=''), then=Value(2)),
-            When(Q(user__first_name__isnull=False) & ~Q(user__photo=''), then=Value(1)),
-            output_field=IntegerField(),
-        )).order_by('name_and_photo_completeness', 'distance')[:1000]
+    @staticmethod
+    def _get_knn_distance_sql(location: Point, table: str) -> Tuple[str, Tuple[str]]:
+        point_wkt = 'SRID=4326;POINT({0} {1})'.format(location.x, location.y)
+        return '"{0}"."location" <-> ST_GeogFromText(%s)'.format(table), (point_wkt, )
 
-        return queryset
+    @staticmethod
+    def _get_knn_distance_of_client(client_id: int, location: Point) -> RawSQL:
+        """Return subquery computing `knn_distance` of the client exactly as in the page query"""
+        distance_sql, params = NearbyClientsView._get_knn_distance_sql(location, 'cursor_client')
+        return RawSQL(
+            'SELECT {0} FROM "client" AS "cursor_client" WHERE "cursor_client"."id" = %s'.format(
+                distance_sql
+            ), params + (client_id, ), output_field=FloatField()
+        )
 
     @staticmethod
     def _get_nearby_clients(queryset: models.QuerySet,
                             location: Point) -> models.QuerySet:
         """
-        Filter conditions
-        =================
-        Has no zip code
-        Attempted to geocode invalid zip-code
-        Has latitude and longitude which and is within NEARBY_CLIENTS_ACCURACY.
-
+        Return clients within NEARBY_CLIENTS_ACCURACY, ordered nearest first with KNN
+        `<->` operator, which (unlike ST_Distance) is served from the GiST index.
+        Annotated `knn_distance` is the value of that operator, so it's also used
+        for keyset pagination.
         """
-        queryset = queryset.filter(Q(zip_code__isnull=True) | Q(
-            last_geo_coded__isnull=False) | Q(
-            location__distance_lte=(location, D(m=NEARBY_CLIENTS_ACCURACY)))).annotate(
-            distance=Distance('location', location))
-        return queryset
+        distance_sql, params = NearbyClientsView._get_knn_distance_sql(location, 'client')
+        return queryset.filter(
+            location__dwithin=(location, D(m=NEARBY_CLIENTS_ACCURACY))
+        ).annotate(
+            knn_distance=RawSQL(distance_sql, params, output_field=FloatField())
+        ).order_by('knn_distance', 'id')
 
 
 class ClientPricingView(views.APIView):
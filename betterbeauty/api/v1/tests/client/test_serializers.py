@@ -33,6 +33,8 @@ from client.models import Client, ClientPrivacy, PreferredStylist
 from core.models import User
 from core.types import UserRole, Weekday
 from core.utils import calculate_card_fee, calculate_stylist_payout_amount, calculate_tax
+from integrations.models import OutboxJob
+from integrations.types import OutboxJobType
 from pricing import CalculatedPrice, DiscountType
 from salon.models import (
     Salon,
@@ -210,10 +212,7 @@ class TestAppointmentSerializer(object):
 
     @freeze_time('2018-05-17 15:30:00 UTC')
     @pytest.mark.django_db
-    def test_create_with_client(self, stylist_data: Stylist, client_data: Client, mocker):
-        slack_mock = mocker.patch(
-            'api.v1.client.serializers.send_slack_auto_booking_notification'
-        )
+    def test_create_with_client(self, stylist_data: Stylist, client_data: Client):
         service: StylistService = G(
             StylistService,
             stylist=stylist_data, duration=datetime.timedelta(minutes=30),
@@ -277,7 +276,14 @@ class TestAppointmentSerializer(object):
         assert (original_service.client_price == 48)
         assert (original_service.service_uuid == service.uuid)
         assert (original_service.service_name == service.name)
-        assert(slack_mock.called_once_with(appointment))
+        # side effects are deferred to outbox worker
+        assert(frozenset(OutboxJob.objects.filter(
+            payload__appointment_id=appointment.id
+        ).values_list('job_type', flat=True)) == frozenset([
+            OutboxJobType.NEW_APPOINTMENT_NOTIFICATION.value,
+            OutboxJobType.SLACK_AUTO_BOOKING.value,
+            OutboxJobType.GOOGLE_CALENDAR_SYNC.value,
+        ]))
 
     @freeze_time('2018-05-17 10:30:00 UTC')
     @pytest.mark.django_db
@@ -10,6 +10,7 @@ import pytz
 
 from dateutil import parser
 from django.contrib.gis.geos import Point
+from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django_dynamic_fixture import G
@@ -34,7 +35,10 @@ from client.types import ClientPrivacy
 from core.constants import (
     EMAIL_VERIFICATION_FAILIURE_REDIRECT_URL, EMAIL_VERIFICATION_SUCCESS_REDIRECT_URL
 )
+from integrations.models import OutboxJob
+from integrations.outbox import run_outbox_job
 from integrations.push.types import MobileAppIdType
+from integrations.types import OutboxJobType
 from notifications.models import Notification
 from notifications.types import NotificationCode
 from salon.models import (
@@ -46,6 +50,7 @@ from salon.models import (
     StylistWeekdayDiscount,
     Weekday,
 )
+from salon.search import clear_local_search_cache, get_shared_search_cache
 from salon.tests.test_models import stylist_appointments_data
 from salon.types import ClientPriceOnDate, InvitationStatus
 from salon.utils import generate_client_prices_for_stylist_services
@@ -341,6 +346,37 @@ class TestSearchStylistView(object):
             'Fred', 'los altos', location=location, country='US', client_id=client_data.id)
         assert (len(results) == 0)
 
+    @pytest.mark.django_db
+    @override_settings(STYLIST_SEARCH_CACHE_ENABLED=True)
+    def test_search_stylists_cached(self, stylist_data: Stylist):
+        clear_local_search_cache()
+        get_shared_search_cache().clear()
+        location = stylist_data.salon.location
+        client_data = G(Client)
+        results = SearchStylistView._search_stylists_cached(
+            'Fred', 'los altos', location=location, country='US', client_id=client_data.id)
+        assert (len(results) == 1)
+        assert (results[0] == stylist_data)
+        assert (results[0].preference_uuid is None)
+
+        preference = G(PreferredStylist, client=client_data, stylist=stylist_data)
+        with mock.patch.object(SearchStylistView, '_search_stylists') as search_mock:
+            # differently formatted query must hit the same cache entry
+            results = SearchStylistView._search_stylists_cached(
+                ' fred ', 'Los  Altos', location=location, country='US',
+                client_id=client_data.id)
+            assert (search_mock.call_count == 0)
+        assert (len(results) == 1)
+        assert (results[0] == stylist_data)
+        assert (results[0].preference_uuid == preference.uuid)
+        assert (results[0].user__first_name == stylist_data.user.first_name)
+
+        # deactivated stylist is dropped even if cached results still reference it
+        Stylist.objects.filter(pk=stylist_data.pk).update(deactivated_at=timezone.now())
+        results = SearchStylistView._search_stylists_cached(
+            'Fred', 'los altos', location=location, country='US', client_id=client_data.id)
+        assert (len(results) == 0)
+
     @pytest.mark.django_db
     def test_search_stylists_when_no_results(self, stylist_data: Stylist):
         salon_2 = G(Salon, location=NEW_YORK_LOCATION, country='CA')
@@ -565,6 +601,14 @@ class TestAppointmentListCreateAPIView(object):
         assert (status.is_success(response.status_code))
         appointment = Appointment.objects.last()
         assert(appointment is not None)
+        # notification is generated by outbox worker after booking is committed
+        assert(appointment.stylist_new_appointment_notification is None)
+        job: OutboxJob = OutboxJob.objects.get(
+            job_type=OutboxJobType.NEW_APPOINTMENT_NOTIFICATION,
+            payload__appointment_id=appointment.id
+        )
+        assert(run_outbox_job(job) is True)
+        appointment.refresh_from_db()
         notification: Notification = Notification.objects.last()
         assert(notification is not None)
         assert(appointment.stylist_new_appointment_notification == notification)
@@ -945,6 +989,17 @@ class TestStylistFollowersView(object):
         )
         client_without_appointments = G(Client)
         G(PreferredStylist, stylist=stylist, client=client_without_appointments)
+        client_with_deleted_appointment = G(Client)
+        G(PreferredStylist, stylist=stylist, client=client_with_deleted_appointment)
+        G(
+            Appointment, status=AppointmentStatus.CHECKED_OUT,
+            client=client_with_deleted_appointment, stylist=stylist, deleted_at=None
+        )
+        G(
+            Appointment, status=AppointmentStatus.CHECKED_OUT,
+            client=client_with_deleted_appointment, stylist=stylist,
+            deleted_at=timezone.now()
+        )
 
         url = reverse('api:v1:client:stylist-followers', kwargs={'stylist_uuid': stylist.uuid})
         response = client.get(url, HTTP_AUTHORIZATION=auth_token)
@@ -954,6 +1009,7 @@ class TestStylistFollowersView(object):
             str(client_with_new_appointment.uuid),
             str(client_with_cancelled_appointment.uuid),
             str(client_without_appointments.uuid),
+            str(client_with_deleted_appointment.uuid),
             str(client_obj.uuid)
         ]))
 
@@ -962,6 +1018,8 @@ class TestStylistFollowersView(object):
         assert(appt_count[str(client_with_new_appointment.uuid)] == 1)
         assert(appt_count[str(client_with_cancelled_appointment.uuid)] == 0)
         assert(appt_count[str(client_without_appointments.uuid)] == 0)
+        # soft-deleted appointments are not counted
+        assert(appt_count[str(client_with_deleted_appointment.uuid)] == 1)
 
     @pytest.mark.django_db
     def test_sorted_output(self, client, authorized_client_user):
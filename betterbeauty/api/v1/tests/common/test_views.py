@@ -349,7 +349,7 @@ class TestAnalyticsViewView(object):
 class TestStylistInstagramPhotosRetrieveView(object):
     @pytest.mark.django_db
     @mock.patch(
-        'integrations.instagram.requests.get',
+        'integrations.gateway.IntegrationHttpSession.get',
         side_effect=mocked_instagram_requests_get
     )
     def test_retrieve(self, requests_mock, client, authorized_client_user):
@@ -8,6 +8,7 @@ import pytz
 
 from django.conf import settings
 from django.core.files import File
+from django.utils import timezone
 from django_dynamic_fixture import G
 from freezegun import freeze_time
 
@@ -56,9 +57,11 @@ from salon.models import (
     Stylist,
     StylistAvailableWeekDay,
     StylistService,
+    StylistServicePhotoSample,
 )
 from salon.tests.test_models import stylist_appointments_data
 from salon.utils import (
+    annotate_clients_with_last_visit,
     create_stylist_profile_for_user,
 )
 
@@ -1311,6 +1314,35 @@ class TestStylistServiceListSerializer(object):
             ['service1_updated', 'service2']
         ))
 
+    @pytest.mark.django_db
+    def test_categories(self, django_assert_num_queries):
+        stylist: Stylist = G(Stylist)
+        category: ServiceCategory = G(ServiceCategory, name='Test category', weight=10000)
+        empty_category: ServiceCategory = G(ServiceCategory, name='Test empty category')
+        cheap_service = G(
+            StylistService, stylist=stylist, category=category, regular_price=10,
+            deleted_at=None
+        )
+        expensive_service = G(
+            StylistService, stylist=stylist, category=category, regular_price=20,
+            deleted_at=None
+        )
+        G(StylistService, stylist=stylist, category=category, deleted_at=timezone.now())
+        G(StylistServicePhotoSample, stylist_service=cheap_service, photo='sample.jpg')
+        G(StylistService, category=category, deleted_at=None)
+
+        with django_assert_num_queries(3):
+            categories = StylistServiceListSerializer(
+                stylist, context={'stylist': stylist}).data['categories']
+        categories = {c['uuid']: c for c in categories}
+        services = categories[str(category.uuid)]['services']
+        assert([s['uuid'] for s in services] == [
+            str(expensive_service.uuid), str(cheap_service.uuid)
+        ])
+        assert(services[1]['category_uuid'] == str(category.uuid))
+        assert(len(services[1]['photo_samples']) == 1)
+        assert(categories[str(empty_category.uuid)]['services'] == [])
+
 
 class TestAppointmentPreviewRequestSerializer(object):
     @pytest.mark.django_db
@@ -1512,6 +1544,26 @@ class TestClientDetailsSerializer(object):
             'last_services_names': sorted(['our service 1', 'our service 2']),
         })
 
+    @pytest.mark.django_db
+    def test_format_annotated(
+            self, client_details_data: Tuple[Stylist, Client], django_assert_num_queries
+    ):
+        stylist, client = client_details_data
+        expected_data = ClientDetailsSerializer(
+            context={'stylist': stylist}
+        ).to_representation(instance=client)
+        expected_data['last_services_names'] = sorted(expected_data['last_services_names'])
+        # client, last appointment and its services
+        with django_assert_num_queries(3):
+            annotated_client = annotate_clients_with_last_visit(
+                Client.objects.filter(id=client.id).select_related('user'), stylist=stylist
+            ).get()
+            data = ClientDetailsSerializer(
+                context={'stylist': stylist}
+            ).to_representation(instance=annotated_client)
+        data['last_services_names'] = sorted(data['last_services_names'])
+        assert (data == expected_data)
+
 
 class TestHomeAPISerializer(object):
 
@@ -1,10 +1,12 @@
 import datetime
 import re
+import uuid
 
 import mock
 import pytest
 import pytz
 
+from django.contrib.gis.geos import Point
 from django.urls import reverse
 from django.utils import timezone
 
@@ -13,11 +15,16 @@ from freezegun import freeze_time
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
+from api.common.pagination import decode_cursor, encode_cursor
 from api.common.permissions import StylistPermission, StylistRegisterUpdatePermission
+from api.v1.stylist.catalog import (
+    build_service_template_catalog,
+    clear_service_template_catalog,
+)
 from api.v1.stylist.constants import ErrorMessages as stylist_errors
 from api.v1.stylist.serializers import AppointmentValidationMixin
 from api.v1.stylist.urls import urlpatterns
-from api.v1.stylist.views import StylistView
+from api.v1.stylist.views import NearbyClientsView, StylistView
 from appointment.constants import AppointmentStatus, ErrorMessages as appointment_errors
 from appointment.models import Appointment, AppointmentService
 from client.models import Client, PreferredStylist
@@ -25,10 +32,14 @@ from core.constants import (
     EMAIL_VERIFICATION_FAILIURE_REDIRECT_URL, EMAIL_VERIFICATION_SUCCESS_REDIRECT_URL
 )
 from core.models import User
-from core.types import UserRole
+from core.types import UserRole, Weekday
 from salon.models import (
     Salon,
+    ServiceCategory,
+    ServiceTemplate,
+    ServiceTemplateSet,
     Stylist,
+    StylistAvailableWeekDay,
     StylistService,
     StylistSpecialAvailableDate,
 )
@@ -117,6 +128,78 @@ class TestStylistView(object):
             assert (verification_response.url == EMAIL_VERIFICATION_FAILIURE_REDIRECT_URL)
 
 
+class TestServiceTemplateSetViews(object):
+    @pytest.mark.django_db
+    def test_list_and_details(self, client, authorized_stylist_user):
+        clear_service_template_catalog()
+        user, auth_token = authorized_stylist_user
+        # catalog is also seeded by migrations, so only our rows are checked
+        category = G(ServiceCategory, name='Test color', weight=10)
+        empty_category = G(ServiceCategory, name='Test cut', weight=0)
+        template_set = G(ServiceTemplateSet, name='Test set 1', sort_weight=1)
+        empty_template_set = G(ServiceTemplateSet, name='Test set 2', sort_weight=2)
+        G(ServiceTemplate, templateset=template_set, category=category, regular_price=10)
+        G(ServiceTemplate, templateset=template_set, category=category, regular_price=20)
+
+        url = reverse('api:v1:stylist:service-template-set-list')
+        response = client.get(url, HTTP_AUTHORIZATION=auth_token)
+        assert(response.status_code == status.HTTP_200_OK)
+        template_sets = {
+            s['uuid']: s for s in response.data['service_template_sets']
+        }
+        assert(template_sets[str(template_set.uuid)]['services_count'] == 2)
+        assert(template_sets[str(empty_template_set.uuid)]['services_count'] == 0)
+        etag = response['ETag']
+
+        response = client.get(url, HTTP_AUTHORIZATION=auth_token, HTTP_IF_NONE_MATCH=etag)
+        assert(response.status_code == status.HTTP_304_NOT_MODIFIED)
+
+        url = reverse('api:v1:stylist:service-template-set-details', kwargs={
+            'template_set_uuid': template_set.uuid
+        })
+        response = client.get(url, HTTP_AUTHORIZATION=auth_token)
+        assert(response.status_code == status.HTTP_200_OK)
+        assert(response.data['uuid'] == str(template_set.uuid))
+        assert(response.data['service_time_gap_minutes'] == 30)
+        categories = {c['uuid']: c for c in response.data['categories']}
+        assert([s['base_price'] for s in categories[str(category.uuid)]['services']] == [
+            20, 10])
+        assert(categories[str(empty_category.uuid)]['services'] == [])
+        details_etag = response['ETag']
+        response = client.get(
+            url, HTTP_AUTHORIZATION=auth_token, HTTP_IF_NONE_MATCH=details_etag)
+        assert(response.status_code == status.HTTP_304_NOT_MODIFIED)
+
+        # stylist-specific part of the response changes the etag
+        user.stylist.service_time_gap = datetime.timedelta(minutes=15)
+        user.stylist.save()
+        response = client.get(
+            url, HTTP_AUTHORIZATION=auth_token, HTTP_IF_NONE_MATCH=details_etag)
+        assert(response.status_code == status.HTTP_200_OK)
+        assert(response.data['service_time_gap_minutes'] == 15)
+
+        url = reverse('api:v1:stylist:service-template-set-details', kwargs={
+            'template_set_uuid': uuid.uuid4()
+        })
+        response = client.get(url, HTTP_AUTHORIZATION=auth_token)
+        assert(response.status_code == status.HTTP_404_NOT_FOUND)
+        clear_service_template_catalog()
+
+    @pytest.mark.django_db
+    def test_etag_does_not_depend_on_image_urls(self):
+        template_set = G(ServiceTemplateSet, name='Test set 1', image='set.jpg')
+        # image urls are pre-signed anew on every build in staging and production
+        with mock.patch.object(
+                ServiceTemplateSet, 'get_image_url',
+                side_effect=lambda: 'https://s3/set.jpg?Signature={0}'.format(uuid.uuid4())
+        ):
+            etag = build_service_template_catalog(version=1).etag
+            assert(build_service_template_catalog(version=2).etag == etag)
+        template_set.name = 'Test set 2'
+        template_set.save()
+        assert(build_service_template_catalog(version=3).etag != etag)
+
+
 class TestStylistServiceView(object):
 
     @pytest.mark.django_db
@@ -159,6 +242,76 @@ class TestStylistAppointmentListCreateView(object):
         )
 
 
+class TestStylistAppointmentChangesView(object):
+
+    @pytest.mark.django_db
+    def test_changes_since(self, client, authorized_stylist_user):
+        user, auth_token = authorized_stylist_user
+        stylist = user.stylist
+        url = reverse('api:v1:stylist:appointment-changes')
+        appointment_1 = G(
+            Appointment, stylist=stylist,
+            datetime_start_at=datetime.datetime(2018, 1, 1, 10, 0, tzinfo=pytz.UTC)
+        )
+        appointment_2 = G(
+            Appointment, stylist=stylist,
+            datetime_start_at=datetime.datetime(2018, 1, 1, 11, 0, tzinfo=pytz.UTC)
+        )
+        appointment_3 = G(
+            Appointment, stylist=stylist,
+            datetime_start_at=datetime.datetime(2018, 1, 1, 12, 0, tzinfo=pytz.UTC)
+        )
+        G(Appointment, datetime_start_at=datetime.datetime(2018, 1, 1, 0, 0, tzinfo=pytz.UTC))
+
+        response = client.get(url, HTTP_AUTHORIZATION=auth_token)
+        assert(status.is_success(response.status_code))
+        assert([a['uuid'] for a in response.data['appointments']] == [
+            str(appointment_1.uuid), str(appointment_2.uuid), str(appointment_3.uuid)
+        ])
+        assert(response.data['deleted'] == [])
+        assert(response.data['has_more'] is False)
+        since = response.data['since']
+
+        response = client.get(url, data={'since': since}, HTTP_AUTHORIZATION=auth_token)
+        assert(response.data['appointments'] == [])
+        assert(response.data['deleted'] == [])
+        assert(response.data['since'] == since)
+
+        # changes of appointment services are recorded too
+        G(AppointmentService, appointment=appointment_2)
+        appointment_1.status = AppointmentStatus.NO_SHOW
+        appointment_1.save(update_fields=['status'])
+        Appointment.objects.filter(id=appointment_3.id).update(deleted_at=timezone.now())
+
+        response = client.get(
+            url, data={'since': since, 'limit': 1}, HTTP_AUTHORIZATION=auth_token
+        )
+        assert([a['uuid'] for a in response.data['appointments']] == [
+            str(appointment_2.uuid)
+        ])
+        assert(response.data['has_more'] is True)
+        response = client.get(
+            url, data={'since': response.data['since']}, HTTP_AUTHORIZATION=auth_token
+        )
+        assert([a['uuid'] for a in response.data['appointments']] == [
+            str(appointment_1.uuid)
+        ])
+        assert(response.data['appointments'][0]['status'] == AppointmentStatus.NO_SHOW)
+        assert(response.data['deleted'] == [str(appointment_3.uuid)])
+        assert(response.data['has_more'] is False)
+
+    @pytest.mark.django_db
+    def test_invalid_token(self, client, authorized_stylist_user):
+        user, auth_token = authorized_stylist_user
+        url = reverse('api:v1:stylist:appointment-changes')
+        response = client.get(url, data={'since': 'abc'}, HTTP_AUTHORIZATION=auth_token)
+        assert(response.status_code == status.HTTP_400_BAD_REQUEST)
+        assert(
+            {'code': stylist_errors.ERR_INVALID_CHANGE_TOKEN} in
+            response.data['non_field_errors']
+        )
+
+
 class TestStylistAppointmentPreviewView(object):
 
     @pytest.mark.django_db
@@ -312,8 +465,94 @@ class TestClientListView(object):
 
         response = client.get(url, HTTP_AUTHORIZATION=auth_token)
         assert (status.is_success(response.status_code))
-        assert (len(response.data) == 1)
+        assert (len(response.data['clients']) == 1)
         assert (response.data['clients'][0]['uuid'] == str(client_data.uuid))
+        assert (response.data['next_cursor'] is None)
+
+    @pytest.mark.django_db
+    def test_pagination(self, client, authorized_stylist_user):
+        user, auth_token = authorized_stylist_user
+        stylist = user.stylist
+        clients = [G(Client) for _ in range(5)]
+        for client_data in clients:
+            G(PreferredStylist, stylist=stylist, client=client_data)
+        url = reverse('api:v1:stylist:my-clients')
+
+        client_uuids = []
+        cursor = None
+        for page in range(3):
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = client.get(url, params, HTTP_AUTHORIZATION=auth_token)
+            assert (status.is_success(response.status_code))
+            assert (len(response.data['clients']) <= 2)
+            client_uuids += [c['uuid'] for c in response.data['clients']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+        assert (cursor is None)
+        assert (client_uuids == [str(c.uuid) for c in sorted(clients, key=lambda c: c.id)])
+
+        response = client.get(url, {'cursor': 'bad'}, HTTP_AUTHORIZATION=auth_token)
+        assert (response.status_code == status.HTTP_400_BAD_REQUEST)
+
+
+class TestNearbyClientsView(object):
+    @pytest.mark.django_db
+    def test_search_clients(self):
+        salon_location = Point(-122.1185007, 37.4009997, srid=4326)
+        near_location = Point(-122.1, 37.4, srid=4326)
+        far_location = Point(-122.5, 37.7, srid=4326)
+        too_far_location = Point(-74.0060, 40.7128, srid=4326)
+
+        def make_client(first_name, photo, location):
+            user = G(User, first_name=first_name, photo=photo, role=[UserRole.CLIENT])
+            return G(Client, user=user, country='US', location=location)
+
+        complete_far = make_client('Fred', 'photo.jpg', far_location)
+        complete_near = make_client('Fred', 'photo.jpg', near_location)
+        # same distance as complete_near, ordered after it by id
+        complete_near_twin = make_client('Fred', 'photo.jpg', near_location)
+        complete_unlocated = make_client('Fred', 'photo.jpg', None)
+        name_only_near = make_client('Fred', '', near_location)
+        no_name_no_photo = make_client('', '', near_location)
+        make_client('Fred', 'photo.jpg', too_far_location)
+        G(Client, user=G(User, first_name='Fred'), country='CA', location=near_location)
+
+        expected_clients = [
+            complete_near, complete_near_twin, complete_far, complete_unlocated,
+            name_only_near, no_name_no_photo
+        ]
+        clients, next_position = NearbyClientsView._search_clients(
+            location=salon_location, country='US')
+        assert(clients == expected_clients)
+        assert(next_position is None)
+
+        # walk through the same list page by page; pages may end between clients
+        # at the same distance
+        for limit in [1, 2]:
+            paged_clients = []
+            next_position = None
+            for page in range(10):
+                page_clients, next_position = NearbyClientsView._search_clients(
+                    location=salon_location, country='US', cursor=next_position,
+                    limit=limit)
+                paged_clients += page_clients
+                if next_position is None:
+                    break
+                next_position = decode_cursor(encode_cursor(next_position))
+            assert(paged_clients == expected_clients)
+
+    @pytest.mark.django_db
+    def test_name_and_photo_completeness_follows_user(self):
+        user = G(User, first_name='', photo='', role=[UserRole.CLIENT])
+        client = G(Client, user=user)
+        assert(client.name_and_photo_completeness == 4)
+        user.first_name = 'Fred'
+        user.save(update_fields=['first_name'])
+        client.refresh_from_db()
+        assert(client.name_and_photo_completeness == 2)
 
 
 class TestClientView(object):
@@ -753,3 +992,21 @@ class TestCommonProfileDetailsView(object):
         assert (response_data['is_preferred'])
         assert (response_data['preference_uuid'] == str(preference_obj.uuid))
         assert (response_data['location'] is None)
+
+    @pytest.mark.django_db
+    def test_working_hours_defaults(self, client, authorized_client_user, stylist_data):
+        client_user, auth_token = authorized_client_user
+        stylist_data.available_days.all().delete()
+        G(StylistAvailableWeekDay, stylist=stylist_data, weekday=Weekday.MONDAY,
+          is_available=False, work_start_at=None, work_end_at=None)
+        url = reverse('api:v1:common:stylist-profile-detail', kwargs={
+            "stylist_uuid": stylist_data.uuid})
+        response_data = client.get(url, HTTP_AUTHORIZATION=auth_token, data={
+            'role': UserRole.CLIENT
+        }).data
+        weekdays = response_data['working_hours']['weekdays']
+        assert ([w['weekday_iso'] for w in weekdays] == list(range(1, 8)))
+        assert (weekdays[0]['is_available'] is False)
+        assert (weekdays[1]['is_available'] is True)
+        # defaults are not saved on read
+        assert (stylist_data.available_days.count() == 1)
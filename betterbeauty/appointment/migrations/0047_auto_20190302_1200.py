@@ -0,0 +1,19 @@
+# Generated by Django 2.1 on 2019-03-02 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0046_auto_20190207_1846'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(
+                fields=['stylist', 'datetime_start_at'], name='appointment_stylist_start_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 2.1 on 2019-03-05 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0095_stylist_email_notifications_enabled'),
+        ('appointment', '0047_auto_20190302_1200'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StylistAppointmentChangeCounter',
+            fields=[
+                ('stylist', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='salon.Stylist')),
+                ('last_change_seq', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'stylist_appointment_change_counter',
+            },
+        ),
+        migrations.CreateModel(
+            name='AppointmentChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_uuid', models.UUIDField()),
+                ('change_seq', models.BigIntegerField()),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('stylist', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='salon.Stylist')),
+            ],
+            options={
+                'db_table': 'appointment_change',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='appointmentchange',
+            unique_together={('stylist', 'appointment_uuid')},
+        ),
+        migrations.AddIndex(
+            model_name='appointmentchange',
+            index=models.Index(fields=['stylist', 'change_seq'], name='appointment_change_seq_idx'),
+        ),
+        # existing appointments are recorded as the first changes of their stylists
+        migrations.RunSQL(
+            """
+            INSERT INTO appointment_change (stylist_id, appointment_uuid, change_seq, is_deleted)
+            SELECT stylist_id, uuid,
+                row_number() OVER (PARTITION BY stylist_id ORDER BY id),
+                deleted_at IS NOT NULL
+            FROM appointment;
+
+            INSERT INTO stylist_appointment_change_counter (stylist_id, last_change_seq)
+            SELECT stylist_id, count(*) FROM appointment GROUP BY stylist_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop
+        ),
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION record_appointment_change(
+                p_stylist_id integer, p_appointment_uuid uuid, p_is_deleted boolean
+            ) RETURNS void AS $$
+            DECLARE
+                v_change_seq bigint;
+            BEGIN
+                INSERT INTO stylist_appointment_change_counter AS c (stylist_id, last_change_seq)
+                VALUES (p_stylist_id, 1)
+                ON CONFLICT (stylist_id) DO UPDATE SET last_change_seq = c.last_change_seq + 1
+                RETURNING last_change_seq INTO v_change_seq;
+
+                INSERT INTO appointment_change (
+                    stylist_id, appointment_uuid, change_seq, is_deleted
+                ) VALUES (p_stylist_id, p_appointment_uuid, v_change_seq, p_is_deleted)
+                ON CONFLICT (stylist_id, appointment_uuid) DO UPDATE
+                SET change_seq = EXCLUDED.change_seq, is_deleted = EXCLUDED.is_deleted;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            CREATE FUNCTION appointment_change_trigger() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    PERFORM record_appointment_change(OLD.stylist_id, OLD.uuid, true);
+                    RETURN NULL;
+                END IF;
+                IF TG_OP = 'UPDATE' AND OLD.stylist_id <> NEW.stylist_id THEN
+                    PERFORM record_appointment_change(OLD.stylist_id, OLD.uuid, true);
+                END IF;
+                PERFORM record_appointment_change(
+                    NEW.stylist_id, NEW.uuid, NEW.deleted_at IS NOT NULL
+                );
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            CREATE FUNCTION appointment_child_change_trigger() RETURNS trigger AS $$
+            DECLARE
+                v_appointment_id integer;
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    v_appointment_id := OLD.appointment_id;
+                ELSE
+                    v_appointment_id := NEW.appointment_id;
+                END IF;
+                -- appointment itself may be already deleted
+                PERFORM record_appointment_change(a.stylist_id, a.uuid, a.deleted_at IS NOT NULL)
+                FROM appointment a WHERE a.id = v_appointment_id;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER appointment_change AFTER INSERT OR UPDATE OR DELETE
+            ON appointment FOR EACH ROW EXECUTE PROCEDURE appointment_change_trigger();
+
+            CREATE TRIGGER appointment_service_change AFTER INSERT OR UPDATE OR DELETE
+            ON appointment_service
+            FOR EACH ROW EXECUTE PROCEDURE appointment_child_change_trigger();
+
+            CREATE TRIGGER appointment_status_history_change AFTER INSERT OR UPDATE OR DELETE
+            ON appointment_status_history
+            FOR EACH ROW EXECUTE PROCEDURE appointment_child_change_trigger();
+            """,
+            reverse_sql="""
+            DROP TRIGGER appointment_status_history_change ON appointment_status_history;
+            DROP TRIGGER appointment_service_change ON appointment_service;
+            DROP TRIGGER appointment_change ON appointment;
+            DROP FUNCTION appointment_child_change_trigger();
+            DROP FUNCTION appointment_change_trigger();
+            DROP FUNCTION record_appointment_change(integer, uuid, boolean);
+            """
+        ),
+    ]
@@ -134,6 +134,11 @@ class Appointment(models.Model):
 
     class Meta:
         db_table = 'appointment'
+        indexes = [
+            models.Index(
+                fields=['stylist', 'datetime_start_at'], name='appointment_stylist_start_idx'
+            ),
+        ]
 
     def __str__(self):
         return '{0}: {1} - {2}'.format(
@@ -494,3 +499,43 @@ class AppointmentService(models.Model):
                 'client_price', 'regular_price', 'is_price_edited', 'applied_discount',
                 'discount_percentage',
             ])
+
+
+class StylistAppointmentChangeCounter(models.Model):
+    """
+    Last change sequence number of stylist's appointments. Row is locked by the
+    change until commit, so changes of the same stylist commit in sequence order
+    and clients never skip a change which was committed late.
+    """
+    stylist = models.OneToOneField(
+        Stylist, primary_key=True, related_name='+', on_delete=models.DO_NOTHING,
+        db_constraint=False
+    )
+    last_change_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'stylist_appointment_change_counter'
+
+
+class AppointmentChange(models.Model):
+    """
+    Latest change of an appointment in stylist's changes feed. Rows are
+    maintained by DB triggers on appointment, appointment_service and
+    appointment_status_history tables (see migration 0048), so that every
+    change is recorded, including queryset updates. Stylist isn't a real
+    foreign key, because rows are also written while stylist is being deleted.
+    """
+    stylist = models.ForeignKey(
+        Stylist, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    appointment_uuid = models.UUIDField()
+    change_seq = models.BigIntegerField()
+    # appointment was deleted, or moved to another stylist
+    is_deleted = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'appointment_change'
+        unique_together = ('stylist', 'appointment_uuid', )
+        indexes = [
+            models.Index(fields=['stylist', 'change_seq'], name='appointment_change_seq_idx'),
+        ]
@@ -0,0 +1,61 @@
+from typing import Dict
+
+from django.conf import settings
+from django.db import transaction
+
+from integrations.slack import send_slack_auto_booking_notification
+from notifications.utils import generate_new_appointment_notification
+from .models import Appointment
+from .utils import (
+    appointments_to_insert_to_client_calendar,
+    appointments_to_insert_to_stylist_calendar,
+)
+
+
+def get_appointment(payload: Dict) -> Appointment:
+    return Appointment.objects.select_related(
+        'stylist__user', 'stylist__salon', 'client__user',
+    ).get(id=payload['appointment_id'])
+
+
+def handle_new_appointment_notification(payload: Dict, last_attempt: bool=False):
+    appointment = get_appointment(payload)
+    # job may be retried after notification was created
+    if appointment.stylist_new_appointment_notification_id:
+        return
+    generate_new_appointment_notification(appointment)
+
+
+def handle_slack_auto_booking(payload: Dict, last_attempt: bool=False):
+    send_slack_auto_booking_notification(get_appointment(payload))
+
+
+def handle_google_calendar_sync(payload: Dict, last_attempt: bool=False):
+    """
+    Bring calendar events of the appointment in sync with it. Events of rescheduled
+    appointment are re-created, because we do not update existing events.
+
+    Appointment is locked, so that calendar commands running at the same time skip
+    it instead of creating the same events again. Like generate_google_calendar_events
+    command, events are only created when sync is enabled for stylists or clients,
+    and for appointments which that command would add to their calendars.
+    """
+    with transaction.atomic():
+        appointment: Appointment = Appointment.objects.select_related(
+            'stylist__user', 'stylist__salon', 'client__user',
+        ).select_for_update(of=('self', )).get(id=payload['appointment_id'])
+        stylist_sync_enabled = settings.GOOGLE_CALENDAR_STYLIST_SYNC_ENABLED
+        client_sync_enabled = settings.GOOGLE_CALENDAR_CLIENT_SYNC_ENABLED
+        if payload.get('reschedule', False):
+            if client_sync_enabled:
+                appointment.cancel_client_google_calendar_event(ignore_status=True)
+            if stylist_sync_enabled:
+                appointment.cancel_stylist_google_calendar_event(ignore_status=True)
+        if stylist_sync_enabled and appointments_to_insert_to_stylist_calendar().filter(
+                id=appointment.id
+        ).exists():
+            appointment.create_stylist_google_calendar_event()
+        if client_sync_enabled and appointments_to_insert_to_client_calendar().filter(
+                id=appointment.id
+        ).exists():
+            appointment.create_client_google_calendar_event()
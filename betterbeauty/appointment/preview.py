@@ -11,10 +11,11 @@ from appointment.types import AppointmentStatus
 from client.models import Client
 from core.types import AppointmentPrices
 from core.utils import calculate_appointment_prices
+from pricing import CalculatedPrice
 from salon.models import Stylist, StylistService
 from salon.utils import (
-    calculate_price_and_discount_for_client_on_date,
     calculate_price_with_discount_based_on_appointment,
+    calculate_prices_and_discounts_for_client_on_date,
 )
 
 
@@ -60,6 +61,12 @@ def build_appointment_preview_dict(
         client: Optional[Client],
         preview_request: AppointmentPreviewRequest
 ) -> AppointmentPreviewResponse:
+    """
+    Build preview of a new or existing appointment. Requested services which are
+    already in the appointment and stylist's services to be added are loaded in
+    2 queries, and all the added services are priced together, so preview takes
+    the same number of queries regardless of the number of services
+    """
     service_items: List[AppointmentServicePreview] = []
     appointment: Optional[Appointment] = None
     status = AppointmentStatus.NEW
@@ -72,12 +79,52 @@ def build_appointment_preview_dict(
     total_discount_percentage: int = 0
     if appointment:
         total_discount_percentage = appointment.total_discount_percentage
+
+    requested_service_uuids = [
+        item['service_uuid'] for item in preview_request.services
+    ]
+    appointment_services: Dict[UUID, AppointmentService] = {}
+    if appointment:
+        # if the same service is in appointment more than once, the last one is used
+        for appointment_service in appointment.services.filter(
+            service_uuid__in=requested_service_uuids
+        ).order_by('id'):
+            appointment_service.appointment = appointment
+            appointment_services[appointment_service.service_uuid] = appointment_service
+    new_service_uuids = [
+        service_uuid for service_uuid in requested_service_uuids
+        if service_uuid not in appointment_services
+    ]
+    stylist_services: Dict[UUID, StylistService] = {}
+    if new_service_uuids:
+        stylist_services = {
+            service.uuid: service for service in stylist.services.filter(
+                uuid__in=new_service_uuids
+            )
+        }
+        for service_uuid in new_service_uuids:
+            if service_uuid not in stylist_services:
+                raise StylistService.DoesNotExist()
+
+    # if the appointment we're previewing is based on the existing appointment - we will
+    # just take discount percentage from it. Otherwise, we need to run pricing calculation
+    # for given client and stylist on the given date (for all new services at once),
+    # and see if there is any discount there
+    calculated_prices: Dict[UUID, CalculatedPrice] = {}
+    if not appointment and stylist_services:
+        priced_services = list(stylist_services.values())
+        calculated_prices = dict(zip(
+            [service.uuid for service in priced_services],
+            calculate_prices_and_discounts_for_client_on_date(
+                stylist=stylist, services=priced_services, client=client,
+                date=preview_request.datetime_start_at.date()
+            )
+        ))
+
     for service_request_item in preview_request.services:
-        appointment_service: Optional[AppointmentService] = None
-        if appointment:
-            appointment_service = appointment.services.filter(
-                service_uuid=service_request_item['service_uuid']
-            ).last()
+        appointment_service: Optional[AppointmentService] = appointment_services.get(
+            service_request_item['service_uuid'], None
+        )
         service_client_price: Optional[Decimal] = service_request_item[
             'client_price'
         ] if 'client_price' in service_request_item else None
@@ -105,9 +152,7 @@ def build_appointment_preview_dict(
         else:
             # appointment service doesn't exist in appointment yet, and is to be added, so we
             # need to calculate the price for it.
-            service: StylistService = stylist.services.get(
-                uuid=service_request_item['service_uuid']
-            )
+            service: StylistService = stylist_services[service_request_item['service_uuid']]
             # We need to decide what we use for the base price. If client_price is supplied
             # we will use it as a base price. Otherwise, we will take base price from stylist's
             # service
@@ -116,15 +161,8 @@ def build_appointment_preview_dict(
             else:
                 regular_price = service_client_price
             # now when we know the base price, we need to calculate price with discount.
-            # if the appointment we're previewing is based on the existing appointment -
-            # we will just take discount percentage from it. Otherwise, we need to run
-            # pricing calculation for given client and stylist on the given date, and see
-            # if there is any discount there
             if not appointment:
-                calculated_price = calculate_price_and_discount_for_client_on_date(
-                    service=service, client=client,
-                    date=preview_request.datetime_start_at.date()
-                )
+                calculated_price = calculated_prices[service.uuid]
                 client_price = Decimal(calculated_price.price)
                 if not total_discount_percentage:
                     total_discount_percentage = calculated_price.discount_percentage
@@ -155,18 +193,11 @@ def build_appointment_preview_dict(
     )
     duration = stylist.service_time_gap
 
-    conflicts_with = stylist.get_appointments_in_datetime_range(
-        preview_request.datetime_start_at,
-        preview_request.datetime_start_at,
-        including_to=True,
-        exclude_statuses=[
-            AppointmentStatus.CANCELLED_BY_STYLIST,
-            AppointmentStatus.CANCELLED_BY_CLIENT
-        ]
-    )
     return AppointmentPreviewResponse(
         duration=duration,
-        conflicts_with=conflicts_with,
+        conflicts_with=get_conflicting_appointments(
+            stylist, preview_request.datetime_start_at
+        ),
         total_client_price_before_tax=appointment_prices.total_client_price_before_tax,
         grand_total=appointment_prices.grand_total,
         tax_percentage=float(stylist.tax_rate) * 100,
@@ -184,3 +215,21 @@ def build_appointment_preview_dict(
             total_regular_price - total_client_price_before_tax, Decimal(0)
         )
     )
+
+
+def get_conflicting_appointments(
+        stylist: Stylist, datetime_start_at: datetime.datetime
+) -> QuerySet:
+    """
+    Return stylist's active appointments which are in progress at the given time.
+    All stylist's appointments have the same duration (service time gap), so
+    these are appointments started within the gap before the given time; this
+    is a plain range condition on (stylist, datetime_start_at) index
+    """
+    return stylist.appointments.filter(
+        datetime_start_at__gt=datetime_start_at - stylist.service_time_gap,
+        datetime_start_at__lt=datetime_start_at,
+    ).exclude(status__in=[
+        AppointmentStatus.CANCELLED_BY_STYLIST,
+        AppointmentStatus.CANCELLED_BY_CLIENT
+    ]).select_related('stylist').prefetch_related('services').order_by('datetime_start_at')
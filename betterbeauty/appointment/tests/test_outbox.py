@@ -0,0 +1,55 @@
+import datetime
+
+import mock
+import pytest
+import pytz
+from django.test import override_settings
+from django_dynamic_fixture import G
+
+from appointment.models import Appointment, AppointmentStatus
+from appointment.outbox import handle_google_calendar_sync
+from client.models import Client
+from salon.models import Stylist
+
+
+@pytest.mark.django_db
+def test_handle_google_calendar_sync():
+    integration_added_at = pytz.UTC.localize(datetime.datetime(2018, 11, 20, 10, 0))
+    client = G(
+        Client, google_access_token='access', google_refresh_token='refresh',
+        google_integration_added_at=integration_added_at
+    )
+    stylist = G(
+        Stylist, google_access_token='access', google_refresh_token='refresh',
+        google_integration_added_at=integration_added_at
+    )
+    # events are only created for appointments starting after stylist or client
+    # added google integration
+    appointment_before_integration = G(
+        Appointment, client=client, stylist=stylist, status=AppointmentStatus.NEW,
+        client_google_calendar_id=None, stylist_google_calendar_id=None,
+        datetime_start_at=integration_added_at - datetime.timedelta(days=1)
+    )
+    appointment = G(
+        Appointment, client=client, stylist=stylist, status=AppointmentStatus.NEW,
+        client_google_calendar_id=None, stylist_google_calendar_id=None,
+        datetime_start_at=integration_added_at + datetime.timedelta(days=1)
+    )
+    with mock.patch.object(
+        Appointment, 'create_client_google_calendar_event'
+    ) as create_client_event_mock, mock.patch.object(
+        Appointment, 'create_stylist_google_calendar_event'
+    ) as create_stylist_event_mock:
+        handle_google_calendar_sync({'appointment_id': appointment_before_integration.id})
+        assert(create_stylist_event_mock.call_count == 0)
+        assert(create_client_event_mock.call_count == 0)
+        with override_settings(
+                GOOGLE_CALENDAR_STYLIST_SYNC_ENABLED=False,
+                GOOGLE_CALENDAR_CLIENT_SYNC_ENABLED=False
+        ):
+            handle_google_calendar_sync({'appointment_id': appointment.id})
+        assert(create_stylist_event_mock.call_count == 0)
+        assert(create_client_event_mock.call_count == 0)
+        handle_google_calendar_sync({'appointment_id': appointment.id})
+        assert(create_stylist_event_mock.call_count == 1)
+        assert(create_client_event_mock.call_count == 1)
@@ -14,6 +14,7 @@ from appointment.preview import (
     AppointmentPreviewResponse,
     AppointmentServicePreview,
     build_appointment_preview_dict,
+    get_conflicting_appointments,
 )
 from appointment.types import AppointmentStatus
 from client.models import Client
@@ -82,10 +83,10 @@ class TestBuildAppointmentPreviewDict(object):
 
     @pytest.mark.django_db
     @mock.patch(
-        'appointment.preview.calculate_price_and_discount_for_client_on_date',
-        lambda service, client, date: CalculatedPrice.build(
+        'appointment.preview.calculate_prices_and_discounts_for_client_on_date',
+        lambda stylist, services, client, date: [CalculatedPrice.build(
             19, DiscountType.WEEKDAY, 5
-        )
+        ) for service in services]
     )
     def test_without_existing_appointment_with_new_services(self):
         stylist: Stylist = G(Stylist)
@@ -232,10 +233,10 @@ class TestBuildAppointmentPreviewDict(object):
 
     @pytest.mark.django_db
     @mock.patch(
-        'appointment.preview.calculate_price_and_discount_for_client_on_date',
-        lambda service, client, date: CalculatedPrice.build(
+        'appointment.preview.calculate_prices_and_discounts_for_client_on_date',
+        lambda stylist, services, client, date: [CalculatedPrice.build(
             19, DiscountType.WEEKDAY, 5
-        )
+        ) for service in services]
     )
     def test_with_existing_client(self):
         stylist: Stylist = G(Stylist)
@@ -286,3 +287,22 @@ class TestBuildAppointmentPreviewDict(object):
             card_fee_percentage=float(stylist.card_fee) * 100,
 
         ))
+
+    @pytest.mark.django_db
+    def test_conflicts_with(self):
+        stylist: Stylist = G(Stylist, service_time_gap=datetime.timedelta(minutes=30))
+        start = datetime.datetime(2018, 1, 1, 10, 0, tzinfo=pytz.UTC)
+        in_progress = G(
+            Appointment, stylist=stylist, datetime_start_at=start - datetime.timedelta(
+                minutes=20), status=AppointmentStatus.NEW
+        )
+        G(
+            Appointment, stylist=stylist, datetime_start_at=start - datetime.timedelta(
+                minutes=10), status=AppointmentStatus.CANCELLED_BY_CLIENT
+        )
+        G(
+            Appointment, stylist=stylist, datetime_start_at=start - datetime.timedelta(
+                minutes=30), status=AppointmentStatus.NEW
+        )
+        G(Appointment, datetime_start_at=start - datetime.timedelta(minutes=20))
+        assert (list(get_conflicting_appointments(stylist, start)) == [in_progress])
@@ -43,6 +43,16 @@ def get_appointments_in_datetime_range(
     return queryset.filter(**kwargs)
 
 
+def select_appointment_list_related(queryset: models.QuerySet) -> models.QuerySet:
+    """
+    Join and prefetch objects which are serialized with every appointment of
+    appointment lists, so that serializing a list doesn't query them per appointment
+    """
+    return queryset.select_related(
+        'client__user', 'stylist__user', 'stylist__salon'
+    ).prefetch_related('services')
+
+
 def appointments_to_insert_to_stylist_calendar() -> models.QuerySet:
     """
     Eligible appointments must match the following criteria:
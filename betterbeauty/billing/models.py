@@ -80,8 +80,16 @@ class Charge(models.Model):
             self.appointment
         )
 
-    @transaction.atomic
-    def run_stripe_charge(self) -> ChargeStatus:
+    def run_stripe_charge(self, keep_pending_on_error: bool=False) -> ChargeStatus:
+        """
+        Charge the client and record the outcome; Stripe errors are re-raised after
+        the outcome is saved, so that the save is not rolled back together with
+        the savepoint of this method.
+
+        :param keep_pending_on_error: if set to True, charge is left unchanged on
+        errors other than card errors (e.g. network or API errors), so that it can
+        be retried
+        """
         # we should only allow running charges once
         if self.status != ChargeStatus.PENDING or self.stripe_id or not self.stylist:
             return self.status
@@ -94,23 +102,28 @@ class Charge(models.Model):
                 source_description=self.description,
                 destination_description=self.stylist_description,
                 payment_method_stripe_id=self.payment_method.stripe_id,
+                idempotency_key='charge-{0}'.format(self.uuid),
                 made_appointment_uuid=str(self.appointment.uuid),
                 made_charge_uuid=str(self.uuid),
                 made_client_uuid=str(self.client.uuid),
                 made_stylist_uuid=str(self.stylist.uuid)
             )
-            if charge_id:
+        except (CardError, StripeError, StripeErrorWithParamCode) as error:
+            if keep_pending_on_error and not isinstance(error, CardError):
+                raise
+            error_data = format_stripe_error_data(error)
+            with transaction.atomic():
+                self.status = ChargeStatus.FAILED
+                self.error_data = error_data
+                self.save(update_fields=['status', 'error_data'])
+                send_stripe_charge_notification(self, error_data['message'])
+            raise
+        if charge_id:
+            with transaction.atomic():
                 self.stripe_id = charge_id
                 self.status = ChargeStatus.SUCCESS
                 self.charged_at = timezone.now()
                 self.save(update_fields=['stripe_id', 'status', 'charged_at', ])
                 send_stripe_charge_notification(self)
-                return ChargeStatus.SUCCESS
-        except (CardError, StripeError, StripeErrorWithParamCode) as error:
-            self.status = ChargeStatus.FAILED
-            error_data = format_stripe_error_data(error)
-            self.error_data = error_data
-            self.save(update_fields=['status', 'error_data'])
-            send_stripe_charge_notification(self, error_data['message'])
-            raise
+            return ChargeStatus.SUCCESS
         return ChargeStatus.FAILED
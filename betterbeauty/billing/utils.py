@@ -1,6 +1,6 @@
 import logging
 from decimal import Decimal
-from typing import Optional, Tuple, Union
+from typing import Dict, Optional, Tuple, Union
 
 import stripe
 from django.conf import settings
@@ -8,8 +8,8 @@ from django.db import transaction
 from stripe.error import CardError, StripeError, StripeErrorWithParamCode
 from stripe.oauth import OAuth
 
-from .models import PaymentMethod
-from .types import CardRecord, PaymentMethodType
+from .models import Charge, PaymentMethod
+from .types import CardRecord, ChargeStatus, PaymentMethodType
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 logger = logging.getLogger(__name__)
@@ -132,6 +132,7 @@ def run_charge(
         source_description: str,
         destination_description: str,
         payment_method_stripe_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
         **metadata
 ) -> Optional[str]:
     """
@@ -146,6 +147,8 @@ def run_charge(
            how it will show in Client's bank statement
     :param destination_description: description of transfer,
            how it will show in Stylist's bank statement
+    :param idempotency_key: Stripe idempotency key; retried requests with the same
+           key don't create another charge
     :return: stripe id of the charge if successful, None otherwise
     """
     if amount <= 0.0:
@@ -166,6 +169,8 @@ def run_charge(
     }
     if payment_method_stripe_id is not None:
         charge_data['source'] = payment_method_stripe_id
+    if idempotency_key is not None:
+        charge_data['idempotency_key'] = idempotency_key
     charge = stripe.Charge.create(**charge_data)
     if charge.transfer:
         # When a charge is created, we're setting description only on payment (e.g. it is
@@ -192,3 +197,21 @@ def create_connected_account_from_client_token(auth_code: str) -> Tuple[str, str
     }
     response = OAuth.token(**stripe_oauth_params)
     return response['stripe_user_id'], response['access_token'], response['refresh_token']
+
+
+def handle_stripe_charge(payload: Dict, last_attempt: bool=False):
+    """
+    Outbox job handler running pending charge; payload has `charge_id` key. Charge
+    failing with network or API error stays pending and the job is retried by
+    the outbox worker, which records the error as job's last_error; charge's
+    idempotency key guarantees that client is never charged twice. Card errors
+    and errors of the last attempt fail the charge.
+    """
+    charge: Charge = Charge.objects.get(id=payload['charge_id'])
+    try:
+        charge.run_stripe_charge(keep_pending_on_error=not last_attempt)
+    except (StripeError, StripeErrorWithParamCode):
+        if charge.status == ChargeStatus.PENDING:
+            raise
+        # charge is marked failed; job must complete, otherwise the failure
+        # would be rolled back together with the job
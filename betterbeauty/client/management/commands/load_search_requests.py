@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from client.search_log import load_search_requests_from_fallback
+
+
+class Command(BaseCommand):
+    """
+    Load stylist search requests which could not be written to the DB by
+    search request buffer and were saved to the fallback file instead
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-d',
+            '--dry-run',
+            action='store_true',
+            dest='dry_run',
+            help="Dry-run. Don't actually do anything.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        loaded_count = load_search_requests_from_fallback(dry_run=dry_run)
+        self.stdout.write('{0} search requests loaded{1}'.format(
+            loaded_count, ' with dry run' if dry_run else ''
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 2.1 on 2019-03-01 12:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0035_client_email_notifications_enabled'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stylistsearchrequest',
+            name='created_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name='stylistsearchrequest',
+            name='requested_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
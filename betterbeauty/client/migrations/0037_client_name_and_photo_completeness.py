@@ -0,0 +1,42 @@
+# Generated by Django 2.1 on 2019-03-02 10:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0036_auto_20190301_1200'),
+    ]
+
+    operations = [
+        # required to combine integer column and location in one GiST index
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='client',
+            name='name_and_photo_completeness',
+            field=models.PositiveSmallIntegerField(default=4),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE client SET name_and_photo_completeness = CASE
+                WHEN u.first_name <> '' AND coalesce(u.photo, '') <> '' THEN 1
+                WHEN u.first_name <> '' THEN 2
+                WHEN coalesce(u.photo, '') <> '' THEN 3
+                ELSE 4
+            END
+            FROM "user" u
+            WHERE u.id = client.user_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=['name_and_photo_completeness', 'location'],
+                name='client_completeness_loc_gist'
+            ),
+        ),
+    ]
@@ -6,6 +6,7 @@ from uuid import uuid4
 from django.apps import apps
 from django.contrib.gis.db.models import PointField
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
 from django.db.models import Q
 from django.utils import timezone
@@ -13,7 +14,7 @@ from django.utils import timezone
 from appointment.types import AppointmentStatus
 from appointment.utils import get_appointments_in_datetime_range
 from core.models import User
-from integrations.gmaps import GeoCode
+from integrations.gmaps import GeoCode, GeoCodedAddress
 from utils.models import SmartModel
 
 from .types import CLIENT_PRIVACY_CHOICES, ClientPrivacy
@@ -33,6 +34,9 @@ class Client(models.Model):
     country = models.CharField(max_length=20, blank=True, null=True)
     location = PointField(geography=True, null=True, blank=True)
     profile_completeness = models.FloatField(default=0.0, blank=True, null=True)
+    # rank used to order nearby clients, from 1 (has first name and photo)
+    # to 4 (has neither); kept in sync with user in save()
+    name_and_photo_completeness = models.PositiveSmallIntegerField(default=4)
     is_address_geocoded = models.BooleanField(default=False)
     last_geo_coded = models.DateTimeField(blank=True, null=True, default=None)
 
@@ -53,7 +57,9 @@ class Client(models.Model):
     stripe_id = models.CharField(null=True, blank=True, max_length=64, default=None)
 
     def geo_code_address(self):
-        geo_coded_address = GeoCode(self.zip_code).geo_code(country=self.country)
+        self.apply_geo_coded_address(GeoCode(self.zip_code).geo_code(country=self.country))
+
+    def apply_geo_coded_address(self, geo_coded_address: Optional[GeoCodedAddress]):
         if geo_coded_address:
             self.city = geo_coded_address.city
             self.state = geo_coded_address.state
@@ -72,6 +78,13 @@ class Client(models.Model):
 
     class Meta:
         db_table = 'client'
+        indexes = [
+            # allows KNN ordering by location within each completeness rank
+            GistIndex(
+                fields=['name_and_photo_completeness', 'location'],
+                name='client_completeness_loc_gist'
+            ),
+        ]
 
     def get_full_name(self) -> str:
         return self.user.get_full_name()
@@ -145,6 +158,20 @@ class Client(models.Model):
             'google_access_token', 'google_refresh_token', 'google_integration_added_at'
         ])
 
+    def get_name_and_photo_completeness(self) -> int:
+        """
+        Profile completeness ranking is calculated in the following order
+         1. Has first name, has photo
+         2. Has first name, no photo
+         3. No first name, has photo
+         4. No first name, No photo
+        """
+        has_first_name = bool(self.user.first_name)
+        has_photo = bool(self.user.photo)
+        if has_first_name:
+            return 1 if has_photo else 2
+        return 3 if has_photo else 4
+
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
         fields = [self.user.first_name,
@@ -158,8 +185,10 @@ class Client(models.Model):
             if field:
                 complete_fields += 1
         self.profile_completeness = float(complete_fields / total_fields)
+        self.name_and_photo_completeness = self.get_name_and_photo_completeness()
         if update_fields:
             update_fields.append('profile_completeness')
+            update_fields.append('name_and_photo_completeness')
         return super(Client, self).save(force_insert=force_insert, force_update=force_update,
                                         using=using, update_fields=update_fields)
 
@@ -180,11 +209,11 @@ class PreferredStylist(SmartModel):
 class StylistSearchRequest(models.Model):
 
     requested_by = models.ForeignKey(User, on_delete=models.CASCADE)
-    requested_at = models.DateTimeField(auto_now_add=True)
+    requested_at = models.DateTimeField(default=timezone.now)
     user_location = PointField(srid=4326, null=True)
     user_ip_addr = models.GenericIPAddressField(null=True)
     stylists_found = ArrayField(models.IntegerField(), default=list)
-    created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
 
     class Meta:
         db_table = 'stylist_search_request'
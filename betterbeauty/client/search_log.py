@@ -0,0 +1,208 @@
+import atexit
+import datetime
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dateutil.parser import parse
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import User
+from .models import StylistSearchRequest
+
+logger = logging.getLogger(__name__)
+
+
+def search_request_to_dict(search_request: StylistSearchRequest) -> Dict:
+    location = search_request.user_location
+    return {
+        'requested_by_id': search_request.requested_by_id,
+        'requested_at': search_request.requested_at.isoformat(),
+        'user_location': [location.x, location.y] if location else None,
+        'user_ip_addr': search_request.user_ip_addr,
+        'stylists_found': search_request.stylists_found,
+    }
+
+
+def search_request_from_dict(data: Dict) -> StylistSearchRequest:
+    location = data.get('user_location', None)
+    requested_at: datetime.datetime = parse(data['requested_at'])
+    return StylistSearchRequest(
+        requested_by_id=data['requested_by_id'],
+        requested_at=requested_at,
+        created_at=requested_at,
+        user_location=Point(location[0], location[1]) if location else None,
+        user_ip_addr=data.get('user_ip_addr', None),
+        stylists_found=data.get('stylists_found', []),
+    )
+
+
+def write_search_requests_to_fallback(search_requests: List[StylistSearchRequest]):
+    """Append search requests to the fallback file, one json object per line"""
+    with open(str(settings.STYLIST_SEARCH_LOG_FALLBACK_PATH), 'a') as fallback_file:
+        for search_request in search_requests:
+            fallback_file.write(json.dumps(search_request_to_dict(search_request)) + '\n')
+    logger.warning('{0} search requests written to fallback file {1}'.format(
+        len(search_requests), settings.STYLIST_SEARCH_LOG_FALLBACK_PATH
+    ))
+
+
+@transaction.atomic
+def load_search_requests_from_fallback(dry_run: bool=False) -> int:
+    """
+    Write search requests saved to the fallback file to the DB and remove the file.
+    The file is renamed before reading, so processes which keep appending to the
+    fallback at the same time start a new file rather than lose their writes.
+
+    :param dry_run: if set to True, only count requests, don't write them to the DB
+    :return: number of search requests loaded
+    """
+    fallback_path = Path(settings.STYLIST_SEARCH_LOG_FALLBACK_PATH)
+    loading_path = fallback_path.with_suffix('.loading')
+    # a file left from previously failed loading is loaded first
+    if not loading_path.exists():
+        if not fallback_path.exists():
+            return 0
+        if dry_run:
+            loading_path = fallback_path
+        else:
+            fallback_path.rename(loading_path)
+    with open(str(loading_path)) as fallback_file:
+        search_requests = [
+            search_request_from_dict(json.loads(line)) for line in fallback_file if line.strip()
+        ]
+    if not dry_run:
+        StylistSearchRequest.objects.bulk_create(search_requests, batch_size=1000)
+        transaction.on_commit(loading_path.unlink)
+    return len(search_requests)
+
+
+class SearchRequestBuffer(object):
+    """
+    Collects search requests in memory and writes them to the DB with a single
+    bulk_create, either when buffer reaches max_size or every flush_interval
+    seconds, whichever comes first. Writes happen on a background daemon thread,
+    so request threads never wait for the DB. On interpreter shutdown remaining
+    requests are flushed; if the DB is not reachable, they go to the fallback file.
+    If requests can't be flushed at all, at most `capacity` of them are kept and
+    the rest are dropped.
+    """
+    def __init__(self, max_size: int, flush_interval: float, capacity: int) -> None:
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self._buffer: List[StylistSearchRequest] = []
+        self._dropped_count = 0
+        self._lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def add(self, search_request: StylistSearchRequest):
+        with self._lock:
+            if len(self._buffer) >= self.capacity:
+                if not self._dropped_count:
+                    logger.warning(
+                        'Search request buffer is full, dropping search requests'
+                    )
+                self._dropped_count += 1
+            else:
+                self._buffer.append(search_request)
+            should_flush = len(self._buffer) >= self.max_size
+            if self._thread is None:
+                self._start()
+            elif not self._thread.is_alive():
+                logger.error('Search request buffer thread died, restarting it')
+                self._start()
+        if should_flush:
+            self._flush_requested.set()
+
+    def flush(self) -> int:
+        """
+        Write all buffered search requests to the DB.
+
+        :return: number of search requests written to the DB
+        """
+        with self._lock:
+            search_requests, self._buffer = self._buffer, []
+            dropped_count, self._dropped_count = self._dropped_count, 0
+        if dropped_count:
+            logger.warning('{0} search requests were dropped'.format(dropped_count))
+        if not search_requests:
+            return 0
+        try:
+            StylistSearchRequest.objects.bulk_create(search_requests)
+        except Exception:
+            logger.exception('Could not write {0} search requests to the DB'.format(
+                len(search_requests)))
+            write_search_requests_to_fallback(search_requests)
+            return 0
+        return len(search_requests)
+
+    def _start(self):
+        if self._thread is None:
+            atexit.register(self.flush)
+        self._thread = threading.Thread(
+            target=self._run, name='search-request-buffer', daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._flush_requested.wait(timeout=self.flush_interval)
+            self._flush_requested.clear()
+            started_at = time.monotonic()
+            flushed_count = 0
+            try:
+                flushed_count = self.flush()
+            except Exception:
+                # e.g. fallback file is not writable; the thread must survive,
+                # otherwise the buffer is never flushed again
+                logger.exception('Could not flush search requests')
+            finally:
+                # this thread owns its own DB connection; don't keep it open
+                # between flushes
+                connection.close()
+            if flushed_count:
+                logger.debug('{0} search requests flushed in {1:.3f}s'.format(
+                    flushed_count, time.monotonic() - started_at))
+
+
+search_request_buffer = SearchRequestBuffer(
+    max_size=settings.STYLIST_SEARCH_LOG_BUFFER_MAX_SIZE,
+    flush_interval=settings.STYLIST_SEARCH_LOG_FLUSH_INTERVAL_SECONDS,
+    capacity=settings.STYLIST_SEARCH_LOG_BUFFER_CAPACITY
+)
+
+
+def log_search_request(
+        requested_by: User, user_ip_addr: Optional[str], user_location: Optional[Point],
+        stylists_found: List[int]
+):
+    """
+    Record that search was made. Unless buffering is disabled, the request is
+    written to the DB later, in bulk with other requests.
+    """
+    # requested_at and created_at are set here rather than on insert, so that
+    # weekly search appearance rollups count the request at the time it was made
+    now = timezone.now()
+    search_request = StylistSearchRequest(
+        requested_by=requested_by,
+        requested_at=now,
+        created_at=now,
+        user_ip_addr=user_ip_addr,
+        user_location=user_location,
+        stylists_found=stylists_found
+    )
+    if not settings.STYLIST_SEARCH_LOG_BUFFER_ENABLED:
+        search_request.save()
+        return
+    search_request_buffer.add(search_request)
@@ -0,0 +1,134 @@
+import datetime
+import time
+
+import mock
+import pytest
+import pytz
+from django.contrib.gis.geos import Point
+from django.test import override_settings
+from django_dynamic_fixture import G
+from freezegun import freeze_time
+
+from client.models import StylistSearchRequest
+from client.search_log import (
+    load_search_requests_from_fallback,
+    log_search_request,
+    SearchRequestBuffer,
+)
+from core.models import User
+
+
+class TestSearchRequestBuffer(object):
+    @pytest.mark.django_db
+    def test_flush(self):
+        user = G(User)
+        buffer = SearchRequestBuffer(max_size=10, flush_interval=60, capacity=100)
+        buffer._buffer = [
+            StylistSearchRequest(requested_by=user, stylists_found=[1, 2]),
+            StylistSearchRequest(requested_by=user, stylists_found=[3]),
+        ]
+        assert(buffer.flush() == 2)
+        assert(len(buffer) == 0)
+        assert(StylistSearchRequest.objects.count() == 2)
+        assert(buffer.flush() == 0)
+
+    def test_add_requests_flush_at_max_size(self):
+        buffer = SearchRequestBuffer(max_size=2, flush_interval=60, capacity=100)
+        with mock.patch.object(buffer, '_start') as start_mock:
+            buffer.add(StylistSearchRequest())
+            assert(start_mock.call_count == 1)
+            assert(not buffer._flush_requested.is_set())
+            buffer._thread = mock.Mock()
+            buffer.add(StylistSearchRequest())
+            assert(start_mock.call_count == 1)
+            assert(buffer._flush_requested.is_set())
+        assert(len(buffer) == 2)
+
+    def test_add_drops_requests_when_full(self):
+        buffer = SearchRequestBuffer(max_size=2, flush_interval=60, capacity=3)
+        with mock.patch.object(buffer, '_start'):
+            for i in range(5):
+                buffer.add(StylistSearchRequest())
+                buffer._thread = mock.Mock()
+        assert(len(buffer) == 3)
+        assert(buffer._dropped_count == 2)
+        with mock.patch.object(StylistSearchRequest.objects, 'bulk_create'):
+            assert(buffer.flush() == 3)
+        assert(buffer._dropped_count == 0)
+
+    def test_thread_survives_failed_flush(self, tmpdir):
+        buffer = SearchRequestBuffer(max_size=1, flush_interval=60, capacity=100)
+        # fallback file can't be written to a directory which doesn't exist
+        with override_settings(
+                STYLIST_SEARCH_LOG_FALLBACK_PATH=str(tmpdir.join('missing', 'fallback.jsonl'))
+        ):
+            with mock.patch.object(
+                    StylistSearchRequest.objects, 'bulk_create', side_effect=Exception
+            ) as bulk_create_mock:
+                buffer.add(StylistSearchRequest())
+                for i in range(50):
+                    if bulk_create_mock.call_count:
+                        break
+                    time.sleep(0.1)
+        assert(bulk_create_mock.call_count == 1)
+        time.sleep(0.1)
+        assert(buffer._thread.is_alive())
+
+    def test_add_restarts_dead_thread(self):
+        buffer = SearchRequestBuffer(max_size=10, flush_interval=60, capacity=100)
+        buffer._thread = mock.Mock(**{'is_alive.return_value': False})
+        with mock.patch.object(buffer, '_start') as start_mock:
+            buffer.add(StylistSearchRequest())
+        assert(start_mock.call_count == 1)
+
+    @pytest.mark.django_db
+    def test_flush_falls_back_to_file(self, tmpdir):
+        fallback_path = tmpdir.join('fallback.jsonl')
+        user = G(User)
+        buffer = SearchRequestBuffer(max_size=10, flush_interval=60, capacity=100)
+        buffer._buffer = [
+            StylistSearchRequest(
+                requested_by=user, stylists_found=[1, 2], user_ip_addr='10.0.0.1',
+                user_location=Point(-122.1185007, 37.4009997),
+                requested_at=datetime.datetime(2019, 3, 1, 12, 0, tzinfo=pytz.UTC)
+            ),
+        ]
+        with override_settings(STYLIST_SEARCH_LOG_FALLBACK_PATH=str(fallback_path)):
+            with mock.patch.object(
+                    StylistSearchRequest.objects, 'bulk_create', side_effect=Exception
+            ):
+                assert(buffer.flush() == 0)
+            assert(fallback_path.exists())
+            assert(StylistSearchRequest.objects.count() == 0)
+
+            assert(load_search_requests_from_fallback(dry_run=True) == 1)
+            assert(StylistSearchRequest.objects.count() == 0)
+
+            assert(load_search_requests_from_fallback() == 1)
+        search_request = StylistSearchRequest.objects.last()
+        assert(search_request.requested_by == user)
+        assert(search_request.stylists_found == [1, 2])
+        assert(search_request.user_ip_addr == '10.0.0.1')
+        assert(search_request.requested_at == datetime.datetime(
+            2019, 3, 1, 12, 0, tzinfo=pytz.UTC))
+        assert(search_request.created_at == search_request.requested_at)
+
+
+@pytest.mark.django_db
+@freeze_time('2019-03-01 12:00:00 UTC')
+def test_log_search_request():
+    user = G(User)
+    log_search_request(
+        requested_by=user, user_ip_addr=None, user_location=None, stylists_found=[1]
+    )
+    search_request = StylistSearchRequest.objects.last()
+    assert(search_request.stylists_found == [1])
+    assert(search_request.created_at == datetime.datetime(2019, 3, 1, 12, 0, tzinfo=pytz.UTC))
+
+    with override_settings(STYLIST_SEARCH_LOG_BUFFER_ENABLED=True):
+        with mock.patch('client.search_log.search_request_buffer') as buffer_mock:
+            log_search_request(
+                requested_by=user, user_ip_addr=None, user_location=None, stylists_found=[2]
+            )
+            assert(buffer_mock.add.call_count == 1)
+    assert(StylistSearchRequest.objects.count() == 1)
@@ -1,13 +1,17 @@
+import time
 from io import TextIOBase
+from typing import List
 
 from django.conf import settings
+from django.core.mail import EmailMessage
 from django.core.management import BaseCommand
 from django.db import transaction
 
-from api.common.utils import send_email_verification
+from api.common.utils import get_email_verification_message
 from client.models import Client
 from core.constants import EnvLevel
 from core.types import UserRole
+from core.utils.email import send_email_messages
 from salon.models import Stylist
 
 
@@ -21,18 +25,34 @@ def one_time_send_verification_emails(
     stylists = Stylist.objects.filter(email__isnull=False, email_verified=False,
                                       deactivated_at__isnull=True).exclude(email='')
     clients = Client.objects.filter(email__isnull=False, email_verified=False).exclude(email='')
+    stylist_messages: List[EmailMessage] = [
+        get_email_verification_message(stylist, UserRole.STYLIST) for stylist in stylists
+    ]
+    client_messages: List[EmailMessage] = [
+        get_email_verification_message(client, UserRole.CLIENT) for client in clients
+    ]
+    if dry_run:
+        stylist_sent = [True] * len(stylist_messages)
+        client_sent = [True] * len(client_messages)
+    else:
+        started_at = time.monotonic()
+        stylist_sent = send_email_messages(stylist_messages)
+        client_sent = send_email_messages(client_messages)
+        duration_seconds = time.monotonic() - started_at
+        stdout.write('Sent {0} emails in {1:.1f}s ({2:.1f} emails/s)'.format(
+            sum(stylist_sent) + sum(client_sent), duration_seconds,
+            (sum(stylist_sent) + sum(client_sent)) / max(duration_seconds, 0.001)
+        ))
     stylist_emails_sent = 0
-    for stylist in stylists:
-        if not dry_run:
-            send_email_verification(stylist, UserRole.STYLIST)
-        stdout.write('Verification email sent to stylists {0}'.format(stylist.email))
-        stylist_emails_sent += 1
+    for message, sent in zip(stylist_messages, stylist_sent):
+        if sent:
+            stdout.write('Verification email sent to stylists {0}'.format(message.to[0]))
+            stylist_emails_sent += 1
     client_emails_sent = 0
-    for client in clients:
-        if not dry_run:
-            send_email_verification(client, UserRole.CLIENT)
-        stdout.write('Verification email sent to client {0}'.format(client.email))
-        client_emails_sent += 1
+    for message, sent in zip(client_messages, client_sent):
+        if sent:
+            stdout.write('Verification email sent to client {0}'.format(message.to[0]))
+            client_emails_sent += 1
     stdout.write("Emails sent to stylists: {0}, Emails sent to clients: {1}, Total: {2}".format(
         stylist_emails_sent,
         client_emails_sent,
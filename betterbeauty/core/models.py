@@ -117,6 +117,18 @@ class User(BaseEmailUser):
     class Meta:
         db_table = 'user'
 
+    def save(self, *args, **kwargs):
+        super(User, self).save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields', None)
+        if update_fields is not None and not {'first_name', 'photo'} & set(update_fields):
+            return
+        if not self.role or not self.is_client():
+            return
+        # client stores completeness of user's name and photo for ordering
+        client = getattr(self, 'client', None)
+        if client:
+            client.save(update_fields=['name_and_photo_completeness'])
+
     def __str__(self):
         full_name = self.get_full_name()
         if full_name:
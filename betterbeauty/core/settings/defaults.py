@@ -276,16 +276,55 @@ CATCH_ALL_EXCEPTIONS = False
 TWILIO_SMS_ENABLED = False
 TWILIO_SLACK_MOCK_ENABLED = False
 TWILIO_FROM_TEL = '+13477516233'
+# messages are sent through one Twilio client per process; tests point it
+# to a local fake server
+TWILIO_API_BASE_URL = 'https://api.twilio.com'
+# messages sent in bulk (notifications, outbox jobs) are rate limited with token
+# bucket per sending number; long code numbers are allowed to send about one message
+# per second. One-time codes are not limited. Buckets are kept in memory, so the
+# limit is enforced per process
+TWILIO_SMS_MAX_MESSAGES_PER_SECOND = 1
+TWILIO_SMS_BURST_SIZE = 5
+# number of messages in flight when sending messages in bulk
+TWILIO_SMS_CONCURRENCY = 4
 
 GOOGLE_AUTOCOMPLETE_API_KEY = os.environ.get(
     EnvVars.GOOGLE_AUTOCOMPLETE_API_KEY, '<override in local.py>')
 
 GOOGLE_GEOCODING_API_KEY = os.environ.get(
     EnvVars.GOOGLE_GEOCODING_API_KEY, '<override in local.py>')
+# can be pointed to a local fixture server, e.g. in tests
+GOOGLE_GEOCODING_API_URL = 'https://maps.googleapis.com'
+GEOCODING_HTTP_TIMEOUT_SECONDS = 5
+GEOCODING_HTTP_POOL_SIZE = 10
+GEOCODING_MAX_REQUESTS_PER_SECOND = 40
+# unresolvable addresses are not sent to geocoding API again for this many days
+GEOCODING_NEGATIVE_CACHE_TTL_DAYS = 30
 
 IPSTACK_API_KEY = os.environ.get(
     EnvVars.IPSTACK_API_KEY, '<override in local.py>')
 
+# IP address geolocation; range table backend
+# (integrations.geoip.backends.RangeTableBackend) looks up GEOIP_RANGE_TABLE_PATH
+# CSV dump locally instead of calling ipstack
+GEOIP_BACKEND = 'integrations.geoip.backends.IpstackBackend'
+GEOIP_RANGE_TABLE_PATH = Path(ROOT_PATH.parent / 'geoip' / 'ip_ranges.csv')
+GEOIP_HTTP_TIMEOUT_SECONDS = 1.5
+GEOIP_HTTP_POOL_SIZE = 10
+GEOIP_CACHE_MAX_SIZE = 10000
+GEOIP_CACHE_TTL_SECONDS = 24 * 60 * 60
+# addresses within the same network of this size share a cache entry
+GEOIP_CACHE_IPV4_PREFIX_LENGTH = 24
+GEOIP_CACHE_IPV6_PREFIX_LENGTH = 48
+
+# calls to external services (Twilio, Slack, Instagram, Google Calendar) go through
+# integrations.gateway: pooled keep-alive connections, default timeout, and
+# batches of calls with at most INTEGRATION_BATCH_CONCURRENCY calls in flight
+INTEGRATION_HTTP_TIMEOUT_SECONDS = 10
+INTEGRATION_HTTP_POOL_HOSTS = 10
+INTEGRATION_HTTP_POOL_SIZE = 20
+INTEGRATION_BATCH_CONCURRENCY = 20
+
 DJANGO_SILK_ENABLED = False
 
 IS_SLACK_ENABLED = True
@@ -316,6 +355,25 @@ AUTO_STRIPE_SLACK_HOOK = (
 
 #  notifications
 NOTIFICATIONS_ENABLED = True
+# pending notifications are claimed by a dispatcher in batches of this size, and
+# are sent with at most NOTIFICATION_CHANNEL_CONCURRENCY sends of each channel
+# in flight (push notifications of a batch are sent at once, see PUSH_APNS_BATCH_SIZE);
+# claim of a dispatcher which died is released after the timeout
+NOTIFICATION_DISPATCH_BATCH_SIZE = 100
+NOTIFICATION_CLAIM_TIMEOUT_SECONDS = 10 * 60
+NOTIFICATION_CHANNEL_CONCURRENCY = {
+    'sms': 4,
+    'email': 2,
+}
+# sent and discarded notifications older than this are moved to notification_archive
+# table by `archive_notifications` command, in batches of NOTIFICATION_ARCHIVE_BATCH_SIZE;
+# must be longer than any period over which generators look for prior notifications
+NOTIFICATION_ARCHIVE_AFTER_DAYS = 60
+NOTIFICATION_ARCHIVE_BATCH_SIZE = 1000
+# notification generators run concurrently on this many DB connections; every
+# generator is rolled back if it takes longer than the timeout
+NOTIFICATION_GENERATOR_CONCURRENCY = 4
+NOTIFICATION_GENERATOR_TIMEOUT_SECONDS = 5 * 60
 
 IOS_PUSH_CERTIFICATES_PATH = Path(ROOT_PATH.parent / 'push_certificates')
 
@@ -348,6 +406,11 @@ PUSH_NOTIFICATIONS_SETTINGS = {
     }
 }
 
+# notification dispatcher sends push notifications in batches: APNS notifications
+# of an app over one HTTP/2 connection, PUSH_APNS_BATCH_SIZE at a time, and FCM
+# notifications with the same payload as one multicast request
+PUSH_APNS_BATCH_SIZE = 500
+
 GOOGLE_OAUTH_CREDENTIALS_FILE_PATH = '<override in local.py>'
 # enable synchronization of Appointments with Stylist calendars
 GOOGLE_CALENDAR_STYLIST_SYNC_ENABLED = True
@@ -365,3 +428,77 @@ STRIPE_DEFAULT_PAYMENT_DESCRIPTOR = 'MadeBeauty, Inc'
 STRIPE_DEFAULT_CURRENCY = 'usd'
 
 DEFAULT_FROM_EMAIL = 'MadeBeauty <noreply@madebeauty.com>'
+# emails sent in bulk (see core.utils.email) are sent over one backend
+# connection per this many messages
+EMAIL_BATCH_SIZE = 100
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # shared tier of the stylist search result cache; local memory cache is
+    # a stand-in for memcached/redis and can be replaced per environment
+    'stylist_search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stylist-search',
+    },
+    # state which must be seen by all processes and instances, e.g. versions
+    # invalidating in-process snapshots. Must always be a shared backend; the
+    # table is created by `createcachetable` command, which runs after `migrate`
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+    },
+}
+
+# stylist search result cache
+STYLIST_SEARCH_CACHE_ENABLED = True
+STYLIST_SEARCH_CACHE_ALIAS = 'stylist_search'
+# geohash precision of the cell the results are cached for; 5 is ~4.9km x 4.9km
+STYLIST_SEARCH_CACHE_GEOHASH_PRECISION = 5
+STYLIST_SEARCH_CACHE_TTL_SECONDS = 600
+STYLIST_SEARCH_CACHE_LOCAL_MAX_SIZE = 1024
+
+# stylist search requests are logged through an in-process buffer, which is
+# flushed to the DB in bulk by a background thread
+STYLIST_SEARCH_LOG_BUFFER_ENABLED = True
+STYLIST_SEARCH_LOG_BUFFER_MAX_SIZE = 200
+STYLIST_SEARCH_LOG_FLUSH_INTERVAL_SECONDS = 10
+# search requests beyond this many are dropped while the buffer can't be flushed
+STYLIST_SEARCH_LOG_BUFFER_CAPACITY = 10000
+# requests which could not be written to the DB (e.g. on shutdown) are appended
+# here as json lines and can be loaded later with `load_search_requests` command
+STYLIST_SEARCH_LOG_FALLBACK_PATH = Path(LOGS_PATH / 'search_requests_fallback.jsonl')
+
+# in-process service template catalog snapshot is rebuilt when catalog rows change
+# or, at the latest, after this many seconds
+SERVICE_TEMPLATE_CATALOG_MAX_AGE_SECONDS = 600
+# catalog version is kept here, so that catalog changes reach all processes
+SERVICE_TEMPLATE_CATALOG_CACHE_ALIAS = 'shared'
+
+# side effects of requests are recorded as outbox jobs and run by `process_outbox_jobs`
+# command; handler of every job type is called with job's payload, and with `last_attempt`
+# set to True when the job won't be retried if the handler fails
+OUTBOX_JOB_HANDLERS = {
+    'new_appointment_notification': 'appointment.outbox.handle_new_appointment_notification',
+    'slack_auto_booking': 'appointment.outbox.handle_slack_auto_booking',
+    'google_calendar_sync': 'appointment.outbox.handle_google_calendar_sync',
+    'send_sms': 'integrations.twilio.handle_send_sms',
+    'slack_message': 'integrations.slack.handle_slack_message',
+    'stripe_charge': 'billing.utils.handle_stripe_charge',
+    'push_message': 'integrations.push.utils.handle_push_message',
+}
+# number of worker threads running jobs of each integration at the same time
+OUTBOX_INTEGRATION_CONCURRENCY = {
+    'notifications': 2,
+    'twilio': 4,
+    'google_calendar': 2,
+    'stripe': 2,
+    'slack': 1,
+    'push': 4,
+}
+OUTBOX_MAX_ATTEMPTS = 10
+# failed job is retried with exponential backoff: after 30 seconds, 1 minute,
+# 2 minutes etc., but not later than after OUTBOX_MAX_RETRY_DELAY_SECONDS
+OUTBOX_RETRY_DELAY_SECONDS = 30
+OUTBOX_MAX_RETRY_DELAY_SECONDS = 60 * 60
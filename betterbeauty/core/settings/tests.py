@@ -13,3 +13,6 @@ ALLOWED_HOSTS = ('*', )
 
 IS_SLACK_ENABLED = False
 NOTIFICATIONS_ENABLED = False
+
+STYLIST_SEARCH_CACHE_ENABLED = False
+STYLIST_SEARCH_LOG_BUFFER_ENABLED = False
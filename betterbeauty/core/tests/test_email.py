@@ -0,0 +1,108 @@
+import socketserver
+import threading
+
+import pytest
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.test import override_settings
+
+from core.utils.email import send_email_messages
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal SMTP server which accepts and records messages; recipients
+    starting with `reject` are refused
+    """
+    connections = 0
+    messages = []
+
+    def reply(self, line: str):
+        self.wfile.write('{0}\r\n'.format(line).encode('utf-8'))
+
+    def handle(self):
+        SMTPSinkHandler.connections += 1
+        self.reply('220 localhost SMTP sink')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode('utf-8').rstrip('\r\n')
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            if command == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif command == 'RCPT':
+                if line.split(':', 1)[1].strip('<> ').startswith('reject'):
+                    self.reply('550 Mailbox unavailable')
+                else:
+                    recipients.append(line)
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    data_line = self.rfile.readline().decode('utf-8')
+                    if data_line.rstrip('\r\n') == '.':
+                        break
+                    data.append(data_line)
+                SMTPSinkHandler.messages.append(''.join(data))
+                recipients = []
+                self.reply('250 OK')
+            elif command == 'RSET':
+                recipients = []
+                self.reply('250 OK')
+            else:
+                # HELO, MAIL, NOOP
+                self.reply('250 OK')
+
+
+class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+@pytest.fixture
+def smtp_sink():
+    SMTPSinkHandler.connections = 0
+    SMTPSinkHandler.messages = []
+    server = ThreadingTCPServer(('127.0.0.1', 0), SMTPSinkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1', EMAIL_PORT=server.server_address[1],
+        EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='', EMAIL_USE_TLS=False,
+        EMAIL_USE_SSL=False,
+    ):
+        yield
+    server.shutdown()
+    server.server_close()
+
+
+class TestSendEmailMessages(object):
+    def test_messages_share_connections(self, smtp_sink):
+        messages = [
+            EmailMessage(
+                'Subject {0}'.format(i), 'Body', 'noreply@madebeauty.com',
+                ['client{0}@example.com'.format(i)]
+            ) for i in range(25)
+        ]
+        assert(send_email_messages(messages, batch_size=10) == [True] * 25)
+        assert(len(SMTPSinkHandler.messages) == 25)
+        # one connection per batch instead of one per message
+        assert(SMTPSinkHandler.connections == 3)
+
+    def test_failed_message_does_not_stop_batch(self, smtp_sink):
+        html_message = EmailMultiAlternatives(
+            'Hello', 'Hello', 'noreply@madebeauty.com', ['client@example.com']
+        )
+        html_message.attach_alternative('<b>Hello</b>', 'text/html')
+        messages = [
+            EmailMessage('Hello', 'Hello', 'noreply@madebeauty.com', ['reject@example.com']),
+            html_message,
+        ]
+        assert(send_email_messages(messages, batch_size=10) == [False, True])
+        assert(len(SMTPSinkHandler.messages) == 1)
+        assert('<b>Hello</b>' in SMTPSinkHandler.messages[0])
+        assert(SMTPSinkHandler.connections == 1)
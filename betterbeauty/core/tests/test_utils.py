@@ -1,3 +1,7 @@
+import mock
+
+from core.utils.cache import LRUCache
+from core.utils.geohash import encode_geohash, get_geohash_cells_around
 from core.utils.phone import to_international_format
 
 
@@ -9,3 +13,44 @@ def test_to_international_format():
     assert(
         to_international_format('+16135551234', None) == '+1 613-555-1234'
     )
+
+
+def test_encode_geohash():
+    assert(encode_geohash(57.64911, 10.40744, precision=11) == 'u4pruydqqvj')
+    assert(encode_geohash(40.7128, -74.0060, precision=5) == 'dr5re')
+
+
+def test_get_geohash_cells_around():
+    cells = get_geohash_cells_around(40.7128, -74.0060, precision=5)
+    assert(len(cells) == 9)
+    assert(cells[0] == 'dr5re')
+    assert(len(set(cells)) == 9)
+
+
+class TestLRUCache(object):
+    def test_get_set(self):
+        cache = LRUCache(max_size=2)
+        assert(cache.get('a', None) is None)
+        cache.set('a', 1)
+        assert(cache.get('a') == 1)
+
+    def test_eviction(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        # touch 'a' so that 'b' becomes least recently used
+        cache.get('a')
+        cache.set('c', 3)
+        assert(len(cache) == 2)
+        assert(cache.get('b', None) is None)
+        assert(cache.get('a') == 1)
+        assert(cache.get('c') == 3)
+
+    def test_ttl(self):
+        cache = LRUCache(max_size=2, ttl=10)
+        with mock.patch('core.utils.cache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+        with mock.patch('core.utils.cache.time.monotonic', return_value=105):
+            assert(cache.get('a') == 1)
+        with mock.patch('core.utils.cache.time.monotonic', return_value=111):
+            assert(cache.get('a', None) is None)
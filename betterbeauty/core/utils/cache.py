@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from django.core.cache.backends.base import BaseCache
+
+
+class LRUCache(object):
+    """
+    Thread-safe in-process LRU cache with optional per-entry time to live.
+    Used as the first (per-process) tier in front of shared django caches
+    """
+    MISSING = object()
+
+    def __init__(self, max_size: int=1024, ttl: Optional[float]=None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any=MISSING) -> Any:
+        with self._lock:
+            item = self._data.get(key, None)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float]=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def get_cache_version(cache: BaseCache, version_key: str) -> int:
+    """
+    Return version counter stored under version_key of the (shared) cache. If the
+    cache lost the version (or never had it) we start from a timestamp rather than
+    from 0, so that entries cached under an evicted version can never become
+    current again
+    """
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, int(time.time() * 1000), timeout=None)
+        version = cache.get(version_key, 0)
+    return version
+
+
+def bump_cache_version(cache: BaseCache, version_key: str):
+    """Increment version counter stored under version_key of the (shared) cache"""
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        # version is not set yet; any fresh value will do
+        get_cache_version(cache, version_key)
@@ -0,0 +1,38 @@
+import logging
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+
+def send_email_messages(
+        messages: List[EmailMessage], batch_size: Optional[int]=None
+) -> List[bool]:
+    """
+    Send messages with the configured email backend (SMTP, SES etc.), opening
+    one connection per `batch_size` (EMAIL_BATCH_SIZE by default) messages
+    instead of one connection per message. Failed message doesn't stop the
+    rest of the batch.
+
+    :return: True for every sent message, in the order of messages
+    """
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    sent: List[bool] = []
+    for i in range(0, len(messages), batch_size):
+        batch = messages[i:i + batch_size]
+        try:
+            with get_connection(fail_silently=False) as connection:
+                for message in batch:
+                    try:
+                        sent.append(connection.send_messages([message]) == 1)
+                    except Exception:
+                        logger.exception('Could not send email to {0}'.format(
+                            ', '.join(message.recipients())))
+                        sent.append(False)
+        except Exception:
+            # connection could not be opened or closed
+            logger.exception('Could not send batch of {0} emails'.format(len(batch)))
+            sent += [False] * (len(batch) - (len(sent) - i))
+    return sent
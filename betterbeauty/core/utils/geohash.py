@@ -0,0 +1,65 @@
+from typing import List, Tuple
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int=6) -> str:
+    """
+    Encode latitude/longitude pair to a geohash string of given precision.
+    Every next character narrows down the cell; precision 5 gives a cell of
+    roughly 4.9km x 4.9km, precision 6 - roughly 1.2km x 0.6km
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    # bits alternate between longitude (even) and latitude (odd)
+    is_longitude_bit = True
+    while len(geohash) < precision:
+        if is_longitude_bit:
+            value, value_range = longitude, lng_range
+        else:
+            value, value_range = latitude, lat_range
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        is_longitude_bit = not is_longitude_bit
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(geohash)
+
+
+def get_geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Return (latitude, longitude) size in degrees of a geohash cell of given precision"""
+    total_bits = precision * 5
+    longitude_bits = (total_bits + 1) // 2
+    latitude_bits = total_bits // 2
+    return 180.0 / (2 ** latitude_bits), 360.0 / (2 ** longitude_bits)
+
+
+def get_geohash_cells_around(latitude: float, longitude: float, precision: int=6) -> List[str]:
+    """
+    Return geohash of the cell containing the point, followed by geohashes of up
+    to 8 cells surrounding it
+    """
+    lat_size, lng_size = get_geohash_cell_size(precision)
+    cells: List[str] = [encode_geohash(latitude, longitude, precision)]
+    for lat_shift in (-1, 0, 1):
+        for lng_shift in (-1, 0, 1):
+            neighbour_lat = latitude + lat_shift * lat_size
+            if not -90.0 <= neighbour_lat <= 90.0:
+                continue
+            # wrap around the antimeridian
+            neighbour_lng = (longitude + lng_shift * lng_size + 180.0) % 360.0 - 180.0
+            cell = encode_geohash(neighbour_lat, neighbour_lng, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
@@ -0,0 +1,56 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket rate limiter. Tokens are refilled continuously at
+    `rate` tokens per second, up to `capacity` (bursts of at most `capacity`
+    acquisitions pass without waiting). State is kept in memory, so every
+    process has its own bucket.
+    """
+    def __init__(
+            self, rate: float, capacity: Optional[float]=None,
+            clock: Callable[[], float]=time.monotonic,
+            sleep: Callable[[float], None]=time.sleep
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float, capacity: Optional[float]=None):
+        with self._lock:
+            self.rate = rate
+            self.capacity = capacity if capacity is not None else max(rate, 1)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float=1) -> bool:
+        """Take tokens if available right now; return True if they were taken"""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float=1):
+        """Block until tokens are available, then take them"""
+        while True:
+            with self._lock:
+                self._refill(self._clock())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_seconds = (tokens - self._tokens) / self.rate
+            self._sleep(wait_seconds)
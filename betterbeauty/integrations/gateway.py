@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, NamedTuple, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class IntegrationHttpSession(requests.Session):
+    """
+    Session with keep-alive connection pool per host, which applies
+    INTEGRATION_HTTP_TIMEOUT_SECONDS to requests made without explicit timeout
+    """
+    def __init__(self) -> None:
+        super(IntegrationHttpSession, self).__init__()
+        adapter = HTTPAdapter(
+            pool_connections=settings.INTEGRATION_HTTP_POOL_HOSTS,
+            pool_maxsize=settings.INTEGRATION_HTTP_POOL_SIZE
+        )
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout', None) is None:
+            kwargs['timeout'] = settings.INTEGRATION_HTTP_TIMEOUT_SECONDS
+        return super(IntegrationHttpSession, self).request(method, url, **kwargs)
+
+
+class BatchResult(NamedTuple):
+    value: Any
+    error: Optional[Exception]
+
+
+class IntegrationGateway(object):
+    """
+    Runs calls to external services on an asyncio event loop, which lives in
+    a background thread of the process. Blocking calls (HTTP requests over pooled
+    sessions, SDK calls) are run in the gateway's thread pool, while the loop
+    limits how many of them are in flight. Calls must not touch the database,
+    because pool threads keep their DB connections open.
+    """
+    def __init__(self, max_workers: int) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(
+                        target=loop.run_forever, name='integration-gateway', daemon=True
+                    )
+                    thread.start()
+                    self._loop = loop
+        return self._loop
+
+    async def run_call(self, call: Callable[[], Any]) -> Any:
+        return await asyncio.get_event_loop().run_in_executor(self.executor, call)
+
+    async def run_batch_async(
+            self, calls: List[Callable[[], Any]], concurrency: int
+    ) -> List[BatchResult]:
+        """
+        Run calls with at most `concurrency` of them in flight at a time.
+
+        :return: results in the order of calls; failed calls have error set
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_limited(call: Callable[[], Any]) -> BatchResult:
+            async with semaphore:
+                try:
+                    return BatchResult(value=await self.run_call(call), error=None)
+                except Exception as e:
+                    logger.warning('Integration call failed: {0}'.format(e))
+                    return BatchResult(value=None, error=e)
+
+        return list(await asyncio.gather(*[run_limited(call) for call in calls]))
+
+    def run_batch(
+            self, calls: List[Callable[[], Any]], concurrency: Optional[int]=None
+    ) -> List[BatchResult]:
+        """Blocking façade of `run_batch_async` for synchronous callers"""
+        if not calls:
+            return []
+        future = asyncio.run_coroutine_threadsafe(
+            self.run_batch_async(
+                calls, concurrency or settings.INTEGRATION_BATCH_CONCURRENCY
+            ),
+            self.get_loop()
+        )
+        return future.result()
+
+
+_http_session: Optional[IntegrationHttpSession] = None
+_gateway: Optional[IntegrationGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_http_session() -> IntegrationHttpSession:
+    """Return HTTP session shared by all threads of the process"""
+    global _http_session
+    if _http_session is None:
+        with _gateway_lock:
+            if _http_session is None:
+                _http_session = IntegrationHttpSession()
+    return _http_session
+
+
+def get_integration_gateway() -> IntegrationGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = IntegrationGateway(
+                    max_workers=settings.INTEGRATION_BATCH_CONCURRENCY
+                )
+    return _gateway
+
+
+def run_batch(
+        calls: List[Callable[[], Any]], concurrency: Optional[int]=None
+) -> List[BatchResult]:
+    """
+    Run calls to external services concurrently, with at most `concurrency`
+    (INTEGRATION_BATCH_CONCURRENCY by default) of them in flight.
+
+    :return: results in the order of calls; failed calls have error set
+    """
+    return get_integration_gateway().run_batch(calls, concurrency)
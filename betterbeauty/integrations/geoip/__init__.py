@@ -0,0 +1,69 @@
+import ipaddress
+import logging
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.utils.module_loading import import_string
+
+from api.v1.client.constants import NEW_YORK_LOCATION
+from core.utils.cache import LRUCache
+from .backends import GeoIPBackend, GeoIPLookupError
+
+logger = logging.getLogger(__name__)
+
+_backend: Optional[GeoIPBackend] = None
+
+_location_cache = LRUCache(
+    max_size=settings.GEOIP_CACHE_MAX_SIZE, ttl=settings.GEOIP_CACHE_TTL_SECONDS
+)
+
+
+def get_geoip_backend() -> GeoIPBackend:
+    """Return instance of the backend configured in GEOIP_BACKEND, one per process"""
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.GEOIP_BACKEND)()
+    return _backend
+
+
+def get_ip_cache_key(ip_addr: str) -> Optional[str]:
+    """
+    Return network the IP address belongs to (e.g. its /24 for IPv4), so that
+    addresses of the same network share a cache entry; None for invalid addresses
+    """
+    try:
+        address = ipaddress.ip_address(ip_addr)
+    except ValueError:
+        return None
+    prefix_length = (
+        settings.GEOIP_CACHE_IPV4_PREFIX_LENGTH if address.version == 4
+        else settings.GEOIP_CACHE_IPV6_PREFIX_LENGTH
+    )
+    return str(ipaddress.ip_network(
+        '{0}/{1}'.format(address, prefix_length), strict=False
+    ))
+
+
+def get_lat_lng_for_ip_address(ip_addr: Optional[str]) -> Point:
+    """
+    Return location of the IP address, falling back to New York if address
+    is unknown or backend failed. Results (including unknown addresses) are
+    cached per network; failures are not cached
+    """
+    cache_key = get_ip_cache_key(ip_addr) if ip_addr else None
+    if cache_key is None:
+        return NEW_YORK_LOCATION
+    location = _location_cache.get(cache_key)
+    if location is LRUCache.MISSING:
+        try:
+            location = get_geoip_backend().lookup(ip_addr)
+        except GeoIPLookupError:
+            logger.exception('Could not geolocate IP address {0}'.format(ip_addr))
+            return NEW_YORK_LOCATION
+        _location_cache.set(cache_key, location)
+    return location or NEW_YORK_LOCATION
+
+
+def clear_geoip_cache():
+    _location_cache.clear()
@@ -0,0 +1,146 @@
+import csv
+import ipaddress
+import logging
+import threading
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Union
+
+import requests
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+class GeoIPLookupError(Exception):
+    """Raised when a backend could not look up an IP address, e.g. on network error"""
+    pass
+
+
+class GeoIPBackend(object):
+    """Base class for IP address geolocation backends"""
+
+    def lookup(self, ip_addr: str) -> Optional[Point]:
+        """
+        Return location of the IP address.
+
+        :param ip_addr: IPv4 or IPv6 address
+        :return: location, or None if the backend has no location for the address
+        :raises GeoIPLookupError: if lookup failed and may succeed later
+        """
+        raise NotImplementedError()
+
+
+class IpstackBackend(GeoIPBackend):
+    """
+    Looks up IP addresses with ipstack HTTP API. A single session is shared by
+    all threads of the process, so that connections to ipstack are kept alive
+    and reused rather than opened on every lookup
+    """
+    API_URL = 'http://api.ipstack.com/{0}'
+
+    def __init__(self) -> None:
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.GEOIP_HTTP_POOL_SIZE
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def lookup(self, ip_addr: str) -> Optional[Point]:
+        try:
+            response = self.session.get(
+                self.API_URL.format(ip_addr),
+                params={'access_key': settings.IPSTACK_API_KEY},
+                timeout=settings.GEOIP_HTTP_TIMEOUT_SECONDS
+            )
+            response.raise_for_status()
+            json_response = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise GeoIPLookupError(str(e)) from e
+        latitude = json_response.get('latitude', None)
+        longitude = json_response.get('longitude', None)
+        if latitude and longitude:
+            return Point((longitude, latitude))
+        return None
+
+
+class IPRangeTable(NamedTuple):
+    range_starts: List[int]
+    range_ends: List[int]
+    locations: List[Point]
+
+
+class RangeTableBackend(GeoIPBackend):
+    """
+    Looks up IP addresses in a local range table built from a CSV dump with
+    `ip_from,ip_to,latitude,longitude` rows. Range boundaries can be given either
+    as addresses or as their integer representation; ranges must not overlap.
+    Table is loaded once per process and looked up by binary search.
+    """
+    def __init__(self, path: Optional[str]=None) -> None:
+        self.path = path or settings.GEOIP_RANGE_TABLE_PATH
+        self._tables: Optional[Dict[int, IPRangeTable]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse_ip(value: str, version: Optional[int]=None) -> IPAddress:
+        value = value.strip()
+        if not value.isdigit():
+            return ipaddress.ip_address(value)
+        if version == 6:
+            return ipaddress.IPv6Address(int(value))
+        return ipaddress.ip_address(int(value))
+
+    def _load(self) -> Dict[int, IPRangeTable]:
+        ranges: Dict[int, List] = {4: [], 6: []}
+        with open(str(self.path)) as range_file:
+            for row in csv.reader(range_file):
+                if not row or row[0].startswith('#'):
+                    continue
+                try:
+                    range_start = self._parse_ip(row[0])
+                    range_end = self._parse_ip(row[1], version=range_start.version)
+                    location = Point((float(row[3]), float(row[2])))
+                except (IndexError, ValueError):
+                    # skip header and malformed rows
+                    continue
+                ranges[range_start.version].append(
+                    (int(range_start), int(range_end), location)
+                )
+        tables: Dict[int, IPRangeTable] = {}
+        for version, version_ranges in ranges.items():
+            version_ranges.sort(key=lambda r: r[0])
+            tables[version] = IPRangeTable(
+                range_starts=[r[0] for r in version_ranges],
+                range_ends=[r[1] for r in version_ranges],
+                locations=[r[2] for r in version_ranges],
+            )
+        logger.info('Loaded {0} IP ranges from {1}'.format(
+            sum(len(t.range_starts) for t in tables.values()), self.path))
+        return tables
+
+    def get_tables(self) -> Dict[int, IPRangeTable]:
+        if self._tables is None:
+            with self._lock:
+                if self._tables is None:
+                    try:
+                        self._tables = self._load()
+                    except OSError as e:
+                        raise GeoIPLookupError(str(e)) from e
+        return self._tables
+
+    def lookup(self, ip_addr: str) -> Optional[Point]:
+        try:
+            address = ipaddress.ip_address(ip_addr)
+        except ValueError:
+            return None
+        table = self.get_tables()[address.version]
+        address_int = int(address)
+        index = bisect_right(table.range_starts, address_int) - 1
+        if index < 0 or address_int > table.range_ends[index]:
+            return None
+        return table.locations[index]
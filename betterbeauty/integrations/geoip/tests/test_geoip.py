@@ -0,0 +1,93 @@
+import mock
+import pytest
+import requests
+from django.contrib.gis.geos import Point
+
+from api.v1.client.constants import NEW_YORK_LOCATION
+from .. import clear_geoip_cache, get_ip_cache_key, get_lat_lng_for_ip_address
+from ..backends import GeoIPLookupError, IpstackBackend, RangeTableBackend
+
+
+@pytest.fixture
+def range_table_path(tmpdir):
+    range_table = tmpdir.join('ip_ranges.csv')
+    range_table.write(
+        'ip_from,ip_to,latitude,longitude\n'
+        '16777216,16777471,-27.4766,153.0166\n'
+        '8.8.8.0,8.8.8.255,37.4056,-122.0775\n'
+        '2001:4860::,2001:4860:ffff:ffff:ffff:ffff:ffff:ffff,37.4056,-122.0775\n'
+        'junk row\n'
+    )
+    return str(range_table)
+
+
+class TestRangeTableBackend(object):
+    def test_lookup(self, range_table_path):
+        backend = RangeTableBackend(path=range_table_path)
+        location = backend.lookup('1.0.0.1')
+        assert(location.x == 153.0166)
+        assert(location.y == -27.4766)
+        assert(backend.lookup('1.0.0.255') is not None)
+        assert(backend.lookup('8.8.8.8').y == 37.4056)
+        assert(backend.lookup('2001:4860::8888').x == -122.0775)
+        assert(backend.lookup('1.0.1.0') is None)
+        assert(backend.lookup('0.255.255.255') is None)
+        assert(backend.lookup('8.8.9.0') is None)
+        assert(backend.lookup('not-an-ip') is None)
+
+    def test_missing_file(self, tmpdir):
+        backend = RangeTableBackend(path=str(tmpdir.join('missing.csv')))
+        with pytest.raises(GeoIPLookupError):
+            backend.lookup('8.8.8.8')
+
+
+class TestIpstackBackend(object):
+    def test_lookup(self):
+        backend = IpstackBackend()
+        response = mock.Mock()
+        response.json.return_value = {'latitude': 37.4056, 'longitude': -122.0775}
+        with mock.patch.object(backend.session, 'get', return_value=response) as get_mock:
+            location = backend.lookup('8.8.8.8')
+            assert(get_mock.call_args[1]['timeout'] is not None)
+        assert(location.x == -122.0775)
+        response.json.return_value = {'latitude': None, 'longitude': None}
+        with mock.patch.object(backend.session, 'get', return_value=response):
+            assert(backend.lookup('127.0.0.1') is None)
+        with mock.patch.object(
+                backend.session, 'get', side_effect=requests.Timeout
+        ):
+            with pytest.raises(GeoIPLookupError):
+                backend.lookup('8.8.8.8')
+
+
+def test_get_ip_cache_key():
+    assert(get_ip_cache_key('8.8.8.8') == '8.8.8.0/24')
+    assert(get_ip_cache_key('8.8.8.200') == '8.8.8.0/24')
+    assert(get_ip_cache_key('2001:4860:1234::1') == '2001:4860:1234::/48')
+    assert(get_ip_cache_key('junk') is None)
+
+
+def test_get_lat_lng_for_ip_address():
+    clear_geoip_cache()
+    backend = mock.Mock()
+    backend.lookup.return_value = Point((-122.0775, 37.4056))
+    with mock.patch('integrations.geoip.get_geoip_backend', return_value=backend):
+        assert(get_lat_lng_for_ip_address('8.8.8.8').x == -122.0775)
+        # same /24 network is served from cache
+        assert(get_lat_lng_for_ip_address('8.8.8.4').x == -122.0775)
+        assert(backend.lookup.call_count == 1)
+
+        backend.lookup.return_value = None
+        assert(get_lat_lng_for_ip_address('10.0.0.1') == NEW_YORK_LOCATION)
+        assert(get_lat_lng_for_ip_address('10.0.0.2') == NEW_YORK_LOCATION)
+        assert(backend.lookup.call_count == 2)
+
+        # failures are not cached
+        backend.lookup.side_effect = GeoIPLookupError
+        assert(get_lat_lng_for_ip_address('9.9.9.9') == NEW_YORK_LOCATION)
+        assert(get_lat_lng_for_ip_address('9.9.9.9') == NEW_YORK_LOCATION)
+        assert(backend.lookup.call_count == 4)
+
+        assert(get_lat_lng_for_ip_address(None) == NEW_YORK_LOCATION)
+        assert(backend.lookup.call_count == 4)
+    clear_geoip_cache()
@@ -1,14 +1,21 @@
+import datetime
 import json
 import logging
+import re
 
-from typing import NamedTuple, Optional
+from typing import Dict, List, NamedTuple, Optional
 
-import googlemaps
+import requests
 
 from django.conf import settings
 from django.contrib.gis.geos import Point
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
 
 from api.v1.stylist.constants import MIN_VALID_ADDR_LEN
+from core.utils.rate_limit import TokenBucket
+from .models import GeocodeCacheEntry
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +30,109 @@ class GeoCodedAddress(NamedTuple):
     country: Optional[str]
 
 
+class GeocodingError(Exception):
+    """Raised when geocoding API could not be reached or refused the request"""
+    pass
+
+
+def normalize_address(address: str) -> str:
+    """Lowercase the address and collapse whitespace, including around commas"""
+    address = ' '.join(address.lower().split())
+    return re.sub(r'\s*,\s*', ', ', address).strip(' ,')
+
+
+class GoogleGeocodingBackend(object):
+    """
+    Calls Google Geocoding API over a pooled keep-alive session, shared by all
+    threads of the process. Base URL is taken from settings, so that the API
+    can be replaced with a local fixture server (e.g. in tests)
+    """
+    API_PATH = '/maps/api/geocode/json'
+    # statuses of valid responses, which can be cached
+    CACHEABLE_STATUSES = ('OK', 'ZERO_RESULTS', )
+
+    def __init__(self) -> None:
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.GEOCODING_HTTP_POOL_SIZE
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def geocode(self, address: str, country: Optional[str]=None) -> List[Dict]:
+        """
+        Return raw geocoding results for the address.
+
+        :raises GeocodingError: on network errors, or if API refused the request
+        """
+        params = {'address': address, 'key': settings.GOOGLE_GEOCODING_API_KEY}
+        if country:
+            params['components'] = 'country:{0}'.format(country)
+        geocoding_rate_limiter.acquire()
+        try:
+            response = self.session.get(
+                settings.GOOGLE_GEOCODING_API_URL + self.API_PATH, params=params,
+                timeout=settings.GEOCODING_HTTP_TIMEOUT_SECONDS
+            )
+            response.raise_for_status()
+            json_response = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise GeocodingError(str(e)) from e
+        status = json_response.get('status', None)
+        if status not in self.CACHEABLE_STATUSES:
+            raise GeocodingError('Geocoding API returned {0}: {1}'.format(
+                status, json_response.get('error_message', '')))
+        return json_response.get('results', [])
+
+
+geocoding_rate_limiter = TokenBucket(rate=settings.GEOCODING_MAX_REQUESTS_PER_SECOND)
+
+_geocoding_backend: Optional[GoogleGeocodingBackend] = None
+
+
+def get_geocoding_backend() -> GoogleGeocodingBackend:
+    global _geocoding_backend
+    if _geocoding_backend is None:
+        _geocoding_backend = GoogleGeocodingBackend()
+    return _geocoding_backend
+
+
+def get_geocode_results(address: str, country: Optional[str]=None) -> List[Dict]:
+    """
+    Return raw geocoding results for the address, from the geocode cache table if
+    address was geocoded before. Unresolvable addresses are cached too, and only
+    sent to the API again after GEOCODING_NEGATIVE_CACHE_TTL_DAYS.
+    """
+    normalized_address = normalize_address(address)
+    normalized_country = (country or '').upper()
+    cache_entry = GeocodeCacheEntry.objects.filter(
+        normalized_address=normalized_address, country=normalized_country
+    ).only('results', 'is_resolved', 'updated_at').first()
+    negative_cache_expired_before = timezone.now() - datetime.timedelta(
+        days=settings.GEOCODING_NEGATIVE_CACHE_TTL_DAYS)
+    if cache_entry and (
+            cache_entry.is_resolved or cache_entry.updated_at > negative_cache_expired_before
+    ):
+        return cache_entry.results
+    geocode_results = get_geocoding_backend().geocode(
+        address=normalized_address, country=normalized_country or None
+    )
+    logger.info("Geocoding result: {0}".format(json.dumps(geocode_results)))
+    try:
+        with transaction.atomic():
+            GeocodeCacheEntry.objects.update_or_create(
+                normalized_address=normalized_address, country=normalized_country,
+                defaults={
+                    'results': geocode_results,
+                    'is_resolved': parse_geocode_results(geocode_results) is not None,
+                }
+            )
+    except IntegrityError:
+        # same address was just cached concurrently
+        pass
+    return geocode_results
+
+
 class GeoCode:
 
     def __init__(self, str_to_geocode):
@@ -33,64 +143,65 @@ class GeoCode:
             return True
         return False
 
-    def geo_code(self, country=None):
+    def geo_code(self, country=None) -> Optional[GeoCodedAddress]:
+        """
+        :raises GeocodingError: if address could not be geocoded now, but may be later
+        """
         if not settings.IS_GEOCODING_ENABLED:
             return None
         if not self.is_geocodable_string():
             return None
-        gmaps = googlemaps.Client(key=settings.GOOGLE_GEOCODING_API_KEY)
         if country:
             logger.info("Geocoding in country {0}".format(country))
-            geocode_results = gmaps.geocode(
-                address=self.str_to_geocode, components={'country': country})
-        else:
-            geocode_results = gmaps.geocode(
-                address=self.str_to_geocode)
-        logger.info("Geocoding result: {0}".format(json.dumps(geocode_results)))
-        if len(geocode_results) != 1:
-            logger.info("Exiting, More than 1 result")
-            return None
-        geocode_result = geocode_results[0]
-        if 'country' in geocode_result['types'] or (
-                'partial_match' in geocode_result and geocode_result['partial_match']):
-            return None
-        address_components = geocode_result['address_components']
-        # address_components is a list of dicts with type containing array of types.
-        locality = None
-        sublocality_level_1 = None
-        country = None
-        zip_code = None
-        state = None
-        # We iterate the address_components to find the specific items that matches required type.
-        for item in address_components:
-            if 'locality' in item["types"]:
-                locality = item['short_name']
-            if 'sublocality_level_1' in item["types"]:
-                sublocality_level_1 = item['short_name']
-            if 'country' in item["types"]:
-                country = item['short_name']
-            if 'postal_code' in item["types"]:
-                zip_code = item['short_name']
-            if 'administrative_area_level_1' in item['types']:
-                state = item['short_name']
-        # city is either returned in 'locality' or 'sublocality_level_1'
-        city = locality if locality else sublocality_level_1
-        if not (country and city):
-            return None
-        lat = geocode_result['geometry']['location']['lat']
-        lng = geocode_result['geometry']['location']['lng']
-
-        location = Point(x=lng, y=lat)
-
-        return GeoCodedAddress(
-            city=city,
-            state=state,
-            zip_code=zip_code,
-            lat=lat,
-            lng=lng,
-            location=location,
-            country=country
-        )
+        geocode_results = get_geocode_results(self.str_to_geocode, country=country)
+        return parse_geocode_results(geocode_results)
+
+
+def parse_geocode_results(geocode_results: List[Dict]) -> Optional[GeoCodedAddress]:
+    if len(geocode_results) != 1:
+        logger.info("Exiting, More than 1 result")
+        return None
+    geocode_result = geocode_results[0]
+    if 'country' in geocode_result['types'] or (
+            'partial_match' in geocode_result and geocode_result['partial_match']):
+        return None
+    address_components = geocode_result['address_components']
+    # address_components is a list of dicts with type containing array of types.
+    locality = None
+    sublocality_level_1 = None
+    country = None
+    zip_code = None
+    state = None
+    # We iterate the address_components to find the specific items that matches required type.
+    for item in address_components:
+        if 'locality' in item["types"]:
+            locality = item['short_name']
+        if 'sublocality_level_1' in item["types"]:
+            sublocality_level_1 = item['short_name']
+        if 'country' in item["types"]:
+            country = item['short_name']
+        if 'postal_code' in item["types"]:
+            zip_code = item['short_name']
+        if 'administrative_area_level_1' in item['types']:
+            state = item['short_name']
+    # city is either returned in 'locality' or 'sublocality_level_1'
+    city = locality if locality else sublocality_level_1
+    if not (country and city):
+        return None
+    lat = geocode_result['geometry']['location']['lat']
+    lng = geocode_result['geometry']['location']['lng']
+
+    location = Point(x=lng, y=lat)
+
+    return GeoCodedAddress(
+        city=city,
+        state=state,
+        zip_code=zip_code,
+        lat=lat,
+        lng=lng,
+        location=location,
+        country=country
+    )
 
 
 class GeocodeValidAddress(GeoCode):
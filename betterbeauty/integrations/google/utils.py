@@ -10,6 +10,7 @@ from django.db.models import Model
 from django.utils import timezone
 
 from googleapiclient.discovery import build, HttpError, Resource
+from googleapiclient.discovery_cache.base import Cache
 from httplib2 import Http
 from oauth2client import client
 
@@ -168,7 +169,8 @@ def build_oauth_http_object_from_tokens(
     )
     if not credentials:
         return None
-    http_object: Http = credentials.authorize(Http())
+    http_object: Http = credentials.authorize(
+        Http(timeout=settings.INTEGRATION_HTTP_TIMEOUT_SECONDS))
     update_model_with_token_from_http_request(
         http_object, model_object_to_update, access_token_field
     )
@@ -176,6 +178,24 @@ def build_oauth_http_object_from_tokens(
     return http_object
 
 
+class DiscoveryDocumentCache(Cache):
+    """
+    In-process cache of API discovery documents, so that building a service
+    resource doesn't download the discovery document every time
+    """
+    def __init__(self) -> None:
+        self._documents: Dict[str, str] = {}
+
+    def get(self, url):
+        return self._documents.get(url, None)
+
+    def set(self, url, content):
+        self._documents[url] = content
+
+
+discovery_document_cache = DiscoveryDocumentCache()
+
+
 def build_google_calendar_events_service_resource(oauth_http_object: Http) -> Resource:
     """
     Return lazy Resource object for Google Calendar Events API, pre-initialized with
@@ -183,7 +203,9 @@ def build_google_calendar_events_service_resource(oauth_http_object: Http) -> Re
     :param oauth_http_object:
     :return:
     """
-    calendar_service: Resource = build('calendar', 'v3', http=oauth_http_object)
+    calendar_service: Resource = build(
+        'calendar', 'v3', http=oauth_http_object, cache=discovery_document_cache
+    )
     return calendar_service.events()
 
 
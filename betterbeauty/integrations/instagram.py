@@ -1,9 +1,9 @@
 from typing import Dict, List, NamedTuple, Optional
 
-import requests
 from rest_framework import status
 
 from core.types import StrEnum
+from .gateway import get_http_session
 
 INSTAGRAM_API_ENDPOINT = 'https://api.instagram.com/v1'
 
@@ -57,7 +57,7 @@ def get_recent_media(
     if min_id is not None:
         url = '{0}&min_id={1}'.format(url, min_id)
 
-    response = requests.get(url)
+    response = get_http_session().get(url)
     media_items: List[InstagramMediaItem] = []
     if status.is_success(response.status_code):
         for media_item in response.json()['data']:
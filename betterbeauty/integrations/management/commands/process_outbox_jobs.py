@@ -0,0 +1,61 @@
+import time
+
+from django.core.management import BaseCommand
+
+from integrations.outbox import process_outbox_jobs
+from integrations.types import OutboxIntegration
+
+
+class Command(BaseCommand):
+    """
+    Run due outbox jobs, i.e. side effects (notifications, calendar events, Slack
+    messages, SMS etc.) recorded by requests. Several instances can run at the
+    same time.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-d',
+            '--dry-run',
+            action='store_true',
+            dest='dry_run',
+            help="Dry-run. Don't actually do anything.",
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=1000,
+            dest='limit',
+            help='Maximum number of jobs run by each worker thread.',
+        )
+        parser.add_argument(
+            '-i',
+            '--integration',
+            action='append',
+            choices=[integration.value for integration in OutboxIntegration],
+            dest='integrations',
+            help='Only run jobs of given integration; can be repeated.',
+        )
+
+    def handle(self, *args, **options):
+        integrations = None
+        if options['integrations']:
+            integrations = [OutboxIntegration(i) for i in options['integrations']]
+        started_at = time.monotonic()
+        stats = process_outbox_jobs(
+            stdout=self.stdout, dry_run=options['dry_run'], limit=options['limit'],
+            integrations=integrations
+        )
+        elapsed_seconds = max(time.monotonic() - started_at, 0.001)
+        for job_type, job_stats in sorted(stats.items()):
+            job_count = job_stats.completed + job_stats.failed
+            self.stdout.write(
+                '{0}: {1} completed, {2} failed, {3:.1f} jobs/s, '
+                '{4:.3f}s average run time'.format(
+                    job_type, job_stats.completed, job_stats.failed,
+                    job_count / elapsed_seconds, job_stats.duration_seconds / job_count
+                )
+            )
+        self.stdout.write('{0} outbox jobs completed'.format(
+            sum(job_stats.completed for job_stats in stats.values())
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 2.1 on 2019-03-01 14:00
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCacheEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_address', models.CharField(max_length=255)),
+                ('country', models.CharField(blank=True, default='', max_length=25)),
+                ('results', django.contrib.postgres.fields.jsonb.JSONField(default=list)),
+                ('is_resolved', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'geocode_cache_entry',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='geocodecacheentry',
+            unique_together={('normalized_address', 'country')},
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.1 on 2019-03-03 12:00
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(max_length=64)),
+                ('payload', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(blank=True, default=None, null=True)),
+                ('last_error', models.TextField(blank=True, default=None, null=True)),
+            ],
+            options={
+                'db_table': 'outbox_job',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxjob',
+            index=models.Index(fields=['completed_at', 'run_after'], name='outbox_job_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.1 on 2019-03-04 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0002_outboxjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxjob',
+            name='integration',
+            field=models.CharField(default='', max_length=32),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE outbox_job SET integration = CASE job_type
+              WHEN 'new_appointment_notification' THEN 'notifications'
+              WHEN 'slack_auto_booking' THEN 'slack'
+              WHEN 'google_calendar_sync' THEN 'google_calendar'
+            END;
+            """,
+            reverse_sql=migrations.RunSQL.noop
+        ),
+        migrations.AddField(
+            model_name='outboxjob',
+            name='idempotency_key',
+            field=models.CharField(blank=True, default=None, max_length=128, null=True, unique=True),
+        ),
+        migrations.RemoveIndex(
+            model_name='outboxjob',
+            name='outbox_job_pending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='outboxjob',
+            index=models.Index(fields=['integration', 'completed_at', 'run_after'], name='outbox_job_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+from django.utils import timezone
+
+
+class GeocodeCacheEntry(models.Model):
+    """
+    Raw geocoding API results for a normalized address and country. Entries
+    without usable results (is_resolved=False) are kept as well, so that
+    unresolvable input is not sent to the API again until the entry expires.
+    """
+    normalized_address = models.CharField(max_length=255)
+    country = models.CharField(max_length=25, blank=True, default='')
+    results = JSONField(default=list)
+    is_resolved = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'geocode_cache_entry'
+        unique_together = ('normalized_address', 'country', )
+
+    def __str__(self):
+        return '{0} ({1})'.format(self.normalized_address, self.country or '-')
+
+
+class OutboxJob(models.Model):
+    """
+    Side effect of a change (e.g. a call to an external service), which is recorded
+    in the same transaction as the change itself and is run afterwards by
+    `process_outbox_jobs` command. Job is recorded if and only if the change
+    is committed, and the request making the change doesn't wait for it.
+    """
+    job_type = models.CharField(max_length=64)
+    integration = models.CharField(max_length=32)
+    payload = JSONField(default=dict)
+    # jobs enqueued with the same key are recorded (and run) only once
+    idempotency_key = models.CharField(
+        max_length=128, null=True, blank=True, default=None, unique=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True, default=None)
+    last_error = models.TextField(null=True, blank=True, default=None)
+
+    class Meta:
+        db_table = 'outbox_job'
+        indexes = [
+            models.Index(
+                fields=['integration', 'completed_at', 'run_after'],
+                name='outbox_job_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return '{0} #{1}'.format(self.job_type, self.id)
@@ -0,0 +1,170 @@
+import datetime
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import TextIOBase
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxJob
+from .types import OUTBOX_JOB_INTEGRATIONS, OutboxIntegration, OutboxJobStats, OutboxJobType
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_outbox_job(
+        job_type: OutboxJobType, payload: Dict, idempotency_key: Optional[str]=None
+) -> OutboxJob:
+    """
+    Record a job to be run by `process_outbox_jobs` command. Must be called within
+    the transaction which makes the change causing the job.
+
+    :param job_type: type of the job, see OUTBOX_JOB_HANDLERS setting
+    :param payload: JSON-serializable job parameters passed to the handler
+    :param idempotency_key: if given, and a job with the same key was already
+    recorded, that job is returned and no new job is recorded
+    :return: recorded job
+    """
+    job_fields = {
+        'job_type': job_type.value,
+        'integration': OUTBOX_JOB_INTEGRATIONS[job_type].value,
+        'payload': payload,
+    }
+    if idempotency_key is None:
+        return OutboxJob.objects.create(**job_fields)
+    job, created = OutboxJob.objects.get_or_create(
+        idempotency_key=idempotency_key, defaults=job_fields
+    )
+    return job
+
+
+def get_outbox_job_handler(job_type: str) -> Callable[..., None]:
+    return import_string(settings.OUTBOX_JOB_HANDLERS[job_type])
+
+
+def get_retry_delay(attempts: int) -> datetime.timedelta:
+    """Return delay before the next attempt, doubling with every failed attempt"""
+    return datetime.timedelta(seconds=min(
+        settings.OUTBOX_RETRY_DELAY_SECONDS * 2 ** (attempts - 1),
+        settings.OUTBOX_MAX_RETRY_DELAY_SECONDS
+    ))
+
+
+def run_outbox_job(job: OutboxJob) -> bool:
+    """
+    Run job handler and record the outcome. Failed job is retried with exponential
+    backoff, until OUTBOX_MAX_ATTEMPTS attempts are made.
+
+    :return: True if job completed successfully
+    """
+    job.attempts += 1
+    try:
+        # handler's DB changes are rolled back to savepoint if it fails
+        with transaction.atomic():
+            get_outbox_job_handler(job.job_type)(
+                job.payload, last_attempt=job.attempts >= settings.OUTBOX_MAX_ATTEMPTS
+            )
+    except Exception as e:
+        logger.exception('Outbox job {0} failed on attempt {1}'.format(job, job.attempts))
+        job.last_error = str(e)
+        job.run_after = timezone.now() + get_retry_delay(job.attempts)
+        job.save(update_fields=['attempts', 'last_error', 'run_after'])
+        return False
+    job.completed_at = timezone.now()
+    job.save(update_fields=['attempts', 'completed_at'])
+    return True
+
+
+def get_due_outbox_jobs(integration: Optional[OutboxIntegration]=None) -> models.QuerySet:
+    queryset = OutboxJob.objects.filter(
+        completed_at__isnull=True,
+        run_after__lte=timezone.now(),
+        attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+    )
+    if integration is not None:
+        queryset = queryset.filter(integration=integration.value)
+    return queryset.order_by('id')
+
+
+def claim_next_outbox_job(integration: OutboxIntegration) -> Optional[OutboxJob]:
+    """
+    Lock the oldest due job of the integration, skipping jobs locked by other
+    workers. Must be called within a transaction, which holds the lock until
+    the job is run
+    """
+    return get_due_outbox_jobs(integration).select_for_update(skip_locked=True).first()
+
+
+def run_integration_jobs(
+        integration: OutboxIntegration, limit: int
+) -> Dict[str, OutboxJobStats]:
+    """
+    Run due jobs of the integration one by one, each in its own transaction.
+    Called in a worker thread, several threads can run jobs of the same integration.
+
+    :return: stats of the run by job type
+    """
+    stats: Dict[str, OutboxJobStats] = defaultdict(OutboxJobStats)
+    try:
+        for i in range(limit):
+            with transaction.atomic():
+                job = claim_next_outbox_job(integration)
+                if job is None:
+                    break
+                started_at = time.monotonic()
+                completed = run_outbox_job(job)
+                job_stats = stats[job.job_type]
+                stats[job.job_type] = job_stats._replace(
+                    completed=job_stats.completed + int(completed),
+                    failed=job_stats.failed + int(not completed),
+                    duration_seconds=(
+                        job_stats.duration_seconds + time.monotonic() - started_at
+                    ),
+                )
+    finally:
+        # worker thread has its own DB connection
+        connection.close()
+    return stats
+
+
+def process_outbox_jobs(
+        stdout: TextIOBase, dry_run: bool=False, limit: int=1000,
+        integrations: Optional[List[OutboxIntegration]]=None
+) -> Dict[str, OutboxJobStats]:
+    """
+    Run due outbox jobs, with OUTBOX_INTEGRATION_CONCURRENCY worker threads per
+    integration. Several processes can run at the same time, jobs are claimed
+    with SKIP LOCKED so every job is run by exactly one of them.
+
+    :param limit: maximum number of jobs run by each worker thread
+    :param integrations: integrations to run jobs of; all if not given
+    :return: stats of the run by job type
+    """
+    if integrations is None:
+        integrations = list(OutboxIntegration)
+    if dry_run:
+        for integration in integrations:
+            for job in get_due_outbox_jobs(integration)[:limit]:
+                stdout.write('Would run {0}'.format(job))
+        return {}
+    worker_integrations = [
+        integration for integration in integrations
+        for i in range(settings.OUTBOX_INTEGRATION_CONCURRENCY.get(integration.value, 1))
+    ]
+    stats: Dict[str, OutboxJobStats] = defaultdict(OutboxJobStats)
+    with ThreadPoolExecutor(max_workers=len(worker_integrations)) as executor:
+        futures = [
+            executor.submit(run_integration_jobs, integration, limit)
+            for integration in worker_integrations
+        ]
+        for future in futures:
+            for job_type, worker_stats in future.result().items():
+                stats[job_type] = OutboxJobStats(
+                    *[a + b for a, b in zip(stats[job_type], worker_stats)]
+                )
+    return dict(stats)
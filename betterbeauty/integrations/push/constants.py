@@ -1,3 +1,16 @@
 class ErrorMessages(object):
     ERR_DUPLICATE_PUSH_TOKEN = 'err_duplicate_push_token'
     ERR_DEVICE_NOT_FOUND = 'err_device_not_found'
+
+
+FCM_POST_URL = 'https://fcm.googleapis.com/fcm/send'
+# FCM legacy HTTP API accepts at most this many registration ids per request
+FCM_MAX_RECIPIENTS = 1000
+
+# per-device errors meaning that the token will never be valid again
+APNS_DEAD_TOKEN_ERRORS = frozenset([
+    'BadDeviceToken', 'DeviceTokenNotForTopic', 'Unregistered',
+])
+FCM_DEAD_TOKEN_ERRORS = frozenset([
+    'InvalidRegistration', 'MismatchSenderId', 'NotRegistered',
+])
@@ -0,0 +1,175 @@
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from apns2.client import APNsClient, Notification as APNSNotification
+from apns2.payload import Payload
+from django.conf import settings
+from push_notifications.models import APNSDevice, GCMDevice
+
+from integrations.gateway import get_http_session, run_batch
+from .constants import (
+    APNS_DEAD_TOKEN_ERRORS,
+    FCM_DEAD_TOKEN_ERRORS,
+    FCM_MAX_RECIPIENTS,
+    FCM_POST_URL,
+)
+from .types import PushDelivery, PushRegistrationIdType
+
+logger = logging.getLogger(__name__)
+
+_apns_clients: Dict[str, APNsClient] = {}
+_apns_clients_lock = threading.Lock()
+
+
+def get_push_app_settings(application_id: str) -> Dict[str, Any]:
+    return settings.PUSH_NOTIFICATIONS_SETTINGS['APPLICATIONS'][application_id]
+
+
+def get_apns_client(application_id: str) -> APNsClient:
+    """Return APNS client of the app, which keeps its HTTP/2 connection open"""
+    with _apns_clients_lock:
+        if application_id not in _apns_clients:
+            app_settings = get_push_app_settings(application_id)
+            _apns_clients[application_id] = APNsClient(
+                str(app_settings['CERTIFICATE']),
+                use_sandbox=app_settings.get('USE_SANDBOX', False)
+            )
+        return _apns_clients[application_id]
+
+
+def send_apns_batch(
+        application_id: str, deliveries: List[PushDelivery]
+) -> List[Optional[str]]:
+    """
+    Send APNS notifications of the app over one connection, in chunks of
+    PUSH_APNS_BATCH_SIZE; every device gets its own payload.
+
+    :return: error of every delivery (None if delivered), in the order of deliveries
+    """
+    topic = get_push_app_settings(application_id).get('TOPIC')
+    client = get_apns_client(application_id)
+    errors: List[Optional[str]] = []
+    for i in range(0, len(deliveries), settings.PUSH_APNS_BATCH_SIZE):
+        chunk = deliveries[i:i + settings.PUSH_APNS_BATCH_SIZE]
+        try:
+            results = client.send_notification_batch([
+                APNSNotification(token=delivery.registration_id, payload=Payload(
+                    alert=delivery.message, badge=delivery.badge_count,
+                    custom=delivery.extra
+                )) for delivery in chunk
+            ], topic=topic)
+        except Exception as e:
+            logger.exception('Failed APNS batch of {0} notifications to {1}'.format(
+                len(chunk), application_id
+            ))
+            errors += [type(e).__name__] * len(chunk)
+            continue
+        for delivery in chunk:
+            result = results.get(delivery.registration_id, 'NoResult')
+            errors.append(None if result == 'Success' else result)
+    return errors
+
+
+def send_fcm_multicast(
+        application_id: str, registration_ids: List[str], data: Dict[str, Any]
+) -> List[Optional[str]]:
+    """
+    Send the same data message to up to FCM_MAX_RECIPIENTS devices of the app
+    with one request to FCM legacy HTTP API
+
+    :return: error of every device (None if delivered), in the order of registration ids
+    """
+    app_settings = get_push_app_settings(application_id)
+    response = get_http_session().post(
+        app_settings.get('POST_URL', FCM_POST_URL),
+        json={'registration_ids': registration_ids, 'data': data},
+        headers={'Authorization': 'key={0}'.format(app_settings['API_KEY'])}
+    )
+    response.raise_for_status()
+    return [result.get('error') for result in response.json()['results']]
+
+
+def deactivate_dead_devices(
+        deliveries: List[PushDelivery], errors: List[Optional[str]]
+) -> int:
+    """
+    Deactivate devices whose tokens were rejected as invalid, with one UPDATE
+    per device type
+
+    :return: number of deactivated devices
+    """
+    dead_apns_tokens = set()
+    dead_fcm_tokens = set()
+    for delivery, error in zip(deliveries, errors):
+        if delivery.registration_id_type == PushRegistrationIdType.APNS:
+            if error in APNS_DEAD_TOKEN_ERRORS:
+                dead_apns_tokens.add(delivery.registration_id)
+        elif error in FCM_DEAD_TOKEN_ERRORS:
+            dead_fcm_tokens.add(delivery.registration_id)
+    deactivated = 0
+    if dead_apns_tokens:
+        deactivated += APNSDevice.objects.filter(
+            registration_id__in=dead_apns_tokens, active=True
+        ).update(active=False)
+    if dead_fcm_tokens:
+        deactivated += GCMDevice.objects.filter(
+            registration_id__in=dead_fcm_tokens, cloud_message_type='FCM', active=True
+        ).update(active=False)
+    return deactivated
+
+
+def send_push_deliveries(deliveries: List[PushDelivery]) -> List[Optional[str]]:
+    """
+    Send push messages to many devices at once. APNS messages are batched per app,
+    FCM messages are grouped by app, message and payload, and every group is sent
+    as multicast requests; batches are sent concurrently through integration gateway.
+    Devices with dead tokens are deactivated.
+
+    :return: error of every delivery (None if delivered), in the order of deliveries
+    """
+    apns_indexes: Dict[str, List[int]] = defaultdict(list)
+    fcm_indexes: Dict[Tuple[str, str, str], List[int]] = defaultdict(list)
+    for index, delivery in enumerate(deliveries):
+        if delivery.registration_id_type == PushRegistrationIdType.APNS:
+            apns_indexes[delivery.application_id].append(index)
+        else:
+            fcm_indexes[(
+                delivery.application_id, delivery.message,
+                json.dumps(delivery.extra, sort_keys=True)
+            )].append(index)
+
+    calls: List[Callable[[], List[Optional[str]]]] = []
+    call_indexes: List[List[int]] = []
+    for application_id, indexes in apns_indexes.items():
+        calls.append(lambda application_id=application_id, indexes=indexes: send_apns_batch(
+            application_id, [deliveries[index] for index in indexes]
+        ))
+        call_indexes.append(indexes)
+    for (application_id, message, payload), indexes in fcm_indexes.items():
+        # Although we're dealing with FCM here, message is sent in `body` key of
+        # data payload, see `send_message_to_fcm_devices_of_user`
+        data = dict(json.loads(payload), body=message)
+        for i in range(0, len(indexes), FCM_MAX_RECIPIENTS):
+            chunk = indexes[i:i + FCM_MAX_RECIPIENTS]
+            calls.append(lambda application_id=application_id, chunk=chunk, data=data: (
+                send_fcm_multicast(
+                    application_id, [deliveries[index].registration_id for index in chunk],
+                    data
+                )
+            ))
+            call_indexes.append(chunk)
+
+    errors: List[Optional[str]] = [None] * len(deliveries)
+    for indexes, result in zip(call_indexes, run_batch(calls)):
+        for position, index in enumerate(indexes):
+            if result.error is not None:
+                errors[index] = type(result.error).__name__
+            else:
+                errors[index] = result.value[position]
+    deactivated = deactivate_dead_devices(deliveries, errors)
+    if deactivated:
+        logger.info('Deactivated {0} push devices with dead tokens'.format(deactivated))
+    return errors
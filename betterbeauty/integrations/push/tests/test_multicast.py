@@ -0,0 +1,178 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import mock
+import pytest
+from django.test import override_settings
+from django_dynamic_fixture import G
+from push_notifications.models import APNSDevice, GCMDevice
+
+from .. import multicast
+from ..multicast import send_push_deliveries
+from ..types import MobileAppIdType, PushDelivery, PushRegistrationIdType
+
+
+class FakeFCMRequestHandler(BaseHTTPRequestHandler):
+    """Stand-in for FCM legacy HTTP API; tokens starting with `dead` are not registered"""
+    protocol_version = 'HTTP/1.1'
+    requests = []
+    status_code = 200
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.requests.append((self.headers['Authorization'], request))
+        body = json.dumps({'results': [
+            {'error': 'NotRegistered'} if token.startswith('dead') else {'message_id': '1'}
+            for token in request['registration_ids']
+        ]}).encode('utf-8')
+        self.send_response(self.status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeAPNsClient(object):
+    """Stand-in for APNS HTTP/2 client; tokens starting with `dead` are unregistered"""
+    batches = []
+
+    def __init__(self, credentials, use_sandbox=False):
+        self.credentials = credentials
+
+    def send_notification_batch(self, notifications, topic=None):
+        self.batches.append((topic, notifications))
+        return {
+            notification.token: (
+                'Unregistered' if notification.token.startswith('dead') else 'Success'
+            ) for notification in notifications
+        }
+
+
+@pytest.fixture
+def fcm_url():
+    FakeFCMRequestHandler.requests = []
+    FakeFCMRequestHandler.status_code = 200
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeFCMRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{0}/fcm/send'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def push_settings(fcm_url):
+    FakeAPNsClient.batches = []
+    with override_settings(PUSH_APNS_BATCH_SIZE=2, PUSH_NOTIFICATIONS_SETTINGS={
+        'APPLICATIONS': {
+            MobileAppIdType.ANDROID_CLIENT.value: {
+                'PLATFORM': 'FCM', 'API_KEY': 'fcm-key', 'POST_URL': fcm_url,
+            },
+            MobileAppIdType.IOS_CLIENT.value: {
+                'PLATFORM': 'APNS', 'CERTIFICATE': 'client.pem',
+                'TOPIC': 'com.madebeauty.client',
+            },
+        }
+    }):
+        with mock.patch.object(multicast, 'APNsClient', FakeAPNsClient):
+            with mock.patch.dict(multicast._apns_clients, clear=True):
+                yield
+
+
+def make_delivery(registration_id, registration_id_type, message='Deal of the week',
+                  extra=None) -> PushDelivery:
+    return PushDelivery(
+        registration_id=registration_id,
+        registration_id_type=registration_id_type,
+        application_id=(
+            MobileAppIdType.IOS_CLIENT.value
+            if registration_id_type == PushRegistrationIdType.APNS
+            else MobileAppIdType.ANDROID_CLIENT.value
+        ),
+        message=message,
+        extra=extra if extra is not None else {'code': 'deal_of_the_week'},
+    )
+
+
+class TestSendPushDeliveries(object):
+
+    @pytest.mark.django_db
+    def test_send_push_deliveries(self, push_settings):
+        dead_fcm_device = G(
+            GCMDevice, registration_id='dead-fcm', cloud_message_type='FCM', active=True,
+            application_id=MobileAppIdType.ANDROID_CLIENT
+        )
+        dead_apns_device = G(
+            APNSDevice, registration_id='dead-apns', active=True,
+            application_id=MobileAppIdType.IOS_CLIENT
+        )
+        live_apns_device = G(
+            APNSDevice, registration_id='apns-1', active=True,
+            application_id=MobileAppIdType.IOS_CLIENT
+        )
+        errors = send_push_deliveries([
+            make_delivery('fcm-1', PushRegistrationIdType.FCM),
+            make_delivery('dead-fcm', PushRegistrationIdType.FCM),
+            make_delivery('fcm-2', PushRegistrationIdType.FCM, message='Hello',
+                          extra={'code': 'hint_to_rebook'}),
+            make_delivery('apns-1', PushRegistrationIdType.APNS),
+            make_delivery('dead-apns', PushRegistrationIdType.APNS),
+            make_delivery('apns-2', PushRegistrationIdType.APNS),
+        ])
+        assert(errors == [None, 'NotRegistered', None, None, 'Unregistered', None])
+
+        # FCM messages with the same payload are sent as one multicast request
+        requests = sorted(FakeFCMRequestHandler.requests, key=lambda r: r[1]['data']['body'])
+        assert(requests == [
+            ('key=fcm-key', {
+                'registration_ids': ['fcm-1', 'dead-fcm'],
+                'data': {'code': 'deal_of_the_week', 'body': 'Deal of the week'},
+            }),
+            ('key=fcm-key', {
+                'registration_ids': ['fcm-2'],
+                'data': {'code': 'hint_to_rebook', 'body': 'Hello'},
+            }),
+        ])
+        # APNS messages are sent in batches of PUSH_APNS_BATCH_SIZE
+        assert([
+            (topic, [n.token for n in notifications])
+            for topic, notifications in FakeAPNsClient.batches
+        ] == [
+            ('com.madebeauty.client', ['apns-1', 'dead-apns']),
+            ('com.madebeauty.client', ['apns-2']),
+        ])
+        assert(FakeAPNsClient.batches[0][1][0].payload.custom == {
+            'code': 'deal_of_the_week'
+        })
+
+        dead_fcm_device.refresh_from_db()
+        assert(dead_fcm_device.active is False)
+        dead_apns_device.refresh_from_db()
+        assert(dead_apns_device.active is False)
+        live_apns_device.refresh_from_db()
+        assert(live_apns_device.active is True)
+
+    @pytest.mark.django_db
+    def test_failed_request(self, push_settings):
+        FakeFCMRequestHandler.status_code = 500
+        device = G(
+            GCMDevice, registration_id='dead-fcm', cloud_message_type='FCM', active=True,
+            application_id=MobileAppIdType.ANDROID_CLIENT
+        )
+        errors = send_push_deliveries([
+            make_delivery('fcm-1', PushRegistrationIdType.FCM),
+            make_delivery('dead-fcm', PushRegistrationIdType.FCM),
+            make_delivery('apns-1', PushRegistrationIdType.APNS),
+        ])
+        assert(errors == ['HTTPError', 'HTTPError', None])
+        device.refresh_from_db()
+        assert(device.active is True)
@@ -1,8 +1,8 @@
-from typing import List
+from typing import Any, Dict, List, NamedTuple
 
 from model_utils import Choices
 
-from core.types import StrEnum
+from core.types import StrEnum, UserRole
 
 
 class PushRegistrationIdType(StrEnum):
@@ -36,3 +36,24 @@ STYLIST_APP_IDS: List[MobileAppIdType] = [
     MobileAppIdType.IOS_STYLIST_DEV,
     MobileAppIdType.ANDROID_STYLIST
 ]
+
+# applications to which push notifications for given role are sent
+APNS_APP_IDS_BY_ROLE: Dict[UserRole, List[MobileAppIdType]] = {
+    UserRole.STYLIST: [MobileAppIdType.IOS_STYLIST, MobileAppIdType.IOS_STYLIST_DEV],
+    UserRole.CLIENT: [MobileAppIdType.IOS_CLIENT, MobileAppIdType.IOS_CLIENT_DEV],
+}
+
+FCM_APP_IDS_BY_ROLE: Dict[UserRole, List[MobileAppIdType]] = {
+    UserRole.STYLIST: [MobileAppIdType.ANDROID_STYLIST, ],
+    UserRole.CLIENT: [MobileAppIdType.ANDROID_CLIENT, ],
+}
+
+
+class PushDelivery(NamedTuple):
+    """Push message to a single device"""
+    registration_id: str
+    registration_id_type: PushRegistrationIdType
+    application_id: str
+    message: str
+    extra: Dict[str, Any]
+    badge_count: int = 0
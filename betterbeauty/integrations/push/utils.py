@@ -1,5 +1,6 @@
 import logging
-from typing import Any, Dict, Optional, Tuple, Union
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 from django.db import models, transaction
 from push_notifications import NotificationError
@@ -8,6 +9,8 @@ from push_notifications.models import APNSDevice, GCMDevice
 from core.models import User
 from core.types import UserRole
 from .types import (
+    APNS_APP_IDS_BY_ROLE,
+    FCM_APP_IDS_BY_ROLE,
     MobileAppIdType,
     PushRegistrationIdType,
 )
@@ -147,10 +150,7 @@ def unregister_device(
 
 def get_fcm_devices_for_user_and_role(user: User, user_role: UserRole) -> models.QuerySet:
     """Return all FCM devices for give user and role"""
-    eligible_fcm_app_ids = {
-        UserRole.STYLIST: [MobileAppIdType.ANDROID_STYLIST, ],
-        UserRole.CLIENT: [MobileAppIdType.ANDROID_CLIENT, ]
-    }[user_role]
+    eligible_fcm_app_ids = FCM_APP_IDS_BY_ROLE[user_role]
     # Based on django_push_notifications documentation, we should specifically add
     # this filter (`cloud_message_type='FCM'`)
     fcm_devices = user.gcmdevice_set.filter(
@@ -160,10 +160,7 @@ def get_fcm_devices_for_user_and_role(user: User, user_role: UserRole) -> models
 
 def get_apns_devices_for_user_and_role(user: User, user_role: UserRole) -> models.QuerySet:
     """Return all APNS devices for give user and role"""
-    eligible_apns_app_ids = {
-        UserRole.STYLIST: [MobileAppIdType.IOS_STYLIST, MobileAppIdType.IOS_STYLIST_DEV],
-        UserRole.CLIENT: [MobileAppIdType.IOS_CLIENT, MobileAppIdType.IOS_CLIENT_DEV]
-    }[user_role]
+    eligible_apns_app_ids = APNS_APP_IDS_BY_ROLE[user_role]
     apns_devices = user.apnsdevice_set.filter(
         application_id__in=eligible_apns_app_ids, active=True)
     return apns_devices
@@ -229,3 +226,70 @@ def has_push_notification_device(user: User, user_role: UserRole) -> bool:
     fcm_devices = get_fcm_devices_for_user_and_role(user=user, user_role=user_role)
     apns_devices = get_apns_devices_for_user_and_role(user=user, user_role=user_role)
     return fcm_devices.exists() or apns_devices.exists()
+
+
+def get_active_push_devices_of_users(
+        user_ids: Iterable[int]
+) -> Dict[Tuple[int, str], List[Union[APNSDevice, GCMDevice]]]:
+    """
+    Return active APNS and FCM devices of given users, with one query per
+    device type.
+
+    :param user_ids: ids of users to return devices of
+    :return: devices grouped by (user id, application id)
+    """
+    devices: Dict[
+        Tuple[int, str], List[Union[APNSDevice, GCMDevice]]
+    ] = defaultdict(list)
+    user_ids = list(user_ids)
+    if not user_ids:
+        return devices
+    for device in APNSDevice.objects.filter(user_id__in=user_ids, active=True):
+        devices[(device.user_id, device.application_id)].append(device)
+    for device in GCMDevice.objects.filter(
+            user_id__in=user_ids, active=True, cloud_message_type='FCM'
+    ):
+        devices[(device.user_id, device.application_id)].append(device)
+    return devices
+
+
+def get_push_devices_in(
+        devices: Dict[Tuple[int, str], List[Union[APNSDevice, GCMDevice]]],
+        user_id: int, user_role: UserRole
+) -> List[Union[APNSDevice, GCMDevice]]:
+    """
+    In-memory equivalent of `get_apns_devices_for_user_and_role` and
+    `get_fcm_devices_for_user_and_role` for devices returned by
+    `get_active_push_devices_of_users`
+    """
+    user_role = UserRole(user_role)
+    return [
+        device
+        for app_id in APNS_APP_IDS_BY_ROLE[user_role] + FCM_APP_IDS_BY_ROLE[user_role]
+        for device in devices.get((user_id, app_id.value), [])
+    ]
+
+
+def has_push_device_in(
+        devices: Dict[Tuple[int, str], List[Union[APNSDevice, GCMDevice]]],
+        user_id: int, user_role: UserRole
+) -> bool:
+    """In-memory equivalent of `has_push_notification_device`"""
+    return bool(get_push_devices_in(devices, user_id=user_id, user_role=user_role))
+
+
+def handle_push_message(payload: Dict[str, Any], last_attempt: bool=False):
+    """
+    Outbox job handler sending message to all push devices of the user;
+    payload has `user_id`, `user_role`, `message`, `extra` and `badge_count` keys
+    """
+    user: User = User.objects.get(id=payload['user_id'])
+    user_role = UserRole(payload['user_role'])
+    send_message_to_apns_devices_of_user(
+        user=user, user_role=user_role, message=payload['message'],
+        extra=payload.get('extra', {}), badge_count=payload.get('badge_count', 0)
+    )
+    send_message_to_fcm_devices_of_user(
+        user=user, user_role=user_role, message=payload['message'],
+        extra=payload.get('extra', {}), badge_count=payload.get('badge_count', 0)
+    )
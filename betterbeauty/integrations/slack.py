@@ -1,34 +1,52 @@
+import json
 import logging
+from typing import Dict
 
 from django.conf import settings
 from django.template.loader import render_to_string
 
-from slackweb import Slack
-
 from core.constants import EnvLevel
+from .gateway import get_http_session
 
 logger = logging.getLogger(__name__)
 
 
-def send_slack_message(channel: str, slack_url: str, bot_name: str, message: str):
+def send_slack_message(
+        channel: str, slack_url: str, bot_name: str, message: str, raise_errors: bool=False
+):
+    """
+    Post message to Slack channel. Errors are logged and swallowed in production,
+    unless raise_errors is True (e.g. when the caller retries failed messages)
+    """
     if not settings.IS_SLACK_ENABLED:
         return
-    slack = Slack(url=slack_url)
     try:
-        slack.notify(
-            text=message,
-            channel=channel,
-            username=bot_name,
-        )
+        response = get_http_session().post(slack_url, data={'payload': json.dumps({
+            'text': message,
+            'channel': channel,
+            'username': bot_name,
+        })})
+        response.raise_for_status()
     except:  # noqa
         # we really don't want this to break the flow for whatever reason
-        if settings.LEVEL != EnvLevel.PRODUCTION:
+        if raise_errors or settings.LEVEL != EnvLevel.PRODUCTION:
             raise
         logger.exception('Failed to send Slack message to channel {}'.format(
             channel
         ), exc_info=True)
 
 
+def handle_slack_message(payload: Dict, last_attempt: bool=False):
+    """
+    Outbox job handler; payload has `channel`, `slack_url`, `bot_name` and `message` keys.
+    Failed message is raised, so that the job is retried
+    """
+    send_slack_message(
+        channel=payload['channel'], slack_url=payload['slack_url'],
+        bot_name=payload['bot_name'], message=payload['message'], raise_errors=True
+    )
+
+
 def send_slack_twilio_message_notification(from_phone, to_phone, message):
     # TODO: update context with stylist and client
     message = render_to_string(
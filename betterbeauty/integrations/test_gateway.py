@@ -0,0 +1,96 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+import requests
+from django.test import override_settings
+
+from .gateway import IntegrationGateway, IntegrationHttpSession
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    """Keeps connections alive and records client port of every request"""
+    protocol_version = 'HTTP/1.1'
+    client_ports = []
+
+    def do_GET(self):
+        self.client_ports.append(self.client_address[1])
+        if self.path == '/slow':
+            time.sleep(0.5)
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def server_url():
+    FixtureRequestHandler.client_ports = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{0}'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+class TestIntegrationHttpSession(object):
+    def test_connections_are_kept_alive(self, server_url):
+        session = IntegrationHttpSession()
+        for i in range(3):
+            assert(session.get(server_url + '/').status_code == 200)
+        assert(len(FixtureRequestHandler.client_ports) == 3)
+        assert(len(set(FixtureRequestHandler.client_ports)) == 1)
+
+    @override_settings(INTEGRATION_HTTP_TIMEOUT_SECONDS=0.1)
+    def test_default_timeout(self, server_url):
+        session = IntegrationHttpSession()
+        with pytest.raises(requests.Timeout):
+            session.get(server_url + '/slow')
+        # explicit timeout takes precedence
+        assert(session.get(server_url + '/slow', timeout=2).status_code == 200)
+
+
+class TestIntegrationGateway(object):
+    def test_run_batch(self):
+        gateway = IntegrationGateway(max_workers=10)
+        lock = threading.Lock()
+        in_flight = [0]
+        max_in_flight = [0]
+
+        def call(i):
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            if i == 5:
+                raise ValueError('Service is not available')
+            return i * 2
+
+        results = gateway.run_batch(
+            [lambda i=i: call(i) for i in range(10)], concurrency=3
+        )
+        assert([r.value for r in results] == [0, 2, 4, 6, 8, None, 12, 14, 16, 18])
+        assert(isinstance(results[5].error, ValueError))
+        assert(all(r.error is None for r in results if r.value is not None))
+        assert(max_in_flight[0] == 3)
+        assert(gateway.run_batch([]) == [])
+
+    def test_batch_runs_concurrently(self):
+        gateway = IntegrationGateway(max_workers=10)
+        started_at = time.monotonic()
+        gateway.run_batch([lambda: time.sleep(0.2) for i in range(10)], concurrency=10)
+        assert(time.monotonic() - started_at < 1)
@@ -0,0 +1,107 @@
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+from freezegun import freeze_time
+
+from .gmaps import (
+    GeoCode,
+    GeocodingError,
+    get_geocode_results,
+    normalize_address,
+)
+from .models import GeocodeCacheEntry
+
+MOUNTAIN_VIEW_RESULT = {
+    'address_components': [
+        {'short_name': '94043', 'types': ['postal_code']},
+        {'short_name': 'Mountain View', 'types': ['locality', 'political']},
+        {'short_name': 'CA', 'types': ['administrative_area_level_1', 'political']},
+        {'short_name': 'US', 'types': ['country', 'political']},
+    ],
+    'geometry': {'location': {'lat': 37.4224764, 'lng': -122.0842499}},
+    'types': ['postal_code'],
+}
+
+
+class GeocodingFixtureRequestHandler(BaseHTTPRequestHandler):
+    """Serves geocoding API responses from `responses` dict keyed by address"""
+    responses = {}
+    requests = []
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        address = params['address'][0]
+        self.requests.append(address)
+        status, body = self.responses.get(address, (200, {'status': 'ZERO_RESULTS'}))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def geocoding_server():
+    GeocodingFixtureRequestHandler.responses = {
+        '94043': (200, {'status': 'OK', 'results': [MOUNTAIN_VIEW_RESULT]}),
+        'over limit': (200, {'status': 'OVER_QUERY_LIMIT', 'results': []}),
+        'broken': (500, {}),
+    }
+    GeocodingFixtureRequestHandler.requests = []
+    server = HTTPServer(('127.0.0.1', 0), GeocodingFixtureRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with override_settings(
+        GOOGLE_GEOCODING_API_URL='http://127.0.0.1:{0}'.format(server.server_port),
+        IS_GEOCODING_ENABLED=True
+    ):
+        yield GeocodingFixtureRequestHandler
+    server.shutdown()
+    server.server_close()
+
+
+def test_normalize_address():
+    assert(normalize_address('  1 Main  St ,Los Altos, ') == '1 main st, los altos')
+    assert(normalize_address('94043') == '94043')
+
+
+class TestGetGeocodeResults(object):
+    @pytest.mark.django_db
+    def test_results_are_cached(self, geocoding_server):
+        geo_coded_address = GeoCode('94043').geo_code(country='us')
+        assert(geo_coded_address.city == 'Mountain View')
+        assert(geo_coded_address.zip_code == '94043')
+        assert(geo_coded_address.location.x == -122.0842499)
+        assert(geocoding_server.requests == ['94043'])
+        cache_entry = GeocodeCacheEntry.objects.get(normalized_address='94043', country='US')
+        assert(cache_entry.is_resolved is True)
+
+        assert(GeoCode(' 94043 ').geo_code(country='US').city == 'Mountain View')
+        assert(geocoding_server.requests == ['94043'])
+
+    @pytest.mark.django_db
+    def test_negative_caching(self, geocoding_server):
+        assert(GeoCode('Nowhere').geo_code() is None)
+        assert(GeoCode('nowhere').geo_code() is None)
+        assert(geocoding_server.requests == ['nowhere'])
+        assert(GeocodeCacheEntry.objects.get(normalized_address='nowhere').is_resolved is False)
+        # negative entries expire
+        with freeze_time(timezone.now() + datetime.timedelta(days=31)):
+            assert(get_geocode_results('nowhere') == [])
+        assert(geocoding_server.requests == ['nowhere', 'nowhere'])
+
+    @pytest.mark.django_db
+    def test_errors_are_not_cached(self, geocoding_server):
+        with pytest.raises(GeocodingError):
+            get_geocode_results('over limit')
+        with pytest.raises(GeocodingError):
+            get_geocode_results('broken')
+        assert(GeocodeCacheEntry.objects.count() == 0)
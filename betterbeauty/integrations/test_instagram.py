@@ -105,7 +105,9 @@ def mocked_instagram_requests_get(*args, **kwargs):
     return MockResponse(instagram_recent_media_response(), 200)
 
 
-@mock.patch('integrations.instagram.requests.get', side_effect=mocked_instagram_requests_get)
+@mock.patch(
+    'integrations.gateway.IntegrationHttpSession.get', side_effect=mocked_instagram_requests_get
+)
 def test_get_recent_media(api_mock):
     media = get_recent_media('some_token')
     assert(len(media) == 3)
@@ -0,0 +1,222 @@
+import datetime
+import threading
+from io import StringIO
+
+import mock
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+from django_dynamic_fixture import G
+from freezegun import freeze_time
+from requests.exceptions import HTTPError
+from stripe.error import APIConnectionError, CardError
+
+from appointment.models import Appointment
+from billing.models import Charge
+from billing.types import ChargeStatus
+from core.constants import EnvLevel
+from .models import OutboxJob
+from .outbox import (
+    enqueue_outbox_job,
+    get_retry_delay,
+    process_outbox_jobs,
+    run_outbox_job,
+)
+from .slack import handle_slack_message, send_slack_message
+from .types import OutboxIntegration, OutboxJobType
+
+handled_payloads = []
+handled_payloads_lock = threading.Lock()
+
+TEST_HANDLERS = {
+    OutboxJobType.SLACK_MESSAGE.value: 'integrations.test_outbox.record_payload',
+    OutboxJobType.GOOGLE_CALENDAR_SYNC.value: 'integrations.test_outbox.fail',
+    OutboxJobType.SEND_SMS.value: 'integrations.twilio.handle_send_sms',
+    OutboxJobType.STRIPE_CHARGE.value: 'billing.utils.handle_stripe_charge',
+}
+
+
+def record_payload(payload, last_attempt=False):
+    with handled_payloads_lock:
+        handled_payloads.append(payload)
+
+
+def fail(payload, last_attempt=False):
+    raise ValueError('Calendar is not available')
+
+
+class FakeTwilioClient(object):
+    """Stands in for twilio.rest.Client, recording sent messages"""
+    def __init__(self):
+        self.messages = self
+        self.sent_messages = []
+
+    def create(self, to, from_, body, status_callback):
+        self.sent_messages.append((to, body))
+        return mock.Mock(sid='SM{0}'.format(len(self.sent_messages)))
+
+
+@override_settings(
+    OUTBOX_JOB_HANDLERS=TEST_HANDLERS, OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_DELAY_SECONDS=60,
+    OUTBOX_MAX_RETRY_DELAY_SECONDS=600,
+    OUTBOX_INTEGRATION_CONCURRENCY={'slack': 3, 'google_calendar': 1, 'twilio': 1}
+)
+class TestOutbox(object):
+
+    @pytest.mark.django_db
+    def test_enqueue_outbox_job(self):
+        job = enqueue_outbox_job(OutboxJobType.SEND_SMS, {'to_phone': '+15555555555'})
+        assert(job.integration == OutboxIntegration.TWILIO)
+        assert(job.idempotency_key is None)
+        enqueue_outbox_job(OutboxJobType.SEND_SMS, {'to_phone': '+15555555555'})
+        assert(OutboxJob.objects.count() == 2)
+
+        job = enqueue_outbox_job(
+            OutboxJobType.SLACK_MESSAGE, {'message': 'hello'}, idempotency_key='hello'
+        )
+        same_job = enqueue_outbox_job(
+            OutboxJobType.SLACK_MESSAGE, {'message': 'hello again'}, idempotency_key='hello'
+        )
+        assert(same_job.id == job.id)
+        assert(same_job.payload == {'message': 'hello'})
+        assert(OutboxJob.objects.count() == 3)
+
+    @pytest.mark.django_db
+    def test_run_outbox_job(self):
+        del handled_payloads[:]
+        job = enqueue_outbox_job(OutboxJobType.SLACK_MESSAGE, {'message': 'hello'})
+        assert(run_outbox_job(job) is True)
+        job.refresh_from_db()
+        assert(job.completed_at is not None)
+        assert(job.attempts == 1)
+        assert(handled_payloads == [{'message': 'hello'}])
+
+    def test_get_retry_delay(self):
+        assert(get_retry_delay(1) == datetime.timedelta(seconds=60))
+        assert(get_retry_delay(2) == datetime.timedelta(seconds=120))
+        assert(get_retry_delay(4) == datetime.timedelta(seconds=480))
+        assert(get_retry_delay(5) == datetime.timedelta(seconds=600))
+
+    @freeze_time('2019-03-02 12:00:00 UTC')
+    @pytest.mark.django_db
+    def test_failed_job_is_retried(self):
+        job = enqueue_outbox_job(OutboxJobType.GOOGLE_CALENDAR_SYNC, {'appointment_id': 1})
+        assert(run_outbox_job(job) is False)
+        job.refresh_from_db()
+        assert(job.completed_at is None)
+        assert(job.attempts == 1)
+        assert(job.last_error == 'Calendar is not available')
+        assert(job.run_after == timezone.now() + datetime.timedelta(seconds=60))
+        assert(run_outbox_job(job) is False)
+        job.refresh_from_db()
+        assert(job.run_after == timezone.now() + datetime.timedelta(seconds=120))
+
+    @pytest.mark.django_db
+    @mock.patch('billing.models.send_stripe_charge_notification')
+    def test_stripe_charge_job_is_retried(self, notification_mock):
+        charge: Charge = G(
+            Charge, status=ChargeStatus.PENDING, stripe_id='', appointment=G(Appointment)
+        )
+        job = enqueue_outbox_job(OutboxJobType.STRIPE_CHARGE, {'charge_id': charge.id})
+        with mock.patch('billing.utils.run_charge', side_effect=[
+            APIConnectionError('Network error'), 'ch_1'
+        ]) as run_charge_mock:
+            # charge stays pending after network error, so the job can be retried
+            assert(run_outbox_job(job) is False)
+            charge.refresh_from_db()
+            assert(charge.status == ChargeStatus.PENDING)
+            job.refresh_from_db()
+            assert(job.last_error == 'Network error')
+            assert(run_outbox_job(job) is True)
+        charge.refresh_from_db()
+        assert(charge.status == ChargeStatus.SUCCESS)
+        assert(charge.stripe_id == 'ch_1')
+        # both attempts use the same idempotency key
+        assert([c[1]['idempotency_key'] for c in run_charge_mock.call_args_list] == [
+            'charge-{0}'.format(charge.uuid)
+        ] * 2)
+
+    @pytest.mark.django_db
+    @mock.patch('billing.models.send_stripe_charge_notification')
+    def test_stripe_charge_job_fails(self, notification_mock):
+        charge: Charge = G(
+            Charge, status=ChargeStatus.PENDING, stripe_id='', appointment=G(Appointment)
+        )
+        job = enqueue_outbox_job(OutboxJobType.STRIPE_CHARGE, {'charge_id': charge.id})
+        with mock.patch('billing.utils.run_charge', side_effect=APIConnectionError('Error')):
+            assert(run_outbox_job(job) is False)
+            # charge is failed on the last attempt (OUTBOX_MAX_ATTEMPTS == 2)
+            assert(run_outbox_job(job) is True)
+        charge.refresh_from_db()
+        assert(charge.status == ChargeStatus.FAILED)
+        assert(charge.error_data['error_class'] == 'APIConnectionError')
+        assert(notification_mock.call_count == 1)
+
+        charge = G(Charge, status=ChargeStatus.PENDING, stripe_id='', appointment=G(Appointment))
+        job = enqueue_outbox_job(OutboxJobType.STRIPE_CHARGE, {'charge_id': charge.id})
+        with mock.patch('billing.utils.run_charge', side_effect=CardError(
+            'Card declined', None, 'card_declined'
+        )):
+            # declined card is not retried
+            assert(run_outbox_job(job) is True)
+        charge.refresh_from_db()
+        assert(charge.status == ChargeStatus.FAILED)
+
+    @override_settings(IS_SLACK_ENABLED=True, LEVEL=EnvLevel.PRODUCTION)
+    def test_slack_message_job_raises(self):
+        session = mock.Mock()
+        session.post.return_value.raise_for_status.side_effect = HTTPError('500 Server Error')
+        message = {
+            'channel': 'channel', 'slack_url': 'http://slack', 'bot_name': 'bot',
+            'message': 'hello'
+        }
+        with mock.patch('integrations.slack.get_http_session', return_value=session):
+            # failed job is raised, so that the outbox worker retries it
+            with pytest.raises(HTTPError):
+                handle_slack_message(message)
+            # while other callers are not interrupted
+            send_slack_message(**message)
+
+    @override_settings(TWILIO_SMS_ENABLED=True, TWILIO_SLACK_MOCK_ENABLED=False)
+    @pytest.mark.django_db
+    def test_send_sms_job(self):
+        twilio_client = FakeTwilioClient()
+        job = enqueue_outbox_job(OutboxJobType.SEND_SMS, {
+            'to_phone': '+15555555555', 'body': 'Hello', 'role': 'client'
+        })
+        with mock.patch('integrations.twilio.get_twilio_client', return_value=twilio_client):
+            assert(run_outbox_job(job) is True)
+        assert(twilio_client.sent_messages == [('+15555555555', 'Hello')])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_process_outbox_jobs(self):
+        del handled_payloads[:]
+        for i in range(10):
+            enqueue_outbox_job(OutboxJobType.SLACK_MESSAGE, {'message': i})
+        enqueue_outbox_job(OutboxJobType.GOOGLE_CALENDAR_SYNC, {'appointment_id': 1})
+        # job which is not due yet
+        OutboxJob.objects.create(
+            job_type=OutboxJobType.SLACK_MESSAGE.value,
+            integration=OutboxIntegration.SLACK.value, payload={'message': 'later'},
+            run_after=timezone.now() + datetime.timedelta(hours=1)
+        )
+        # job which has used all attempts
+        OutboxJob.objects.create(
+            job_type=OutboxJobType.SLACK_MESSAGE.value,
+            integration=OutboxIntegration.SLACK.value, payload={'message': 'failed'},
+            attempts=2
+        )
+        assert(process_outbox_jobs(stdout=StringIO(), dry_run=True) == {})
+        assert(handled_payloads == [])
+
+        stats = process_outbox_jobs(
+            stdout=StringIO(),
+            integrations=[OutboxIntegration.SLACK, OutboxIntegration.GOOGLE_CALENDAR]
+        )
+        assert(stats[OutboxJobType.SLACK_MESSAGE.value].completed == 10)
+        assert(stats[OutboxJobType.SLACK_MESSAGE.value].failed == 0)
+        assert(stats[OutboxJobType.GOOGLE_CALENDAR_SYNC.value].completed == 0)
+        assert(stats[OutboxJobType.GOOGLE_CALENDAR_SYNC.value].failed == 1)
+        # every job is run exactly once, even though 3 workers run slack jobs
+        assert(sorted(p['message'] for p in handled_payloads) == list(range(10)))
+        assert(OutboxJob.objects.filter(completed_at__isnull=True).count() == 3)
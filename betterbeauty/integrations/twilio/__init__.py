@@ -1,5 +1,6 @@
 import logging
-from typing import Optional
+import threading
+from typing import Dict, List, Optional
 
 from django.conf import settings
 from django.template.loader import render_to_string
@@ -7,10 +8,14 @@ from django.urls import reverse
 from rest_framework import status
 
 from twilio.base.exceptions import TwilioException, TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
 
 from core.exceptions.middleware import HttpCodeException
+from core.utils.rate_limit import TokenBucket
+from integrations.gateway import BatchResult, run_batch
 from integrations.slack import send_slack_twilio_message_notification
+from .types import SMSMessage
 
 logger = logging.getLogger(__name__)
 
@@ -28,23 +33,82 @@ def render_one_time_sms_for_phone(code: str):
     )
 
 
+class TimeoutTwilioHttpClient(TwilioHttpClient):
+    """Twilio HTTP client which applies default timeout to every request"""
+    def __init__(self, timeout: float, pool_connections: bool=True) -> None:
+        super(TimeoutTwilioHttpClient, self).__init__(pool_connections=pool_connections)
+        self.timeout = timeout
+
+    def request(self, *args, timeout=None, **kwargs):
+        return super(TimeoutTwilioHttpClient, self).request(
+            *args, timeout=timeout or self.timeout, **kwargs
+        )
+
+
+_twilio_client: Optional[Client] = None
+_sending_number_rate_limiters: Dict[str, TokenBucket] = {}
+_twilio_lock = threading.Lock()
+
+
+def get_twilio_client() -> Client:
+    """Return Twilio client shared by the process, which keeps connections alive"""
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_lock:
+            if _twilio_client is None:
+                client = Client(http_client=TimeoutTwilioHttpClient(
+                    timeout=settings.INTEGRATION_HTTP_TIMEOUT_SECONDS
+                ))
+                client.api.base_url = settings.TWILIO_API_BASE_URL
+                _twilio_client = client
+    return _twilio_client
+
+
+def get_sending_number_rate_limiter(from_phone: str) -> TokenBucket:
+    """
+    Return token bucket limiting rate of messages sent from the number. Buckets are
+    kept in memory, so the limit is enforced per process; processes sending in bulk
+    at the same time (e.g. dispatcher and outbox worker) together may exceed it
+    """
+    with _twilio_lock:
+        if from_phone not in _sending_number_rate_limiters:
+            _sending_number_rate_limiters[from_phone] = TokenBucket(
+                rate=settings.TWILIO_SMS_MAX_MESSAGES_PER_SECOND,
+                capacity=settings.TWILIO_SMS_BURST_SIZE
+            )
+        return _sending_number_rate_limiters[from_phone]
+
+
 def send_sms_message(
-        to_phone: str, body: str, role: str
+        to_phone: str, body: str, role: str, from_phone: Optional[str]=None,
+        rate_limited: bool=False
 ) -> Optional[str]:
+    """
+    Send SMS message.
+
+    :param from_phone: sending number; TWILIO_FROM_TEL if not given
+    :param rate_limited: if set to True, wait for the rate limit of the sending
+    number if needed. Bulk senders must set it; messages the user is waiting for
+    (e.g. one-time codes) are sent right away
+    :return: message sid, or None if SMS sending is disabled
+    """
     result_sid: Optional[str] = None
     errors_to_suppress = [
         'Permission to send an SMS has not been enabled for the region',
     ]
+    from_phone = from_phone or settings.TWILIO_FROM_TEL
     if settings.TWILIO_SMS_ENABLED:
+        if rate_limited:
+            get_sending_number_rate_limiter(from_phone).acquire()
         try:
-            client = Client()
+            client = get_twilio_client()
             status_callback_url = '{0}{1}'.format(
                 settings.BASE_URL,
                 reverse('api:v1:webhooks:update-sms-status')
             )
             result = client.messages.create(
                 to=to_phone,
-                from_=settings.TWILIO_FROM_TEL,
+                from_=from_phone,
                 body=body,
                 status_callback=status_callback_url
             )
@@ -62,7 +126,7 @@ def send_sms_message(
     if settings.TWILIO_SLACK_MOCK_ENABLED:
         try:
             send_slack_twilio_message_notification(
-                from_phone=settings.TWILIO_FROM_TEL,
+                from_phone=from_phone,
                 to_phone=to_phone,
                 message=body
             )
@@ -70,3 +134,34 @@ def send_sms_message(
             # we really don't want this to break the flow for whatever reason
             logger.exception('Could not send Slack message')
     return result_sid
+
+
+def send_sms_messages(
+        messages: List[SMSMessage], concurrency: Optional[int]=None
+) -> List[BatchResult]:
+    """
+    Send messages concurrently through integration gateway, with at most
+    `concurrency` (TWILIO_SMS_CONCURRENCY by default) of them in flight;
+    every sending number is still limited to its rate.
+
+    :return: results in the order of messages; value of successful result is
+    message sid (or None if SMS sending is disabled)
+    """
+    return run_batch([
+        lambda message=message: send_sms_message(
+            to_phone=message.to_phone, body=message.body, role=message.role,
+            from_phone=message.from_phone, rate_limited=True
+        ) for message in messages
+    ], concurrency=concurrency or settings.TWILIO_SMS_CONCURRENCY)
+
+
+def handle_send_sms(payload: Dict, last_attempt: bool=False):
+    """Outbox job handler; payload has `to_phone`, `body` and `role` keys"""
+    try:
+        send_sms_message(
+            to_phone=payload['to_phone'], body=payload['body'], role=payload['role'],
+            rate_limited=True
+        )
+    except TwilioSuppressedException:
+        # message cannot be delivered to the region, so retrying won't help
+        pass
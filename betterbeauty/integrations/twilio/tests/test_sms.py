@@ -0,0 +1,182 @@
+import functools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+
+import mock
+import pytest
+from django.conf import settings
+from django.test import override_settings
+
+from core.types import UserRole
+from core.utils.rate_limit import TokenBucket
+from .. import (
+    get_twilio_client,
+    send_sms_message,
+    send_sms_messages,
+    TwilioSuppressedException,
+)
+from ..types import SMSMessage
+
+UNSUPPORTED_REGION_PHONE = '+10000000000'
+
+
+class FakeTwilioRequestHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for Twilio Messages API. Message sid is derived from the recipient
+    number; messages to UNSUPPORTED_REGION_PHONE are refused.
+    """
+    protocol_version = 'HTTP/1.1'
+    messages = []
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        message = {key: values[0] for key, values in form.items()}
+        self.messages.append((time.monotonic(), self.client_address[1], message))
+        if message['To'] == UNSUPPORTED_REGION_PHONE:
+            self.send_json(400, {
+                'code': 21408, 'status': 400, 'more_info': '',
+                'message': 'Permission to send an SMS has not been enabled for the region',
+            })
+            return
+        self.send_json(201, {
+            'sid': 'SM{0}'.format(message['To'].lstrip('+')),
+            'account_sid': 'ACtest', 'api_version': '2010-04-01',
+            'body': message['Body'], 'to': message['To'], 'from': message['From'],
+            'status': 'queued', 'direction': 'outbound-api',
+            'date_created': 'Thu, 07 Mar 2019 12:00:00 +0000',
+            'date_updated': 'Thu, 07 Mar 2019 12:00:00 +0000', 'date_sent': None,
+            'error_code': None, 'error_message': None, 'messaging_service_sid': None,
+            'num_media': '0', 'num_segments': '1', 'price': None, 'price_unit': 'USD',
+            'subresource_uris': {}, 'uri': '',
+        })
+
+    def send_json(self, status_code, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeClock(object):
+    """Clock which only moves when sleeping"""
+    def __init__(self, now: float) -> None:
+        self.now = now
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def twilio_url():
+    FakeTwilioRequestHandler.messages = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTwilioRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{0}'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def twilio_settings(twilio_url):
+    with override_settings(
+        TWILIO_SMS_ENABLED=True, TWILIO_SLACK_MOCK_ENABLED=False,
+        TWILIO_API_BASE_URL=twilio_url, TWILIO_FROM_TEL='+15550000000',
+        TWILIO_SMS_MAX_MESSAGES_PER_SECOND=1000, TWILIO_SMS_BURST_SIZE=1000,
+    ):
+        with mock.patch.dict(os.environ, {
+            'TWILIO_ACCOUNT_SID': 'ACtest', 'TWILIO_AUTH_TOKEN': 'token'
+        }):
+            # every test gets its own client and rate limiters
+            with mock.patch('integrations.twilio._twilio_client', None):
+                with mock.patch.dict(
+                        'integrations.twilio._sending_number_rate_limiters', clear=True
+                ):
+                    yield
+
+
+class TestSendSMS(object):
+
+    def test_send_sms_message(self, twilio_settings):
+        for i in range(3):
+            assert(send_sms_message(
+                to_phone='+1555000000{0}'.format(i), body='Hello', role=UserRole.CLIENT
+            ) == 'SM1555000000{0}'.format(i))
+        messages = FakeTwilioRequestHandler.messages
+        assert([m[2]['From'] for m in messages] == ['+15550000000'] * 3)
+        # client of the process keeps its connection alive
+        assert(len(set(m[1] for m in messages)) == 1)
+        assert(get_twilio_client().http_client.timeout ==
+               settings.INTEGRATION_HTTP_TIMEOUT_SECONDS)
+
+    def test_send_sms_messages(self, twilio_settings):
+        results = send_sms_messages([
+            SMSMessage(to_phone='+1555000000{0}'.format(i), body='Hello', role='client')
+            for i in range(8)
+        ] + [
+            SMSMessage(to_phone=UNSUPPORTED_REGION_PHONE, body='Hello', role='client'),
+            SMSMessage(
+                to_phone='+15550000009', body='Hello', role='client',
+                from_phone='+15551111111'
+            ),
+        ], concurrency=4)
+        assert([r.value for r in results] == [
+            'SM1555000000{0}'.format(i) for i in range(8)
+        ] + [None, 'SM15550000009'])
+        assert(isinstance(results[8].error, TwilioSuppressedException))
+        assert([
+            m[2]['To'] for m in FakeTwilioRequestHandler.messages
+            if m[2]['From'] == '+15551111111'
+        ] == ['+15550000009'])
+
+    def test_rate_limit_per_sending_number(self, twilio_settings):
+        clock = FakeClock(1000.0)
+        with override_settings(TWILIO_SMS_MAX_MESSAGES_PER_SECOND=1, TWILIO_SMS_BURST_SIZE=2):
+            with mock.patch(
+                'integrations.twilio.TokenBucket',
+                functools.partial(TokenBucket, clock=clock.time, sleep=clock.sleep)
+            ):
+                for from_phone in ['+15550000000', '+15551111111']:
+                    for i in range(4):
+                        send_sms_message(
+                            to_phone='+1555000000{0}'.format(i), body='Hello',
+                            role=UserRole.CLIENT, from_phone=from_phone, rate_limited=True
+                        )
+                # one-time codes are not limited
+                send_sms_message(
+                    to_phone='+15550000009', body='Hello', role=UserRole.CLIENT
+                )
+        # burst of 2 messages passes, then every message waits a second for its
+        # token; the second number is limited independently
+        assert(clock.sleeps == [1.0] * 4)
+        assert(len(FakeTwilioRequestHandler.messages) == 9)
+
+    def test_token_bucket(self):
+        clock = FakeClock(1000.0)
+        bucket = TokenBucket(rate=2, capacity=1, clock=clock.time, sleep=clock.sleep)
+        assert(bucket.try_acquire() is True)
+        assert(bucket.try_acquire() is False)
+        clock.now += 0.25
+        assert(bucket.try_acquire() is False)
+        bucket.acquire()
+        assert(clock.sleeps == [0.25])
+        assert(bucket.try_acquire() is False)
@@ -0,0 +1,8 @@
+from typing import NamedTuple, Optional
+
+
+class SMSMessage(NamedTuple):
+    to_phone: str
+    body: str
+    role: str
+    from_phone: Optional[str] = None
@@ -0,0 +1,42 @@
+from typing import Dict, NamedTuple
+
+from core.types import StrEnum
+
+
+class OutboxIntegration(StrEnum):
+    NOTIFICATIONS = 'notifications'
+    TWILIO = 'twilio'
+    GOOGLE_CALENDAR = 'google_calendar'
+    STRIPE = 'stripe'
+    SLACK = 'slack'
+    PUSH = 'push'
+
+
+class OutboxJobType(StrEnum):
+    NEW_APPOINTMENT_NOTIFICATION = 'new_appointment_notification'
+    SLACK_AUTO_BOOKING = 'slack_auto_booking'
+    GOOGLE_CALENDAR_SYNC = 'google_calendar_sync'
+    SEND_SMS = 'send_sms'
+    SLACK_MESSAGE = 'slack_message'
+    STRIPE_CHARGE = 'stripe_charge'
+    PUSH_MESSAGE = 'push_message'
+
+
+# jobs are claimed per integration, so that slow or failing external service
+# does not hold up jobs of other integrations
+OUTBOX_JOB_INTEGRATIONS: Dict[OutboxJobType, OutboxIntegration] = {
+    OutboxJobType.NEW_APPOINTMENT_NOTIFICATION: OutboxIntegration.NOTIFICATIONS,
+    OutboxJobType.SLACK_AUTO_BOOKING: OutboxIntegration.SLACK,
+    OutboxJobType.GOOGLE_CALENDAR_SYNC: OutboxIntegration.GOOGLE_CALENDAR,
+    OutboxJobType.SEND_SMS: OutboxIntegration.TWILIO,
+    OutboxJobType.SLACK_MESSAGE: OutboxIntegration.SLACK,
+    OutboxJobType.STRIPE_CHARGE: OutboxIntegration.STRIPE,
+    OutboxJobType.PUSH_MESSAGE: OutboxIntegration.PUSH,
+}
+
+
+class OutboxJobStats(NamedTuple):
+    completed: int = 0
+    failed: int = 0
+    # total time spent in job handlers
+    duration_seconds: float = 0
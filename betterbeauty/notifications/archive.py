@@ -0,0 +1,136 @@
+import datetime
+import logging
+from io import TextIOBase
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedNotification
+from .types import NotificationCode
+
+logger = logging.getLogger(__name__)
+
+# Generators of these notifications check whether the user has ever got one,
+# so they are never archived (otherwise they would be generated again)
+NON_ARCHIVABLE_NOTIFICATION_CODES = (
+    NotificationCode.HINT_TO_FIRST_BOOK,
+    NotificationCode.HINT_TO_SELECT_STYLIST,
+    NotificationCode.HINT_TO_REBOOK,
+    NotificationCode.CLIENT_REGISTRATION_INCOMPLETE,
+    NotificationCode.REGISTRATION_INCOMPLETE,
+    NotificationCode.REMIND_DEFINE_DISCOUNTS,
+    NotificationCode.REMIND_DEFINE_HOURS,
+)
+
+# Sent or discarded notifications created before archive_before. Notifications
+# referenced by appointments stay, since the reference is not enforced on delete
+# by the database.
+ARCHIVABLE_NOTIFICATIONS_SQL = """
+SELECT n.id FROM notification n
+WHERE n.created_at < %(archive_before)s
+    AND (n.sent_at IS NOT NULL OR NOT n.pending_to_send)
+    AND n.code NOT IN %(non_archivable_codes)s
+    AND NOT EXISTS(
+        SELECT 1 FROM appointment a WHERE a.stylist_new_appointment_notification_id = n.id
+    )
+"""
+
+# Moves a batch of the oldest archivable notifications to notification_archive
+# with a single statement; rows locked by other transactions are skipped
+ARCHIVE_NOTIFICATIONS_SQL = """
+WITH moved AS (
+    DELETE FROM notification
+    WHERE id IN (
+        {archivable_sql}
+        ORDER BY n.id
+        LIMIT %(batch_size)s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING {columns}
+)
+INSERT INTO notification_archive ({columns}, archived_at)
+SELECT {columns}, %(now)s FROM moved
+"""
+
+
+def get_archived_columns() -> List[str]:
+    """Return columns copied from notification to notification_archive table"""
+    return [
+        field.column for field in ArchivedNotification._meta.concrete_fields
+        if field.name != 'archived_at'
+    ]
+
+
+def get_archive_params(archive_before: datetime.datetime, batch_size: int=0) -> dict:
+    return {
+        'archive_before': archive_before,
+        'non_archivable_codes': tuple(code.value for code in NON_ARCHIVABLE_NOTIFICATION_CODES),
+        'batch_size': batch_size,
+        'now': timezone.now(),
+    }
+
+
+def count_archivable_notifications(archive_before: datetime.datetime) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*) FROM ({0}) archivable'.format(ARCHIVABLE_NOTIFICATIONS_SQL),
+            get_archive_params(archive_before)
+        )
+        return cursor.fetchone()[0]
+
+
+@transaction.atomic
+def archive_notifications_batch(archive_before: datetime.datetime, batch_size: int) -> int:
+    """
+    Move up to batch_size of the oldest sent or discarded notifications created
+    before archive_before to notification_archive table
+
+    :return: number of archived notifications
+    """
+    columns = ', '.join(get_archived_columns())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            ARCHIVE_NOTIFICATIONS_SQL.format(
+                archivable_sql=ARCHIVABLE_NOTIFICATIONS_SQL, columns=columns
+            ),
+            get_archive_params(archive_before, batch_size)
+        )
+        return cursor.rowcount
+
+
+def archive_notifications(
+        stdout: TextIOBase, dry_run: bool=True, days: Optional[int]=None,
+        batch_size: Optional[int]=None
+) -> int:
+    """
+    Move notifications which were sent or discarded more than `days` ago to
+    notification_archive table. Every batch is moved in its own short transaction,
+    so that dispatchers and generators are not blocked for long.
+
+    :param stdout: TextIOBase object representing stdout device
+    :param dry_run: if set to True, only count notifications to archive
+    :param days: age of notifications to archive, NOTIFICATION_ARCHIVE_AFTER_DAYS by default
+    :param batch_size: NOTIFICATION_ARCHIVE_BATCH_SIZE by default
+    :return: number of archived notifications
+    """
+    if days is None:
+        days = settings.NOTIFICATION_ARCHIVE_AFTER_DAYS
+    if batch_size is None:
+        batch_size = settings.NOTIFICATION_ARCHIVE_BATCH_SIZE
+    archive_before = timezone.now() - datetime.timedelta(days=days)
+    if dry_run:
+        return count_archivable_notifications(archive_before)
+    archived = 0
+    while True:
+        batch_archived = archive_notifications_batch(archive_before, batch_size)
+        archived += batch_archived
+        if batch_archived:
+            stdout.write('...{0} notifications archived'.format(archived))
+        if batch_archived < batch_size:
+            break
+    logger.info('Archived {0} notifications created before {1}'.format(
+        archived, archive_before
+    ))
+    return archived
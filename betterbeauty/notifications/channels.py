@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from django.conf import settings
+from push_notifications.models import APNSDevice, GCMDevice
+
+from client.models import Client
+from core.types import UserRole
+from integrations.push.utils import get_active_push_devices_of_users, has_push_device_in
+from salon.models import Stylist
+from .models import Notification
+from .settings import NOTIFICATION_CHANNEL_PRIORITY
+from .types import NotificationChannel
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelResolver(object):
+    """
+    Chooses delivery channels of a batch of notifications in memory, with the same
+    rules as `Notification.can_send_over_channel`. Users and their clients are
+    expected to be loaded with notifications (see `get_notifications_for_resolver`),
+    push devices and email subscriptions are loaded with one query per model.
+    """
+    def __init__(self, notifications: List[Notification]) -> None:
+        self.push_devices: Dict[
+            Tuple[int, str], List[Union[APNSDevice, GCMDevice]]
+        ] = get_active_push_devices_of_users(
+            set(notification.user_id for notification in notifications)
+        )
+        self.subscribed_emails: Dict[str, Set[str]] = {
+            UserRole.CLIENT.value: set(),
+            UserRole.STYLIST.value: set(),
+        }
+        emails_by_target: Dict[str, Set[str]] = {
+            UserRole.CLIENT.value: set(),
+            UserRole.STYLIST.value: set(),
+        }
+        for notification in notifications:
+            if (notification.email_details and notification.email_details.get('to') and
+                    notification.target in emails_by_target):
+                emails_by_target[notification.target].add(notification.email_details['to'])
+        for target, model in [
+            (UserRole.CLIENT.value, Client), (UserRole.STYLIST.value, Stylist)
+        ]:
+            if emails_by_target[target]:
+                self.subscribed_emails[target] = set(model.objects.filter(
+                    email__in=emails_by_target[target],
+                    email_notifications_enabled=True, email_verified=True
+                ).values_list('email', flat=True))
+
+    def can_send_over_channel(
+            self, notification: Notification, channel: NotificationChannel
+    ) -> bool:
+        if not settings.NOTIFICATIONS_ENABLED:
+            return False
+        if channel not in NOTIFICATION_CHANNEL_PRIORITY.get(notification.code, []):
+            return False
+        if channel == NotificationChannel.PUSH:
+            return has_push_device_in(
+                self.push_devices, user_id=notification.user_id,
+                user_role=notification.target
+            )
+        user = notification.user
+        if channel == NotificationChannel.SMS:
+            if not user.phone or user.user_stopped_sms:
+                return False
+            if notification.target == UserRole.CLIENT and hasattr(user, 'client'):
+                if not user.client.sms_notifications_enabled:
+                    return False
+            return True
+        if channel == NotificationChannel.EMAIL and notification.email_details:
+            return notification.email_details.get('to') in self.subscribed_emails.get(
+                notification.target, set()
+            )
+        return False
+
+    def get_channel(self, notification: Notification) -> Optional[NotificationChannel]:
+        """
+        Return channel to send notification over, or None if it can't be sent
+        over any channel
+        """
+        channel = notification.forced_channel
+        if not channel:
+            if notification.code not in NOTIFICATION_CHANNEL_PRIORITY:
+                logger.error(
+                    'Attempted to send a notification with code '
+                    'not included into priority list: {0}'.format(notification.code)
+                )
+                return None
+            channel = next((
+                c for c in NOTIFICATION_CHANNEL_PRIORITY[notification.code]
+                if self.can_send_over_channel(notification, c)
+            ), None)
+        if not channel:
+            return None
+        if channel == NotificationChannel.PUSH and not settings.NOTIFICATIONS_ENABLED:
+            return None
+        return NotificationChannel(channel)
+
+
+def get_notifications_for_resolver(notification_ids: List[int]) -> List[Notification]:
+    """Load notifications with everything `ChannelResolver` needs besides devices"""
+    return list(Notification.objects.filter(
+        id__in=notification_ids
+    ).select_related('user', 'user__client').order_by('id'))
@@ -0,0 +1,355 @@
+import datetime
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import TextIOBase
+from typing import Dict, List, Tuple, Union
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import connection, models, transaction
+from django.db.models import Case, CharField, Q, Value, When
+from django.utils import timezone
+from push_notifications.models import APNSDevice, GCMDevice
+
+from core.utils.email import send_email_messages
+from integrations.push.multicast import send_push_deliveries
+from integrations.push.types import PushDelivery, PushRegistrationIdType
+from integrations.push.utils import get_push_devices_in
+from .channels import ChannelResolver, get_notifications_for_resolver
+from .models import Notification
+from .types import DeliveryResult, NotificationChannel
+
+logger = logging.getLogger(__name__)
+
+# Sets next_send_at and send_until of pending notifications which were not
+# scheduled yet (e.g. were just created) or whose send window has passed
+# without them being sent. Window starts on the current local day in the
+# notification's time zone, or on the next day if today's window is over.
+SCHEDULE_NOTIFICATIONS_SQL = """
+UPDATE notification n
+SET next_send_at = (w.day + n.send_time_window_start) AT TIME ZONE n.send_time_window_tz,
+    send_until = LEAST(
+        (w.day + n.send_time_window_end) AT TIME ZONE n.send_time_window_tz,
+        n.discard_after
+    )
+FROM (
+    SELECT id, CASE
+        WHEN (%(now)s AT TIME ZONE send_time_window_tz)::time > send_time_window_end
+        THEN (%(now)s AT TIME ZONE send_time_window_tz)::date + 1
+        ELSE (%(now)s AT TIME ZONE send_time_window_tz)::date
+    END AS day
+    FROM notification
+    WHERE pending_to_send AND sent_at IS NULL
+        AND (next_send_at IS NULL OR send_until < %(now)s)
+) w
+WHERE n.id = w.id
+"""
+
+# Selects ids of pending notifications which are not scheduled yet (or missed
+# their send window), but whose window, once computed by SCHEDULE_NOTIFICATIONS_SQL,
+# would be open now. Lets dry run list due notifications without scheduling them.
+UNSCHEDULED_DUE_NOTIFICATIONS_SQL = """
+SELECT id
+FROM notification
+WHERE pending_to_send AND sent_at IS NULL
+    AND (next_send_at IS NULL OR send_until < %(now)s)
+    AND discard_after >= %(now)s
+    AND (%(now)s AT TIME ZONE send_time_window_tz)::time
+        BETWEEN send_time_window_start AND send_time_window_end
+"""
+
+
+def get_pending_notifications() -> models.QuerySet:
+    return Notification.objects.filter(
+        user__is_active=True, pending_to_send=True, sent_at__isnull=True,
+    )
+
+
+def get_due_notifications() -> models.QuerySet:
+    """Return pending notifications whose send window is open now"""
+    now = timezone.now()
+    return get_pending_notifications().filter(
+        next_send_at__lte=now, send_until__gte=now
+    )
+
+
+def get_due_notifications_without_scheduling() -> models.QuerySet:
+    """
+    Return pending notifications which are due now, including the ones
+    schedule_notifications would make due, without changing them
+    """
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(UNSCHEDULED_DUE_NOTIFICATIONS_SQL, {'now': now})
+        unscheduled_ids = [row[0] for row in cursor.fetchall()]
+    return get_pending_notifications().filter(
+        Q(next_send_at__lte=now, send_until__gte=now) | Q(id__in=unscheduled_ids)
+    )
+
+
+def expire_notifications() -> int:
+    """
+    Stop sending notifications which were not sent before their discard_after
+
+    :return: number of expired notifications
+    """
+    return Notification.objects.filter(
+        pending_to_send=True, sent_at__isnull=True, discard_after__lt=timezone.now()
+    ).update(pending_to_send=False)
+
+
+def schedule_notifications() -> int:
+    """
+    Compute UTC send window of new notifications, and move send window of
+    the ones which missed it to the next day
+
+    :return: number of scheduled notifications
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(SCHEDULE_NOTIFICATIONS_SQL, {'now': timezone.now()})
+        return cursor.rowcount
+
+
+@transaction.atomic
+def claim_notifications(after_id: int, batch_size: int) -> List[int]:
+    """
+    Claim a batch of due notifications following `after_id`, which are not
+    claimed by other dispatchers. Claim is committed right away, so no locks are
+    held while notifications are being sent.
+
+    :return: ids of claimed notifications, in ascending order
+    """
+    now = timezone.now()
+    notification_ids: List[int] = list(get_due_notifications().filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now), id__gt=after_id,
+    ).order_by('id').select_for_update(
+        skip_locked=True, of=('self', )
+    ).values_list('id', flat=True)[:batch_size])
+    Notification.objects.filter(id__in=notification_ids).update(
+        claimed_until=now + datetime.timedelta(
+            seconds=settings.NOTIFICATION_CLAIM_TIMEOUT_SECONDS)
+    )
+    return notification_ids
+
+
+def deliver_notification(
+        notification: Notification, channel: NotificationChannel
+) -> DeliveryResult:
+    try:
+        if channel == NotificationChannel.SMS:
+            return DeliveryResult(
+                notification_id=notification.id, channel=channel, sent=True,
+                twilio_message_id=notification.deliver_sms()
+            )
+    except Exception:
+        logger.exception('Could not send notification {0} via {1}'.format(
+            notification.uuid, channel))
+    return DeliveryResult(notification_id=notification.id, channel=channel, sent=False)
+
+
+def deliver_chunk(
+        deliveries: List[Tuple[Notification, NotificationChannel]]
+) -> List[DeliveryResult]:
+    """Send notifications one by one in a worker thread"""
+    try:
+        return [
+            deliver_notification(notification, channel)
+            for notification, channel in deliveries
+        ]
+    finally:
+        # worker thread may have opened its own DB connection
+        connection.close()
+
+
+def deliver_email_chunk(notifications: List[Notification]) -> List[DeliveryResult]:
+    """
+    Send emails of notifications in a worker thread, sharing backend connections
+    between them (see `send_email_messages`)
+    """
+    try:
+        notifications_to_send: List[Notification] = []
+        messages: List[EmailMessage] = []
+        for notification in notifications:
+            try:
+                message = notification.get_email_message()
+            except Exception:
+                logger.exception('Could not build email of notification {0}'.format(
+                    notification.uuid))
+                continue
+            if message is not None:
+                notifications_to_send.append(notification)
+                messages.append(message)
+        sent_ids = set(
+            notification.id for notification, sent
+            in zip(notifications_to_send, send_email_messages(messages)) if sent
+        )
+        return [DeliveryResult(
+            notification_id=notification.id, channel=NotificationChannel.EMAIL,
+            sent=notification.id in sent_ids
+        ) for notification in notifications]
+    finally:
+        # worker thread may have opened its own DB connection
+        connection.close()
+
+
+def deliver_push_notifications(
+        notifications: List[Notification],
+        devices: Dict[Tuple[int, str], List[Union[APNSDevice, GCMDevice]]]
+) -> List[DeliveryResult]:
+    """
+    Send push notifications to all devices of their users at once, in a worker
+    thread. Notification is sent if it was delivered to at least one device.
+
+    :param devices: active devices of users, see `get_active_push_devices_of_users`
+    """
+    try:
+        deliveries: List[PushDelivery] = []
+        delivery_notification_ids: List[int] = []
+        for notification in notifications:
+            extra = notification.get_push_extra()
+            for device in get_push_devices_in(
+                    devices, user_id=notification.user_id, user_role=notification.target
+            ):
+                deliveries.append(PushDelivery(
+                    registration_id=device.registration_id,
+                    registration_id_type=(
+                        PushRegistrationIdType.APNS if isinstance(device, APNSDevice)
+                        else PushRegistrationIdType.FCM
+                    ),
+                    application_id=device.application_id,
+                    message=notification.message,
+                    extra=extra,
+                ))
+                delivery_notification_ids.append(notification.id)
+        errors = send_push_deliveries(deliveries)
+        delivered_ids = set(
+            notification_id for notification_id, error
+            in zip(delivery_notification_ids, errors) if error is None
+        )
+        return [DeliveryResult(
+            notification_id=notification.id, channel=NotificationChannel.PUSH,
+            sent=notification.id in delivered_ids
+        ) for notification in notifications]
+    except Exception:
+        logger.exception('Could not send {0} push notifications'.format(len(notifications)))
+        return [DeliveryResult(
+            notification_id=notification.id, channel=NotificationChannel.PUSH, sent=False
+        ) for notification in notifications]
+    finally:
+        # worker thread has its own DB connection (used to deactivate dead devices)
+        connection.close()
+
+
+def deliver_notification_batch(
+        notification_ids: List[int], executor: ThreadPoolExecutor, stdout: TextIOBase
+) -> List[DeliveryResult]:
+    """
+    Send claimed notifications, with at most NOTIFICATION_CHANNEL_CONCURRENCY
+    notifications of each channel being sent at a time; push notifications
+    are sent all at once
+    """
+    results: List[DeliveryResult] = []
+    deliveries_by_channel: Dict[
+        NotificationChannel, List[Tuple[Notification, NotificationChannel]]
+    ] = defaultdict(list)
+    notifications = get_notifications_for_resolver(notification_ids)
+    resolver = ChannelResolver(notifications)
+    for notification in notifications:
+        channel = resolver.get_channel(notification)
+        if channel is None:
+            results.append(DeliveryResult(
+                notification_id=notification.id, channel=None, sent=False
+            ))
+            continue
+        stdout.write('Going to send {0} via {1}'.format(notification, channel))
+        deliveries_by_channel[channel].append((notification, channel))
+    futures = []
+    push_deliveries = deliveries_by_channel.pop(NotificationChannel.PUSH, [])
+    if push_deliveries:
+        futures.append(executor.submit(
+            deliver_push_notifications,
+            [notification for notification, channel in push_deliveries],
+            resolver.push_devices
+        ))
+    for channel, deliveries in deliveries_by_channel.items():
+        concurrency = settings.NOTIFICATION_CHANNEL_CONCURRENCY.get(channel.value, 1)
+        chunks = [deliveries[i::concurrency] for i in range(concurrency)]
+        if channel == NotificationChannel.EMAIL:
+            futures += [executor.submit(
+                deliver_email_chunk, [notification for notification, channel in chunk]
+            ) for chunk in chunks if chunk]
+            continue
+        futures += [executor.submit(deliver_chunk, chunk) for chunk in chunks if chunk]
+    for future in futures:
+        results += future.result()
+    return results
+
+
+def record_delivery_results(results: List[DeliveryResult]):
+    """
+    Mark sent notifications as sent, with one UPDATE per channel, and release
+    claims of notifications which were not sent, so that they are retried later
+    """
+    now = timezone.now()
+    sent_results_by_channel: Dict[NotificationChannel, List[DeliveryResult]] = defaultdict(list)
+    for result in results:
+        if result.sent:
+            sent_results_by_channel[result.channel].append(result)
+    for channel, channel_results in sent_results_by_channel.items():
+        fields_to_update = {
+            'sent_via_channel': channel.value,
+            'sent_at': now,
+            'pending_to_send': False,
+            'claimed_until': None,
+        }
+        if channel == NotificationChannel.SMS:
+            fields_to_update['twilio_message_id'] = Case(*[
+                When(id=result.notification_id, then=Value(result.twilio_message_id))
+                for result in channel_results
+            ], output_field=CharField())
+        Notification.objects.filter(
+            id__in=[result.notification_id for result in channel_results]
+        ).update(**fields_to_update)
+    Notification.objects.filter(
+        id__in=[result.notification_id for result in results if not result.sent]
+    ).update(claimed_until=None)
+
+
+def dispatch_notifications(stdout: TextIOBase, dry_run: bool=True) -> Tuple[int, int]:
+    """
+    Send (or pretend if dry_run is True) all due notifications, claiming them
+    in batches of NOTIFICATION_DISPATCH_BATCH_SIZE. Several dispatchers can run
+    at the same time; each notification is claimed by one of them.
+
+    :return: Tuple(num_sent, num_skipped)
+    """
+    if dry_run:
+        for notification in get_due_notifications_without_scheduling().select_related(
+                'user').iterator():
+            stdout.write('Going to send {0}'.format(notification))
+        return 0, 0
+    expired = expire_notifications()
+    scheduled = schedule_notifications()
+    stdout.write('{0} notifications expired, {1} scheduled'.format(expired, scheduled))
+    sent = 0
+    skipped = 0
+    last_id = 0
+    with ThreadPoolExecutor(
+            max_workers=sum(settings.NOTIFICATION_CHANNEL_CONCURRENCY.values()) + 1
+    ) as executor:
+        while True:
+            notification_ids = claim_notifications(
+                after_id=last_id, batch_size=settings.NOTIFICATION_DISPATCH_BATCH_SIZE
+            )
+            if not notification_ids:
+                break
+            last_id = notification_ids[-1]
+            results = deliver_notification_batch(notification_ids, executor, stdout)
+            record_delivery_results(results)
+            batch_sent = len([result for result in results if result.sent])
+            sent += batch_sent
+            skipped += len(results) - batch_sent
+            stdout.write('{0} notifications sent, {1} skipped, up to id {2}'.format(
+                sent, skipped, last_id))
+    return sent, skipped
@@ -0,0 +1,78 @@
+import logging
+from typing import Any, Dict
+
+from django.db import connection
+from django.utils import timezone
+
+from core.types import UserRole
+from .types import NotificationChannel, NotificationCode
+
+logger = logging.getLogger(__name__)
+
+# Creates notifications straight from the rows of eligibility query, which must
+# return user_id, message, send_time_window_start, send_time_window_end,
+# send_time_window_tz, discard_after, data and dedupe_bucket columns. Columns which
+# Django fills on the Python side (uuid, created_at and defaults) are set here,
+# since they have no database defaults. Rows whose dedupe key already exists are
+# skipped by the unique index on dedupe_key.
+INSERT_NOTIFICATIONS_SQL = """
+INSERT INTO notification (
+    uuid, user_id, target, code, message, email_details, data, created_at,
+    send_time_window_start, send_time_window_end, send_time_window_tz,
+    pending_to_send, discard_after, channel, dedupe_key
+)
+SELECT
+    md5(random()::text || clock_timestamp()::text || eligible.user_id::text)::uuid,
+    eligible.user_id, %(target)s, %(code)s, eligible.message, '{{}}'::jsonb,
+    eligible.data, %(now)s, eligible.send_time_window_start,
+    eligible.send_time_window_end, eligible.send_time_window_tz, true,
+    eligible.discard_after, %(channel)s, {dedupe_key}
+FROM ({eligible_sql}) eligible
+ON CONFLICT (dedupe_key) WHERE dedupe_key IS NOT NULL DO NOTHING
+"""
+
+COUNT_ELIGIBLE_SQL = """
+SELECT count(*) FROM ({eligible_sql}) eligible
+WHERE NOT EXISTS(SELECT 1 FROM notification WHERE dedupe_key = {dedupe_key})
+"""
+
+DEDUPE_KEY_SQL = "concat_ws(':', %(code)s, eligible.user_id, eligible.dedupe_bucket)"
+
+
+def get_dedupe_key(code: NotificationCode, user_id: int, bucket: str) -> str:
+    """Return dedupe key of notification, the same as INSERT_NOTIFICATIONS_SQL sets"""
+    return '{0}:{1}:{2}'.format(code, user_id, bucket)
+
+
+def insert_notifications(
+        code: NotificationCode, target: UserRole, eligible_sql: str,
+        params: Dict[str, Any], dry_run: bool=False
+) -> int:
+    """
+    Create notifications of given code with one INSERT ... SELECT statement,
+    so that eligible rows are never loaded into Python. Notifications are
+    created at most once per user and dedupe bucket returned by eligible_sql:
+    duplicates (including the ones created by concurrent runs) are rejected by
+    the unique index on dedupe_key instead of scanning existing notifications.
+
+    :param code: code of notifications to create
+    :param target: target role of notifications
+    :param eligible_sql: query returning one row per notification to create
+    :param params: parameters of eligible_sql; `now` is set to the current time
+    :param dry_run: if set to True, only count eligible rows
+    :return: number of notifications created
+    """
+    params = dict(params, now=timezone.now(), code=code, target=target)
+    with connection.cursor() as cursor:
+        if dry_run:
+            cursor.execute(COUNT_ELIGIBLE_SQL.format(
+                eligible_sql=eligible_sql, dedupe_key=DEDUPE_KEY_SQL
+            ), params)
+            return cursor.fetchone()[0]
+        cursor.execute(
+            INSERT_NOTIFICATIONS_SQL.format(
+                eligible_sql=eligible_sql, dedupe_key=DEDUPE_KEY_SQL
+            ),
+            dict(params, channel=NotificationChannel.PUSH)
+        )
+        return cursor.rowcount
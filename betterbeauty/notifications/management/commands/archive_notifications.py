@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from notifications.archive import archive_notifications
+
+
+class Command(BaseCommand):
+    """
+    Move notifications which were sent or discarded long ago to archive table
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-d',
+            '--dry-run',
+            action='store_true',
+            dest='dry_run',
+            help="Dry-run. Only count notifications to archive.",
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            dest='days',
+            default=None,
+            help="Archive notifications created more than this many days ago",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            dest='batch_size',
+            default=None,
+            help="Number of notifications moved in one transaction",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        archived = archive_notifications(
+            stdout=self.stdout, dry_run=dry_run, days=options['days'],
+            batch_size=options['batch_size']
+        )
+        if dry_run:
+            self.stdout.write('{0} notifications to archive'.format(archived))
+        else:
+            self.stdout.write('{0} notifications archived'.format(archived))
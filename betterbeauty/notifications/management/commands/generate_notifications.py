@@ -2,28 +2,10 @@ import logging
 from io import TextIOBase
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
 
-from notifications.types import NotificationCode
-from notifications.utils import (
-    # generate_client_registration_incomplete_notifications,
-    # generate_deal_of_week_notifications,
-    # generate_follow_up_invitation_sms,
-    # generate_hint_to_first_book_notifications,
-    # generate_hint_to_rebook_notifications,
-    # generate_hint_to_select_stylist_notifications,
-    # generate_invite_your_stylist_notifications,
-    # generate_remind_add_photo_notifications,
-    # generate_remind_define_discounts_notifications,
-    # generate_remind_define_hours_notifications,
-    # generate_remind_define_services_notification,
-    # generate_remind_invite_clients_notifications,
-    # generate_stylist_appeared_in_search_notification,
-    # generate_stylist_registration_incomplete_notifications,
-    generate_tomorrow_appointments_notifications,
-    send_all_notifications,
-)
+from notifications.runner import get_generators, NOTIFICATION_GENERATORS, run_generators
+from notifications.utils import send_all_notifications
 
 
 logger = logging.getLogger(__name__)
@@ -37,10 +19,11 @@ def stdout_and_log(message: str, stdout: TextIOBase):
 
 class Command(BaseCommand):
     """
-    Go over all functions generating notifications, generate notifications
+    Go over all enabled functions generating notifications, generate notifications
     and then force-send them
     """
     def add_arguments(self, parser):
+        generator_names = ', '.join(generator.name for generator in NOTIFICATION_GENERATORS)
         parser.add_argument(
             '-d',
             '--dry-run',
@@ -55,6 +38,40 @@ class Command(BaseCommand):
             dest='force_send',
             help="Actually force-send notifications after generation",
         )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            dest='only',
+            default=None,
+            help="Run only these generators, even if not enabled: {0}".format(generator_names),
+        )
+        parser.add_argument(
+            '--exclude',
+            nargs='+',
+            dest='exclude',
+            default=None,
+            help="Don't run these generators",
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            dest='concurrency',
+            default=None,
+            help="Number of generators running at once",
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            dest='timeout',
+            default=None,
+            help="Seconds after which a generator is rolled back",
+        )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            dest='profile',
+            help="Output profile stats of every generator",
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
@@ -63,201 +80,30 @@ class Command(BaseCommand):
             self.stdout.write('Notifications are disabled, exiting')
             return
 
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.HINT_TO_FIRST_BOOK),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_hint_to_first_book_notifications(dry_run=dry_run)
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.HINT_TO_FIRST_BOOK
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.HINT_TO_SELECT_STYLIST),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_hint_to_select_stylist_notifications(dry_run=dry_run)
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.HINT_TO_SELECT_STYLIST
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.HINT_TO_REBOOK),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_hint_to_rebook_notifications(dry_run=dry_run)
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.HINT_TO_REBOOK
-        # ), self.stdout)
-
-        stdout_and_log(
-            'Generating {0} notifications'.format(NotificationCode.TOMORROW_APPOINTMENTS),
-            self.stdout
-        )
-        time_start = timezone.now()
-        notification_count = generate_tomorrow_appointments_notifications(dry_run=dry_run)
-        time_end = timezone.now()
-        stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-            notification_count, (time_end - time_start).total_seconds(),
-            NotificationCode.TOMORROW_APPOINTMENTS
+        try:
+            generators = get_generators(only=options['only'], exclude=options['exclude'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        stdout_and_log('Generating {0} notifications'.format(
+            ', '.join(generator.name for generator in generators)
         ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.REGISTRATION_INCOMPLETE),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_stylist_registration_incomplete_notifications(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.REGISTRATION_INCOMPLETE
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.REMIND_DEFINE_SERVICES),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_remind_define_services_notification(dry_run=dry_run)
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds()
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.REMIND_DEFINE_HOURS),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_remind_define_hours_notifications(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.REMIND_DEFINE_HOURS
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.REMIND_DEFINE_DISCOUNTS),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_remind_define_discounts_notifications(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.REMIND_DEFINE_DISCOUNTS
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.REMIND_ADD_PHOTO),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_remind_add_photo_notifications(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.REMIND_ADD_PHOTO
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.REMIND_INVITE_CLIENTS),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_remind_invite_clients_notifications(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.REMIND_INVITE_CLIENTS
-        # ), self.stdout)
-
-        # time_start = timezone.now()
-        # sms_count = generate_follow_up_invitation_sms(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} Invitations follow-up SMS generated; took {1} seconds'.format(
-        #     sms_count, (time_end - time_start).total_seconds(),
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.DEAL_OF_THE_WEEK),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_deal_of_week_notifications(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.DEAL_OF_THE_WEEK
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(NotificationCode.INVITE_YOUR_STYLIST),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_invite_your_stylist_notifications(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.INVITE_YOUR_STYLIST
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(
-        #         NotificationCode.CLIENT_REGISTRATION_INCOMPLETE),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_client_registration_incomplete_notifications(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.CLIENT_REGISTRATION_INCOMPLETE
-        # ), self.stdout)
-
-        # stdout_and_log(
-        #     'Generating {0} notifications'.format(
-        #         NotificationCode.APPEARED_IN_SEARCH),
-        #     self.stdout
-        # )
-        # time_start = timezone.now()
-        # notification_count = generate_stylist_appeared_in_search_notification(
-        #     dry_run=dry_run
-        # )
-        # time_end = timezone.now()
-        # stdout_and_log('...{0} {2} notifications generated; took {1} seconds'.format(
-        #     notification_count, (time_end - time_start).total_seconds(),
-        #     NotificationCode.APPEARED_IN_SEARCH
-        # ), self.stdout)
+        results = run_generators(
+            generators, stdout=self.stdout, dry_run=dry_run,
+            concurrency=options['concurrency'], timeout_seconds=options['timeout'],
+            profile=options['profile']
+        )
+        for result in results:
+            if result.error:
+                stdout_and_log('...{0} notifications failed with {1} after {2} seconds'.format(
+                    result.name, result.error, result.seconds
+                ), self.stdout)
+            else:
+                stdout_and_log(
+                    '...{0} {1} notifications generated; took {2} seconds, {3} queries'.format(
+                        result.notification_count, result.name, result.seconds,
+                        result.query_count
+                    ), self.stdout
+                )
 
         if force_send:
             self.stdout.write('Going to send push notifications now')
@@ -0,0 +1,18 @@
+# Generated by Django 2.1 on 2019-03-06 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0016_auto_20190305_1059'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.1 on 2019-03-07 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0017_notification_claimed_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='next_send_at',
+            field=models.DateTimeField(blank=True, default=None, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='send_until',
+            field=models.DateTimeField(blank=True, default=None, editable=False, null=True),
+        ),
+        # only pending notifications are looked up by dispatcher, and there are
+        # few of them compared to the ones already sent or discarded
+        migrations.RunSQL(
+            """
+            CREATE INDEX notification_due_idx ON notification (next_send_at)
+            WHERE pending_to_send AND sent_at IS NULL;
+
+            CREATE INDEX notification_pending_discard_idx ON notification (discard_after)
+            WHERE pending_to_send AND sent_at IS NULL;
+            """,
+            reverse_sql="""
+            DROP INDEX notification_pending_discard_idx;
+            DROP INDEX notification_due_idx;
+            """
+        ),
+    ]
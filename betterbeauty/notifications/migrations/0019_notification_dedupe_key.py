@@ -0,0 +1,54 @@
+# Generated by Django 2.1 on 2019-03-11 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0018_notification_next_send_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='dedupe_key',
+            field=models.CharField(
+                blank=True, default=None, editable=False, max_length=255, null=True
+            ),
+        ),
+        # set keys of existing notifications which are deduplicated by date,
+        # keeping the earliest notification if there are duplicates already
+        migrations.RunSQL(
+            """
+            UPDATE notification n
+            SET dedupe_key = k.dedupe_key
+            FROM (
+                SELECT DISTINCT ON (dedupe_key) id, dedupe_key
+                FROM (
+                    SELECT id, concat_ws(
+                        ':', code, user_id, CASE code
+                            WHEN 'tomorrow_appointments' THEN data->>'date'
+                            ELSE data->>'deal_date'
+                        END
+                    ) dedupe_key
+                    FROM notification
+                    WHERE (code = 'tomorrow_appointments' AND data ? 'date')
+                        OR (code = 'deal_of_the_week' AND data ? 'deal_date')
+                ) keys
+                ORDER BY dedupe_key, id
+            ) k
+            WHERE n.id = k.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop
+        ),
+        migrations.RunSQL(
+            """
+            CREATE UNIQUE INDEX notification_dedupe_key_uniq ON notification (dedupe_key)
+            WHERE dedupe_key IS NOT NULL;
+            """,
+            reverse_sql="""
+            DROP INDEX notification_dedupe_key_uniq;
+            """
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 2.1 on 2019-03-12 12:00
+
+from django.conf import settings
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+import notifications.models
+import timezone_field.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0019_notification_dedupe_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('uuid', models.UUIDField(editable=False)),
+                ('target', models.CharField(choices=[('client', 'Client'), ('stylist', 'Stylist')], max_length=16)),
+                ('code', models.CharField(max_length=64, verbose_name='Notification code')),
+                ('message', models.CharField(max_length=1024)),
+                ('sms_message', models.CharField(blank=True, default=None, max_length=1024, null=True)),
+                ('email_details', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=notifications.models.default_json_field_value, null=True)),
+                ('data', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=notifications.models.default_json_field_value, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('send_time_window_start', models.TimeField()),
+                ('send_time_window_end', models.TimeField()),
+                ('send_time_window_tz', timezone_field.fields.TimeZoneField(default='America/New_York')),
+                ('pending_to_send', models.BooleanField(default=False)),
+                ('sent_at', models.DateTimeField(blank=True, default=None, null=True)),
+                ('sent_via_channel', models.CharField(blank=True, choices=[('sms', 'SMS message'), ('push', 'Push Notification'), ('email', 'Email Notification')], default=None, max_length=16, null=True)),
+                ('discard_after', models.DateTimeField()),
+                ('device_acked_at', models.DateTimeField(default=None, editable=False, null=True)),
+                ('channel', models.CharField(choices=[('sms', 'SMS message'), ('push', 'Push Notification'), ('email', 'Email Notification')], default=None, max_length=16, null=True)),
+                ('forced_channel', models.CharField(blank=True, choices=[('sms', 'SMS message'), ('push', 'Push Notification'), ('email', 'Email Notification')], default=None, max_length=16, null=True)),
+                ('twilio_message_id', models.CharField(blank=True, default=None, max_length=255, null=True)),
+                ('dedupe_key', models.CharField(blank=True, default=None, editable=False, max_length=255, null=True)),
+                ('archived_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', related_query_name='archived_notification', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notification_archive',
+            },
+        ),
+        # Twilio status webhook looks notifications up by message id; generators
+        # check prior notifications of the user by code
+        migrations.RunSQL(
+            """
+            CREATE INDEX notification_twilio_message_id_idx ON notification (twilio_message_id)
+            WHERE twilio_message_id IS NOT NULL;
+
+            CREATE INDEX notification_user_code_idx ON notification (user_id, code);
+            """,
+            reverse_sql="""
+            DROP INDEX notification_user_code_idx;
+            DROP INDEX notification_twilio_message_id_idx;
+            """
+        ),
+    ]
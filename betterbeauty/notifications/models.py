@@ -4,7 +4,7 @@ from uuid import uuid4
 
 from django.conf import settings
 from django.contrib.postgres.fields import JSONField
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives
 from django.db import models
 from django.utils import timezone
 
@@ -73,6 +73,19 @@ class Notification(models.Model):
     )
 
     twilio_message_id = models.CharField(max_length=255, null=True, blank=True, default=None)
+    # notification is being sent by a dispatcher process until this time
+    claimed_until = models.DateTimeField(null=True, blank=True, default=None)
+    # UTC bounds of the current (or next) send time window, capped by discard_after;
+    # set by notifications.dispatch.schedule_notifications. Pending notifications
+    # are indexed by next_send_at with partial index created in migration 0018
+    next_send_at = models.DateTimeField(null=True, blank=True, default=None, editable=False)
+    send_until = models.DateTimeField(null=True, blank=True, default=None, editable=False)
+    # `<code>:<user id>:<bucket>` of notifications which must be created only once
+    # per bucket (e.g. per date); unique among non-null values with partial index
+    # created in migration 0019, see notifications.generators.insert_notifications
+    dedupe_key = models.CharField(
+        max_length=255, null=True, blank=True, default=None, editable=False
+    )
 
     class Meta:
         db_table = 'notification'
@@ -94,20 +107,20 @@ class Notification(models.Model):
             return False
         return True
 
-    def send_and_mark_sent_push_notification_now(self) -> bool:
-        """Send push notification to all devices of the user and mark message as sent"""
-        if not settings.NOTIFICATIONS_ENABLED:
-            return False
-        if not self.can_send_now():
-            return False
-
-        user: User = self.user
+    def get_push_extra(self) -> Dict[str, Any]:
+        """Return data attached to push notification payload"""
         extra: Dict[str, Any] = {
             'code': self.code,
             'uuid': str(self.uuid)
         }
         if self.data:
             extra.update(self.data)
+        return extra
+
+    def deliver_push_notification(self):
+        """Send push notification to all devices of the user, without marking it sent"""
+        user: User = self.user
+        extra = self.get_push_extra()
 
         # bulk send message to all configured APNS and GCM/FCM installed apps matching target
         send_message_to_apns_devices_of_user(
@@ -119,6 +132,15 @@ class Notification(models.Model):
             badge_count=0, extra=extra
         )
 
+    def send_and_mark_sent_push_notification_now(self) -> bool:
+        """Send push notification to all devices of the user and mark message as sent"""
+        if not settings.NOTIFICATIONS_ENABLED:
+            return False
+        if not self.can_send_now():
+            return False
+
+        self.deliver_push_notification()
+
         # mark message as sent
         self.sent_via_channel = NotificationChannel.PUSH
         self.sent_at = timezone.now()
@@ -130,17 +152,21 @@ class Notification(models.Model):
     def get_sms_message(self):
         return self.sms_message if self.sms_message else self.message
 
+    def deliver_sms(self) -> Optional[str]:
+        """Send SMS message to the user, without marking it sent; return message sid"""
+        return send_sms_message(
+            to_phone=self.user.phone,
+            body=self.get_sms_message(),
+            role=self.target,
+            rate_limited=True
+        )
+
     def send_and_mark_sent_sms_now(self) -> bool:
         """Send SMS message to the user and mark message as sent"""
         if not self.can_send_now():
             return False
 
-        user: User = self.user
-        message_sid = send_sms_message(
-            to_phone=user.phone,
-            body=self.get_sms_message(),
-            role=self.target
-        )
+        message_sid = self.deliver_sms()
 
         # mark message as sent
         self.sent_via_channel = NotificationChannel.SMS
@@ -153,21 +179,35 @@ class Notification(models.Model):
             ])
         return True
 
+    def get_email_message(self) -> Optional[EmailMultiAlternatives]:
+        """Return email built from email details, or None if there's no address to send to"""
+        if not ('to' in self.email_details and self.email_details['to']):
+            return None
+        message = EmailMultiAlternatives(
+            self.email_details['subject'],
+            self.email_details['text_content'],
+            self.email_details['from'],
+            [self.email_details['to']],
+        )
+        if self.email_details.get('html_content'):
+            message.attach_alternative(self.email_details['html_content'], 'text/html')
+        return message
+
+    def deliver_email(self) -> bool:
+        """Send email to the address in email details, without marking it sent"""
+        message = self.get_email_message()
+        if message is None:
+            return False
+        mails_count = message.send(fail_silently=False)
+        logger.info('{0} email notification sent to {1}'.format(mails_count,
+                                                                self.email_details['to']))
+        return True
+
     def send_and_mark_sent_email_now(self) -> bool:
 
         if not self.can_send_now():
             return False
-        if 'to' in self.email_details and self.email_details['to']:
-            mails_count = send_mail(
-                self.email_details['subject'],
-                self.email_details['text_content'],
-                self.email_details['from'],
-                [self.email_details['to']],
-                html_message=self.email_details['html_content'],
-                fail_silently=False,
-            )
-            logger.info('{0} email notification sent to {1}'.format(mails_count,
-                                                                    self.email_details['to']))
+        if self.deliver_email():
             self.sent_via_channel = NotificationChannel.EMAIL
             self.sent_at = timezone.now()
             self.pending_to_send = False
@@ -240,3 +280,55 @@ class Notification(models.Model):
                 channel
             ))
         return False
+
+
+class ArchivedNotification(models.Model):
+    """
+    Notification which was sent or discarded long ago, moved out of `notification`
+    table by notifications.archive.archive_notifications. Columns are copied by
+    name, and dispatcher bookkeeping (claims and send windows) is not kept.
+    """
+    id = models.IntegerField(primary_key=True)
+    uuid = models.UUIDField(editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='archived_notifications',
+        related_query_name='archived_notification'
+    )
+    target = models.CharField(choices=CLIENT_OR_STYLIST_ROLE, max_length=16)
+    code = models.CharField(max_length=64, verbose_name='Notification code')
+    message = models.CharField(max_length=1024)
+    sms_message = models.CharField(max_length=1024, blank=True, null=True, default=None)
+    email_details = JSONField(default=default_json_field_value, blank=True, null=True)
+    data = JSONField(default=default_json_field_value, blank=True, null=True)
+    created_at = models.DateTimeField()
+    send_time_window_start = models.TimeField()
+    send_time_window_end = models.TimeField()
+    send_time_window_tz = TimeZoneField(default=settings.TIME_ZONE)
+    pending_to_send = models.BooleanField(default=False)
+    sent_at = models.DateTimeField(null=True, default=None, blank=True)
+    sent_via_channel = models.CharField(
+        max_length=16, null=True, choices=NOTIFICATION_CHANNEL_CHOICES,
+        default=None, blank=True
+    )
+    discard_after = models.DateTimeField()
+    device_acked_at = models.DateTimeField(null=True, default=None, editable=False)
+    channel = models.CharField(
+        max_length=16, null=True, choices=NOTIFICATION_CHANNEL_CHOICES, default=None
+    )
+    forced_channel = models.CharField(
+        max_length=16, null=True, blank=True, choices=NOTIFICATION_CHANNEL_CHOICES,
+        default=None
+    )
+    twilio_message_id = models.CharField(max_length=255, null=True, blank=True, default=None)
+    dedupe_key = models.CharField(
+        max_length=255, null=True, blank=True, default=None, editable=False
+    )
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'notification_archive'
+
+    def __str__(self):
+        return '{0} -> {1} {2}'.format(
+            self.code, self.target, self.user.__str__()
+        )
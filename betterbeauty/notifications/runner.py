@@ -0,0 +1,245 @@
+import cProfile
+import json
+import logging
+import pstats
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO, TextIOBase
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from core.types import UserRole
+from .types import GeneratorResult, NotificationCode, NotificationGenerator
+from .utils import (
+    generate_client_registration_incomplete_notifications,
+    generate_deal_of_week_notifications,
+    generate_follow_up_invitation_sms,
+    generate_hint_to_first_book_notifications,
+    generate_hint_to_rebook_notifications,
+    generate_hint_to_select_stylist_notifications,
+    generate_invite_your_stylist_notifications,
+    generate_remind_add_photo_notifications,
+    generate_remind_define_discounts_notifications,
+    generate_remind_define_hours_notifications,
+    generate_remind_define_services_notification,
+    generate_remind_invite_clients_notifications,
+    generate_stylist_appeared_in_search_notification,
+    generate_stylist_registration_incomplete_notifications,
+    generate_tomorrow_appointments_notifications,
+)
+
+logger = logging.getLogger(__name__)
+
+# number of lines of cumulative profile stats printed per generator
+PROFILE_STATS_LINES = 20
+
+NOTIFICATION_GENERATORS: List[NotificationGenerator] = [
+    NotificationGenerator(
+        NotificationCode.HINT_TO_FIRST_BOOK, generate_hint_to_first_book_notifications,
+        UserRole.CLIENT
+    ),
+    NotificationGenerator(
+        NotificationCode.HINT_TO_SELECT_STYLIST, generate_hint_to_select_stylist_notifications,
+        UserRole.CLIENT
+    ),
+    NotificationGenerator(
+        NotificationCode.HINT_TO_REBOOK, generate_hint_to_rebook_notifications,
+        UserRole.CLIENT
+    ),
+    NotificationGenerator(
+        NotificationCode.TOMORROW_APPOINTMENTS, generate_tomorrow_appointments_notifications,
+        UserRole.STYLIST, enabled=True
+    ),
+    NotificationGenerator(
+        NotificationCode.REGISTRATION_INCOMPLETE,
+        generate_stylist_registration_incomplete_notifications,
+        UserRole.STYLIST, checks_recent_notifications=True
+    ),
+    NotificationGenerator(
+        NotificationCode.REMIND_DEFINE_SERVICES, generate_remind_define_services_notification,
+        UserRole.STYLIST, checks_recent_notifications=True
+    ),
+    NotificationGenerator(
+        NotificationCode.REMIND_DEFINE_HOURS, generate_remind_define_hours_notifications,
+        UserRole.STYLIST, checks_recent_notifications=True
+    ),
+    NotificationGenerator(
+        NotificationCode.REMIND_DEFINE_DISCOUNTS, generate_remind_define_discounts_notifications,
+        UserRole.STYLIST, checks_recent_notifications=True
+    ),
+    NotificationGenerator(
+        NotificationCode.REMIND_ADD_PHOTO, generate_remind_add_photo_notifications,
+        UserRole.STYLIST, checks_recent_notifications=True
+    ),
+    NotificationGenerator(
+        NotificationCode.REMIND_INVITE_CLIENTS, generate_remind_invite_clients_notifications,
+        UserRole.STYLIST, checks_recent_notifications=True
+    ),
+    NotificationGenerator(
+        'follow_up_invitation_sms', generate_follow_up_invitation_sms, UserRole.CLIENT
+    ),
+    NotificationGenerator(
+        NotificationCode.DEAL_OF_THE_WEEK, generate_deal_of_week_notifications,
+        UserRole.CLIENT, checks_recent_notifications=True
+    ),
+    NotificationGenerator(
+        NotificationCode.INVITE_YOUR_STYLIST, generate_invite_your_stylist_notifications,
+        UserRole.CLIENT, checks_recent_notifications=True
+    ),
+    NotificationGenerator(
+        NotificationCode.CLIENT_REGISTRATION_INCOMPLETE,
+        generate_client_registration_incomplete_notifications,
+        UserRole.CLIENT, checks_recent_notifications=True
+    ),
+    NotificationGenerator(
+        NotificationCode.APPEARED_IN_SEARCH, generate_stylist_appeared_in_search_notification,
+        UserRole.STYLIST
+    ),
+]
+
+
+class GeneratorTimeoutException(Exception):
+    pass
+
+
+def get_generators(
+        only: Optional[Iterable[str]]=None, exclude: Optional[Iterable[str]]=None
+) -> List[NotificationGenerator]:
+    """
+    Return generators to run in registry order: the ones named in `only` (even if
+    they are not enabled), or all enabled ones, without the ones named in `exclude`
+
+    :raises ValueError: if unknown generator name is given
+    """
+    names = {generator.name for generator in NOTIFICATION_GENERATORS}
+    unknown_names = (set(only or []) | set(exclude or [])) - names
+    if unknown_names:
+        raise ValueError('Unknown notification generators: {0}'.format(
+            ', '.join(sorted(unknown_names))
+        ))
+    return [
+        generator for generator in NOTIFICATION_GENERATORS
+        if (generator.name in only if only else generator.enabled) and
+        generator.name not in (exclude or [])
+    ]
+
+
+def run_generator(
+        generator: NotificationGenerator, dry_run: bool, timeout_seconds: float,
+        stdout: Optional[TextIOBase]=None
+) -> GeneratorResult:
+    """
+    Run generator in its own transaction on the connection of the current thread,
+    counting its queries. No query may start after timeout_seconds have passed,
+    and no query may run longer than that (enforced by postgres statement_timeout),
+    otherwise the transaction is rolled back.
+
+    :param stdout: if set, generator is profiled and cumulative stats are written here
+    """
+    query_count = 0
+    deadline = time.monotonic() + timeout_seconds
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal query_count
+        if time.monotonic() > deadline:
+            raise GeneratorTimeoutException(
+                '{0} took more than {1} seconds'.format(generator.name, timeout_seconds)
+            )
+        query_count += 1
+        return execute(sql, params, many, context)
+
+    profile = cProfile.Profile() if stdout else None
+    notification_count = 0
+    error: Optional[str] = None
+    started_at = time.monotonic()
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET LOCAL statement_timeout = %s', [int(timeout_seconds * 1000)]
+                )
+            with connection.execute_wrapper(count_queries):
+                if profile:
+                    notification_count = profile.runcall(generator.function, dry_run=dry_run)
+                else:
+                    notification_count = generator.function(dry_run=dry_run)
+    except Exception as e:
+        logger.exception('Failed to generate {0} notifications'.format(generator.name))
+        error = type(e).__name__
+    finally:
+        # worker threads must not leave their connections open
+        connection.close()
+    result = GeneratorResult(
+        name=generator.name, notification_count=notification_count,
+        query_count=query_count, seconds=round(time.monotonic() - started_at, 3),
+        error=error
+    )
+    if profile:
+        stats_stream = StringIO()
+        pstats.Stats(profile, stream=stats_stream).sort_stats('cumulative').print_stats(
+            PROFILE_STATS_LINES
+        )
+        stdout.write('Profile of {0}:\n{1}'.format(generator.name, stats_stream.getvalue()))
+    return result
+
+
+def run_generator_chain(
+        generators: List[NotificationGenerator], dry_run: bool, timeout_seconds: float,
+        stdout: Optional[TextIOBase]=None
+) -> List[GeneratorResult]:
+    return [
+        run_generator(generator, dry_run, timeout_seconds, stdout)
+        for generator in generators
+    ]
+
+
+def run_generators(
+        generators: List[NotificationGenerator], stdout: TextIOBase, dry_run: bool=False,
+        concurrency: Optional[int]=None, timeout_seconds: Optional[float]=None,
+        profile: bool=False
+) -> List[GeneratorResult]:
+    """
+    Run generators concurrently, each on its own DB connection. Generators which
+    check recent notifications of other codes run one after another per target,
+    so that a user doesn't get several notifications at once. Metrics of every
+    generator are logged as JSON.
+
+    :param generators: generators to run, see get_generators
+    :param stdout: TextIOBase object representing stdout device
+    :param dry_run: if set to True, generators don't actually create notifications
+    :param concurrency: NOTIFICATION_GENERATOR_CONCURRENCY by default
+    :param timeout_seconds: NOTIFICATION_GENERATOR_TIMEOUT_SECONDS by default
+    :param profile: if set to True, profile stats of generators are written to stdout
+    :return: results of generators, in the order of generators
+    """
+    if concurrency is None:
+        concurrency = settings.NOTIFICATION_GENERATOR_CONCURRENCY
+    if timeout_seconds is None:
+        timeout_seconds = settings.NOTIFICATION_GENERATOR_TIMEOUT_SECONDS
+
+    chains: OrderedDict = OrderedDict()
+    for generator in generators:
+        if generator.checks_recent_notifications:
+            chains.setdefault(('target', generator.target), []).append(generator)
+        else:
+            chains[('generator', generator.name)] = [generator]
+
+    results_by_name = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(
+                run_generator_chain, chain, dry_run, timeout_seconds,
+                stdout if profile else None
+            ) for chain in chains.values()
+        ]
+        for future in futures:
+            for result in future.result():
+                results_by_name[result.name] = result
+                logger.info('Notification generator metrics: {0}'.format(
+                    json.dumps(result._asdict())
+                ))
+
+    return [results_by_name[generator.name] for generator in generators]
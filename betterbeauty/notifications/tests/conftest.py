@@ -0,0 +1,39 @@
+import datetime
+from typing import Callable
+
+import pytest
+import pytz
+from django_dynamic_fixture import G
+
+from core.models import User, UserRole
+from notifications.models import Notification
+
+
+@pytest.fixture
+def make_notification() -> Callable[..., Notification]:
+    """
+    Return factory of pending notifications whose send window is 10:00-11:00 UTC.
+    User is only created if not given; since created_at is set on creation
+    regardless of given value, it's updated afterwards if given.
+    """
+    def make(**kwargs) -> Notification:
+        created_at = kwargs.pop('created_at', None)
+        defaults = dict(
+            sent_at=None, pending_to_send=True, code='our_code', message='some message',
+            target=UserRole.CLIENT, forced_channel=None, email_details={},
+            send_time_window_start=datetime.time(10, 0),
+            send_time_window_end=datetime.time(11, 0),
+            send_time_window_tz=pytz.UTC,
+            discard_after=datetime.datetime(2019, 1, 1, 0, 0, tzinfo=pytz.UTC),
+            claimed_until=None, next_send_at=None, send_until=None, dedupe_key=None,
+            twilio_message_id=None,
+        )
+        defaults.update(kwargs)
+        if 'user' not in defaults:
+            defaults['user'] = G(User, role=[UserRole.CLIENT], is_active=True)
+        notification = G(Notification, **defaults)
+        if created_at is not None:
+            Notification.objects.filter(id=notification.id).update(created_at=created_at)
+            notification.created_at = created_at
+        return notification
+    return make
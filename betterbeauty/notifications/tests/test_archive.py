@@ -0,0 +1,67 @@
+import datetime
+from io import StringIO
+
+import pytest
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from appointment.models import Appointment
+from core.models import User, UserRole
+from notifications.models import ArchivedNotification, Notification
+from notifications.types import NotificationChannel, NotificationCode
+from ..archive import archive_notifications
+
+
+class TestArchiveNotifications(object):
+
+    @pytest.mark.django_db
+    def test_archive_notifications(self, make_notification):
+        now = timezone.now()
+        long_ago = now - datetime.timedelta(days=100)
+        user = G(User, role=[UserRole.CLIENT])
+        sent = make_notification(
+            user=user, created_at=long_ago, pending_to_send=False,
+            sent_at=now - datetime.timedelta(days=99),
+            sent_via_channel=NotificationChannel.SMS, twilio_message_id='SM1',
+            data={'deal_date': '2019-01-23'}
+        )
+        discarded = make_notification(
+            user=user, created_at=now - datetime.timedelta(days=90), pending_to_send=False
+        )
+        # pending, recent, never archived and referenced by appointment
+        pending = make_notification(user=user, created_at=long_ago)
+        recent = make_notification(
+            user=user, created_at=now - datetime.timedelta(days=10), pending_to_send=False,
+            sent_at=now
+        )
+        hint = make_notification(
+            user=user, created_at=long_ago, pending_to_send=False, sent_at=now,
+            code=NotificationCode.HINT_TO_FIRST_BOOK
+        )
+        referenced = make_notification(
+            user=user, created_at=long_ago, pending_to_send=False,
+            code=NotificationCode.NEW_APPOINTMENT
+        )
+        G(Appointment, stylist_new_appointment_notification=referenced)
+
+        assert(archive_notifications(StringIO(), dry_run=True, days=60) == 2)
+        assert(Notification.objects.count() == 6)
+
+        assert(archive_notifications(StringIO(), dry_run=False, days=60, batch_size=1) == 2)
+        assert(set(Notification.objects.values_list('id', flat=True)) == {
+            pending.id, recent.id, hint.id, referenced.id
+        })
+        assert(set(ArchivedNotification.objects.values_list('id', flat=True)) == {
+            sent.id, discarded.id
+        })
+        archived: ArchivedNotification = ArchivedNotification.objects.get(id=sent.id)
+        assert(archived.uuid == sent.uuid)
+        assert(archived.user_id == sent.user_id)
+        assert(archived.code == 'our_code')
+        assert(archived.sent_at == sent.sent_at)
+        assert(archived.sent_via_channel == NotificationChannel.SMS)
+        assert(archived.twilio_message_id == 'SM1')
+        assert(archived.data == {'deal_date': '2019-01-23'})
+        assert(archived.archived_at is not None)
+
+        assert(archive_notifications(StringIO(), dry_run=False, days=60) == 0)
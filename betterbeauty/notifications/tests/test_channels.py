@@ -0,0 +1,80 @@
+
+import mock
+import pytest
+from django.test import override_settings
+from django_dynamic_fixture import G
+from push_notifications.models import APNSDevice, GCMDevice
+
+from client.models import Client
+from core.models import User, UserRole
+from integrations.push.types import MobileAppIdType
+from notifications.settings import NOTIFICATION_CHANNEL_PRIORITY
+from notifications.types import NotificationChannel
+from salon.models import Stylist
+from ..channels import ChannelResolver, get_notifications_for_resolver
+
+
+class TestChannelResolver(object):
+
+    @pytest.mark.django_db
+    @override_settings(NOTIFICATIONS_ENABLED=True)
+    def test_get_channel(self, django_assert_num_queries, make_notification):
+        push_user: User = G(User, role=[UserRole.CLIENT], phone='12345')
+        G(APNSDevice, user=push_user, application_id=MobileAppIdType.IOS_CLIENT, active=True)
+        # device of stylist app doesn't count for client notifications
+        stylist_app_user: User = G(User, role=[UserRole.CLIENT])
+        G(GCMDevice, user=stylist_app_user, application_id=MobileAppIdType.ANDROID_STYLIST,
+          active=True, cloud_message_type='FCM')
+        sms_user: User = G(User, role=[UserRole.CLIENT], phone='23456')
+        G(Client, user=sms_user, sms_notifications_enabled=True)
+        sms_disabled_user: User = G(User, role=[UserRole.CLIENT], phone='34567')
+        G(Client, user=sms_disabled_user, sms_notifications_enabled=False)
+        email_user: User = G(User, role=[UserRole.STYLIST])
+        G(Stylist, user=email_user, email='stylist@example.com',
+          email_notifications_enabled=True, email_verified=True)
+
+        notifications = [
+            make_notification(user=push_user),
+            make_notification(user=stylist_app_user),
+            make_notification(user=sms_user),
+            make_notification(user=sms_disabled_user),
+            make_notification(user=email_user, target=UserRole.STYLIST, email_details={
+                'to': 'stylist@example.com'
+            }),
+            make_notification(user=push_user, forced_channel=NotificationChannel.SMS),
+        ]
+        with mock.patch.dict(NOTIFICATION_CHANNEL_PRIORITY, {'our_code': [
+            NotificationChannel.PUSH, NotificationChannel.SMS, NotificationChannel.EMAIL
+        ]}):
+            # notifications with users and clients, APNS devices, GCM devices, stylists
+            with django_assert_num_queries(4):
+                loaded_notifications = get_notifications_for_resolver(
+                    [n.id for n in notifications]
+                )
+                resolver = ChannelResolver(loaded_notifications)
+                channels = [resolver.get_channel(n) for n in loaded_notifications]
+        assert(channels == [
+            NotificationChannel.PUSH,
+            None,
+            NotificationChannel.SMS,
+            None,
+            NotificationChannel.EMAIL,
+            NotificationChannel.SMS,
+        ])
+
+    @pytest.mark.django_db
+    def test_notifications_disabled(self, make_notification):
+        user: User = G(User, role=[UserRole.CLIENT], phone='12345')
+        notifications = [
+            make_notification(user=user),
+            make_notification(user=user, forced_channel=NotificationChannel.SMS),
+            make_notification(user=user, forced_channel=NotificationChannel.PUSH),
+        ]
+        with mock.patch.dict(NOTIFICATION_CHANNEL_PRIORITY, {'our_code': [
+            NotificationChannel.SMS
+        ]}):
+            with override_settings(NOTIFICATIONS_ENABLED=False):
+                resolver = ChannelResolver(notifications)
+                assert([resolver.get_channel(n) for n in notifications] == [
+                    None, NotificationChannel.SMS, None
+                ])
@@ -0,0 +1,205 @@
+import datetime
+from io import StringIO
+
+import mock
+import pytest
+import pytz
+from django.core import mail
+from django.test import override_settings
+from django_dynamic_fixture import G
+from freezegun import freeze_time
+from push_notifications.models import APNSDevice, GCMDevice
+
+from core.models import User, UserRole
+from integrations.push.types import MobileAppIdType
+from notifications.models import Notification
+from notifications.types import NotificationChannel
+from ..dispatch import (
+    claim_notifications,
+    dispatch_notifications,
+    expire_notifications,
+    schedule_notifications,
+)
+
+
+class TestScheduleNotifications(object):
+
+    @pytest.mark.django_db
+    @freeze_time('2018-11-07 10:30:00 UTC')
+    def test_schedule_notifications(self, make_notification):
+        eastern = pytz.timezone('America/New_York')
+        open_window = make_notification()
+        later_today = make_notification(send_time_window_tz=eastern)
+        missed_window = make_notification(
+            send_time_window_start=datetime.time(9, 0),
+            send_time_window_end=datetime.time(10, 0),
+            next_send_at=datetime.datetime(2018, 11, 6, 9, 0, tzinfo=pytz.UTC),
+            send_until=datetime.datetime(2018, 11, 6, 10, 0, tzinfo=pytz.UTC),
+        )
+        about_to_discard = make_notification(
+            discard_after=datetime.datetime(2018, 11, 7, 10, 45, tzinfo=pytz.UTC)
+        )
+        make_notification(sent_at=datetime.datetime(2018, 11, 7, 10, 0, tzinfo=pytz.UTC))
+
+        assert(schedule_notifications() == 4)
+        for notification, next_send_at, send_until in [
+            (open_window, datetime.datetime(2018, 11, 7, 10, 0),
+             datetime.datetime(2018, 11, 7, 11, 0)),
+            (later_today, datetime.datetime(2018, 11, 7, 15, 0),
+             datetime.datetime(2018, 11, 7, 16, 0)),
+            (missed_window, datetime.datetime(2018, 11, 8, 9, 0),
+             datetime.datetime(2018, 11, 8, 10, 0)),
+            (about_to_discard, datetime.datetime(2018, 11, 7, 10, 0),
+             datetime.datetime(2018, 11, 7, 10, 45)),
+        ]:
+            notification.refresh_from_db()
+            assert(notification.next_send_at == pytz.UTC.localize(next_send_at))
+            assert(notification.send_until == pytz.UTC.localize(send_until))
+        # scheduled notifications are left alone until their window passes
+        assert(schedule_notifications() == 0)
+
+    @pytest.mark.django_db
+    @freeze_time('2018-11-07 10:30:00 UTC')
+    def test_expire_notifications(self, make_notification):
+        stale = make_notification(
+            discard_after=datetime.datetime(2018, 11, 7, 10, 0, tzinfo=pytz.UTC)
+        )
+        fresh = make_notification()
+        assert(expire_notifications() == 1)
+        stale.refresh_from_db()
+        assert(stale.pending_to_send is False)
+        fresh.refresh_from_db()
+        assert(fresh.pending_to_send is True)
+
+
+class TestDispatchNotifications(object):
+
+    @pytest.mark.django_db
+    @freeze_time('2018-11-07 10:30:00 UTC')
+    def test_claim_notifications(self, make_notification):
+        notification_1 = make_notification()
+        notification_2 = make_notification()
+        # claimed by another dispatcher
+        make_notification(claimed_until=datetime.datetime(
+            2018, 11, 7, 10, 35, tzinfo=pytz.UTC))
+        # claim of another dispatcher has expired
+        notification_4 = make_notification(claimed_until=datetime.datetime(
+            2018, 11, 7, 10, 25, tzinfo=pytz.UTC))
+        make_notification(sent_at=datetime.datetime(2018, 11, 7, 10, 0, tzinfo=pytz.UTC))
+        # not due yet
+        make_notification(
+            send_time_window_start=datetime.time(12, 0),
+            send_time_window_end=datetime.time(13, 0),
+        )
+        schedule_notifications()
+
+        assert(claim_notifications(after_id=0, batch_size=2) == [
+            notification_1.id, notification_2.id
+        ])
+        notification_1.refresh_from_db()
+        assert(notification_1.claimed_until == datetime.datetime(
+            2018, 11, 7, 10, 40, tzinfo=pytz.UTC))
+        assert(claim_notifications(after_id=notification_2.id, batch_size=2) == [
+            notification_4.id
+        ])
+        assert(claim_notifications(after_id=0, batch_size=2) == [])
+
+    @pytest.mark.django_db
+    @freeze_time('2018-11-07 10:30:00 UTC')
+    @override_settings(
+        NOTIFICATION_DISPATCH_BATCH_SIZE=2,
+        NOTIFICATION_CHANNEL_CONCURRENCY={'sms': 2, 'push': 1, 'email': 1}
+    )
+    @mock.patch('notifications.models.send_sms_message')
+    def test_dispatch_notifications(self, twilio_mock, make_notification):
+        twilio_mock.side_effect = lambda to_phone, body, role, rate_limited: 'sid-{0}'.format(body)
+        sms_1 = make_notification(forced_channel=NotificationChannel.SMS, message='1')
+        sms_2 = make_notification(forced_channel=NotificationChannel.SMS, message='2')
+        email = make_notification(
+            forced_channel=NotificationChannel.EMAIL,
+            email_details={
+                'from': 'info@madebeauty.com', 'to': 'client@example.com',
+                'subject': 'Hello', 'text_content': 'Hello', 'html_content': 'Hello'
+            }
+        )
+        out_of_window = make_notification(
+            forced_channel=NotificationChannel.SMS,
+            send_time_window_start=datetime.time(12, 0),
+            send_time_window_end=datetime.time(13, 0),
+        )
+
+        stdout = StringIO()
+        assert(dispatch_notifications(stdout=stdout, dry_run=True) == (0, 0))
+        assert(twilio_mock.call_count == 0)
+        # notifications which were not scheduled yet are listed if their window is open
+        assert(stdout.getvalue().count('Going to send') == 3)
+        assert(Notification.objects.filter(next_send_at__isnull=False).count() == 0)
+
+        assert(dispatch_notifications(stdout=StringIO(), dry_run=False) == (3, 0))
+        assert(twilio_mock.call_count == 2)
+        assert(len(mail.outbox) == 1)
+        for notification, channel, sid in [
+            (sms_1, NotificationChannel.SMS, 'sid-1'),
+            (sms_2, NotificationChannel.SMS, 'sid-2'),
+            (email, NotificationChannel.EMAIL, None),
+        ]:
+            notification.refresh_from_db()
+            assert(notification.sent_via_channel == channel)
+            assert(notification.sent_at is not None)
+            assert(notification.pending_to_send is False)
+            assert(notification.claimed_until is None)
+            assert(notification.twilio_message_id == sid)
+        out_of_window.refresh_from_db()
+        assert(out_of_window.sent_at is None)
+        assert(out_of_window.pending_to_send is True)
+        assert(out_of_window.claimed_until is None)
+        assert(out_of_window.next_send_at == datetime.datetime(
+            2018, 11, 7, 12, 0, tzinfo=pytz.UTC))
+
+    @pytest.mark.django_db
+    @freeze_time('2018-11-07 10:30:00 UTC')
+    @mock.patch('notifications.models.send_sms_message')
+    def test_failed_notification_is_released(self, twilio_mock, make_notification):
+        twilio_mock.side_effect = Exception('Twilio is not available')
+        notification = make_notification(forced_channel=NotificationChannel.SMS)
+        assert(dispatch_notifications(stdout=StringIO(), dry_run=False) == (0, 1))
+        notification.refresh_from_db()
+        assert(notification.pending_to_send is True)
+        assert(notification.claimed_until is None)
+
+    @pytest.mark.django_db
+    @freeze_time('2018-11-07 10:30:00 UTC')
+    @override_settings(NOTIFICATIONS_ENABLED=True)
+    @mock.patch('notifications.dispatch.send_push_deliveries')
+    def test_dispatch_push_notifications(self, send_push_mock, make_notification):
+        send_push_mock.side_effect = lambda deliveries: [
+            'Unregistered' if d.registration_id.startswith('dead') else None
+            for d in deliveries
+        ]
+        user = G(User, role=[UserRole.CLIENT], is_active=True)
+        G(APNSDevice, user=user, registration_id='apns-1', active=True,
+          application_id=MobileAppIdType.IOS_CLIENT)
+        G(GCMDevice, user=user, registration_id='dead-fcm', active=True,
+          cloud_message_type='FCM', application_id=MobileAppIdType.ANDROID_CLIENT)
+        dead_user = G(User, role=[UserRole.CLIENT], is_active=True)
+        G(APNSDevice, user=dead_user, registration_id='dead-apns', active=True,
+          application_id=MobileAppIdType.IOS_CLIENT)
+        delivered = make_notification(user=user, forced_channel=NotificationChannel.PUSH)
+        undelivered = make_notification(
+            user=dead_user, forced_channel=NotificationChannel.PUSH
+        )
+
+        assert(dispatch_notifications(stdout=StringIO(), dry_run=False) == (1, 1))
+        # devices of all users of the batch are sent to at once
+        assert(send_push_mock.call_count == 1)
+        deliveries = send_push_mock.call_args[0][0]
+        assert(sorted(d.registration_id for d in deliveries) == [
+            'apns-1', 'dead-apns', 'dead-fcm'
+        ])
+        assert(all(d.message == 'some message' for d in deliveries))
+        delivered.refresh_from_db()
+        assert(delivered.sent_via_channel == NotificationChannel.PUSH)
+        assert(delivered.pending_to_send is False)
+        undelivered.refresh_from_db()
+        assert(undelivered.pending_to_send is True)
+        assert(undelivered.claimed_until is None)
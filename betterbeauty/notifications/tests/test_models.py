@@ -120,7 +120,8 @@ class TestNotification(object):
         twilio_mock.assert_called_once_with(
             to_phone=our_user.phone,
             body=notification.message,
-            role=UserRole.CLIENT
+            role=UserRole.CLIENT,
+            rate_limited=True
         )
         notification.refresh_from_db()
         assert(notification.sent_via_channel == NotificationChannel.SMS)
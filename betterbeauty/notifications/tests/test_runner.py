@@ -0,0 +1,71 @@
+import threading
+import time
+from io import StringIO
+
+import pytest
+
+from core.models import User, UserRole
+from notifications.types import NotificationCode, NotificationGenerator
+from ..runner import get_generators, run_generators
+
+
+class TestGetGenerators(object):
+
+    def test_get_generators(self):
+        assert([g.name for g in get_generators()] == [NotificationCode.TOMORROW_APPOINTMENTS])
+        assert([g.name for g in get_generators(
+            only=['deal_of_the_week', 'follow_up_invitation_sms']
+        )] == ['follow_up_invitation_sms', NotificationCode.DEAL_OF_THE_WEEK])
+        assert(get_generators(exclude=['tomorrow_appointments']) == [])
+        with pytest.raises(ValueError):
+            get_generators(only=['unknown'])
+
+
+class TestRunGenerators(object):
+
+    @pytest.mark.django_db(transaction=True)
+    def test_run_generators(self):
+        threads = {}
+
+        def make_generator(name, target=UserRole.CLIENT, checks_recent_notifications=False,
+                           sleep_seconds=0.0, fail=False):
+            def generate(dry_run=False):
+                threads[name] = threading.get_ident()
+                time.sleep(sleep_seconds)
+                if fail:
+                    raise ValueError()
+                User.objects.exists()
+                User.objects.exists()
+                return 0 if dry_run else 3
+            return NotificationGenerator(
+                name, generate, target, checks_recent_notifications=checks_recent_notifications
+            )
+
+        generators = [
+            make_generator('first', checks_recent_notifications=True, sleep_seconds=0.1),
+            make_generator('independent'),
+            make_generator('failed', fail=True),
+            make_generator('slow', sleep_seconds=0.5),
+            make_generator('second', checks_recent_notifications=True),
+            make_generator('stylist', target=UserRole.STYLIST, checks_recent_notifications=True),
+        ]
+        results = run_generators(
+            generators, stdout=StringIO(), concurrency=4, timeout_seconds=0.3
+        )
+        assert([r.name for r in results] == [g.name for g in generators])
+        assert([(r.notification_count, r.query_count, r.error) for r in results] == [
+            (3, 2, None),
+            (3, 2, None),
+            (0, 0, 'ValueError'),
+            (0, 0, 'GeneratorTimeoutException'),
+            (3, 2, None),
+            (3, 2, None),
+        ])
+        # generators checking recent notifications of the same target run one after another
+        assert(threads['first'] == threads['second'])
+        assert(results[0].seconds >= 0.1)
+
+        stdout = StringIO()
+        results = run_generators(generators[:2], stdout=stdout, dry_run=True, profile=True)
+        assert([r.notification_count for r in results] == [0, 0])
+        assert('Profile of first' in stdout.getvalue())
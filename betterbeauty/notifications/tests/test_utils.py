@@ -35,6 +35,7 @@ from salon.models import (
     StylistWeekdayDiscount,
 )
 from salon.utils import create_stylist_profile_for_user
+from ..generators import get_dedupe_key
 from ..utils import (
     generate_client_registration_incomplete_notifications,
     generate_deal_of_week_notifications,
@@ -905,6 +906,9 @@ class TestGenerateTomorrowAppointmentsNotifications(object):
         assert(notification.user == stylist.user)
         assert(notification.code == NotificationCode.TOMORROW_APPOINTMENTS)
         assert(notification.data == {'date': datetime.date(2018, 12, 7).isoformat()})
+        assert(notification.dedupe_key == get_dedupe_key(
+            NotificationCode.TOMORROW_APPOINTMENTS, stylist.user.id, '2018-12-07'
+        ))
         assert(notification.send_time_window_start == datetime.time(18, 31))
         assert(notification.send_time_window_end == datetime.time(23, 59, 59))
         assert(notification.discard_after == salon.timezone.localize(
@@ -1629,6 +1633,64 @@ class TestGenerateDealOfWeekNotification(object):
         result = generate_deal_of_week_notifications()
         assert (result == 0)
 
+    @freeze_time('2019-1-21 12:00:00 UTC')
+    @pytest.mark.django_db
+    def test_notification_fields(self, django_assert_num_queries):
+        salon: Salon = G(
+            Salon, timezone=pytz.timezone('America/New_York'),
+            location=Point(-73.9734388, 40.7718351)
+        )
+        clients = []
+        for phone, first_name, weekday, discount in [
+            ('123', 'Jane', Weekday.WEDNESDAY, 30), ('345', 'Mary', Weekday.TUESDAY, 15)
+        ]:
+            stylist: Stylist = G(
+                Stylist, salon=salon, user=G(User, phone=phone, first_name=first_name)
+            )
+            G(StylistService, stylist=stylist, is_enabled=True)
+            G(StylistAvailableWeekDay, stylist=stylist, weekday=weekday, is_available=True)
+            G(
+                StylistWeekdayDiscount, weekday=weekday, stylist=stylist,
+                discount_percent=discount, is_deal_of_week=True
+            )
+            client = G(Client, location=Point(-73.972282, 40.7724047))
+            G(PreferredStylist, stylist=stylist, client=client)
+            clients.append((client, stylist))
+
+        # single INSERT ... SELECT within a savepoint
+        with django_assert_num_queries(3):
+            assert(generate_deal_of_week_notifications() == 2)
+
+        (client1, stylist1), (client2, stylist2) = clients
+        notification: Notification = Notification.objects.get(user=client1.user)
+        assert(notification.message == (
+            'Great news, Jane on Made has added a "Deal of the Week" on Wednesday '
+            'with 30% discount! Check them out in Made app.'
+        ))
+        assert(notification.target == UserRole.CLIENT)
+        assert(notification.send_time_window_start == datetime.time(11, 0))
+        assert(notification.send_time_window_end == datetime.time(18, 0))
+        assert(notification.send_time_window_tz == salon.timezone)
+        assert(notification.discard_after == salon.timezone.localize(
+            datetime.datetime(2019, 1, 23, 0, 0)
+        ))
+        assert(notification.data == {
+            'stylist_uuid': str(stylist1.uuid), 'deal_weekday': Weekday.WEDNESDAY,
+            'deal_date': '2019-01-23'
+        })
+        assert(notification.created_at == timezone.now())
+        assert(notification.pending_to_send is True)
+        assert(notification.dedupe_key == get_dedupe_key(
+            NotificationCode.DEAL_OF_THE_WEEK, client1.user.id, '2019-01-23'
+        ))
+        notification = Notification.objects.get(user=client2.user)
+        assert(notification.message == (
+            'Great news, Mary on Made has added a "Deal of the Week" on Tuesday '
+            'with 15% discount! Check them out in Made app.'
+        ))
+        assert(notification.data['deal_date'] == '2019-01-22')
+        assert(Notification.objects.filter(uuid=notification.uuid).count() == 1)
+
     @freeze_time('2019-1-21 12:00:00 UTC')
     @pytest.mark.django_db
     def test_existing_deal_notification(self):
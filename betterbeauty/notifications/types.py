@@ -1,6 +1,8 @@
+from typing import Callable, NamedTuple, Optional
+
 from model_utils import Choices
 
-from core.types import StrEnum
+from core.types import StrEnum, UserRole
 
 
 class NotificationChannel(StrEnum):
@@ -39,3 +41,33 @@ class NotificationCode(StrEnum):
     STYLIST_PAYOUT_PROMO = 'stylist_payout_promo'
     STYLIST_SHUTDOWN = 'stylist_shutdown'
     CLIENT_SHUTDOWN = 'client_shutdown'
+
+
+class DeliveryResult(NamedTuple):
+    notification_id: int
+    # None if notification cannot be sent now over any channel
+    channel: Optional[NotificationChannel]
+    sent: bool
+    twilio_message_id: Optional[str] = None
+
+
+class NotificationGenerator(NamedTuple):
+    # notification code, or other unique name if generator doesn't create notifications
+    name: str
+    # called with dry_run keyword argument, returns number of generated notifications
+    function: Callable[..., int]
+    target: UserRole
+    # generator skips users who recently got a notification of any code, so it runs
+    # one after another with other such generators of the same target
+    checks_recent_notifications: bool = False
+    # generators which are not enabled only run when selected explicitly
+    enabled: bool = False
+
+
+class GeneratorResult(NamedTuple):
+    name: str
+    notification_count: int
+    query_count: int
+    seconds: float
+    # name of exception if generator failed or timed out
+    error: Optional[str] = None
@@ -30,6 +30,8 @@ from salon.models import (
     StylistService,
     StylistWeekdayDiscount,
 )
+from .dispatch import dispatch_notifications
+from .generators import insert_notifications
 from .models import Notification
 from .settings import NOTIFICATION_CHANNEL_PRIORITY
 from .types import NotificationChannel, NotificationCode
@@ -48,30 +50,14 @@ def get_unsubscribe_url(target: str, uuid):
     return '{0}{1}'.format(settings.BASE_URL, reverse('email-unsubscribe', args=[target, uuid]))
 
 
-@transaction.atomic()
 def send_all_notifications(stdout: TextIOBase, dry_run: bool=True) -> Tuple[int, int]:
     """
-    Send (or pretend if dry_run is True) ALL pending push notifications
+    Send (or pretend if dry_run is True) ALL pending notifications
     :param stdout: TextIOBase object representing stdout device
     :param dry_run: if set to False, no sending will actually occur
     :return: Tuple(num_sent, num_skipped)
     """
-    sent = 0
-    skipped = 0
-    pending_notifications = Notification.objects.filter(
-        user__is_active=True, pending_to_send=True, sent_at__isnull=True,
-    ).select_for_update(skip_locked=True)
-    for notification in pending_notifications.iterator():
-        stdout.write('Going to send {0}'.format(notification.__str__()))
-        if not dry_run:
-            result = notification.send_and_mark_sent_now()
-            if result:
-                sent += 1
-                stdout.write('..sent successfully')
-            else:
-                skipped += 1
-                stdout.write('..failed to send')
-    return sent, skipped
+    return dispatch_notifications(stdout=stdout, dry_run=dry_run)
 
 
 @transaction.atomic()
@@ -853,9 +839,14 @@ def generate_tomorrow_appointments_notifications(dry_run=False) -> int:
     it's 30 minutes past their work day (or 30 minutes past 19:00, if today is not working day)
 
     Stylist must have at least one appointment in NEW status for tomorrow, and there
-    must be no previously sent notification. If current settings for this notification imply
+    must be no previously sent notification (which is checked by notification's dedupe
+    key, one per stylist and tomorrow's date). If current settings for this notification imply
     that it's a push-only notification - at least one push-enabled device must be configured
 
+    Notifications are created with a single INSERT ... SELECT statement: they can be
+    sent from now till the end of the stylist's day and are discarded at midnight
+    in stylist's timezone.
+
     :param dry_run: if set to True, don't actually create notifications
     :return: number of notifications created
     """
@@ -863,15 +854,28 @@ def generate_tomorrow_appointments_notifications(dry_run=False) -> int:
     message = 'You have new appointments tomorrow. Tap to see the list.'
     target = UserRole.STYLIST
 
-    eligible_stylists_raw_queryset = Stylist.objects.raw(
-        """
+    return insert_notifications(
+        code=code, target=target, eligible_sql="""
         select
-            st_id as id
+            u_id user_id,
+            %(message)s message,
+            -- we can safely set start time window to now, since we've verified
+            -- the condition below
+            stylist_current_time_t send_time_window_start,
+            time %(send_time_window_end)s send_time_window_end,
+            stylist_timezone send_time_window_tz,
+            -- today's midnight (the one which is tonight) in stylist's timezone
+            stylist_tomorrow_start_dt discard_after,
+            jsonb_build_object(
+              'date', cast(stylist_current_date_d + 1 as text)) data,
+            -- one notification per stylist and tomorrow's date
+            cast(stylist_current_date_d + 1 as text) dedupe_bucket
         from
             (
             select
                 st_id,
                 u_id,
+                stylist_timezone,
                 -- current date in stylist's timezone
                 stylist_current_date_d,
                 -- current time in stylist's timezone
@@ -900,16 +904,16 @@ def generate_tomorrow_appointments_notifications(dry_run=False) -> int:
                     sl.timezone stylist_timezone,
                     -- current time in stylist's timezone
                     cast(
-                      timestamptz %(current_now_with_tz)s at time zone sl.timezone as time
+                      %(now)s at time zone sl.timezone as time
                       ) stylist_current_time_t,
                     -- current date in stylist's timezone
                     cast(
-                      timestamptz %(current_now_with_tz)s at time zone sl.timezone as date
+                      %(now)s at time zone sl.timezone as date
                       ) stylist_current_date_d,
                     -- current iso weekday based on date in stylist's timezone
                     extract(ISODOW
                 from
-                    timestamptz %(current_now_with_tz)s at time zone sl.timezone)
+                    %(now)s at time zone sl.timezone)
                       stylist_current_weekday
                 from
                     stylist as st
@@ -919,8 +923,7 @@ def generate_tomorrow_appointments_notifications(dry_run=False) -> int:
                     st.salon_id = sl.id
                 where
                     st.deactivated_at isnull
-                order by
-                    st.id ) as stylists_with_tz_aware_info
+                ) as stylists_with_tz_aware_info
             left outer join stylist_available_day as wd on
                 wd.stylist_id = st_id
                 and wd.weekday = stylist_current_weekday
@@ -945,17 +948,6 @@ def generate_tomorrow_appointments_notifications(dry_run=False) -> int:
                 and datetime_start_at >= stylist_tomorrow_start_dt
                 and datetime_start_at < stylist_tomorrow_end_dt
                 and status = %(appointment_status)s )
-            -- no notification is created for tomorrow yet
-            and not exists(
-            select 1 from notification
-            where
-                user_id = u_id
-                and code = %(code)s
-                and target = %(target)s
-                and data->'date' ? cast(
-                  cast((stylist_current_date_d + interval '1 day'
-                  ) as date) as text)
-              )
             and (
             -- if it's push-only notification - there should be at least 1 device
               %(not_push_only)s or
@@ -976,66 +968,18 @@ def generate_tomorrow_appointments_notifications(dry_run=False) -> int:
                        and application_id=%(fcm_app_id)s
                 )
             )
-            ;
-        """,
-        {
-            'current_now_with_tz': timezone.now().isoformat(),
-            'code': code,
+        """, params={
+            'message': message,
+            'send_time_window_end': datetime.time(23, 59, 59).isoformat(),
             'appointment_status': AppointmentStatus.NEW,
             'fallback_work_end_time': datetime.time(19, 0).isoformat(),
             'grace_end_day_interval_int': 30,
-            'target': UserRole.STYLIST,
             'not_push_only': str(not is_push_only(code)),
             'local_apns_id': MobileAppIdType.IOS_STYLIST_DEV,
             'server_apns_id': MobileAppIdType.IOS_STYLIST,
             'fcm_app_id': MobileAppIdType.ANDROID_STYLIST
-        }
+        }, dry_run=dry_run
     )
-    # we can't operate directy on RawQuerySet, so we have to extract eligible ids out
-    # of it
-
-    eligible_stylist_ids = [
-        stylist.id for stylist in eligible_stylists_raw_queryset]
-    eligible_stylists = Stylist.objects.filter(id__in=eligible_stylist_ids)
-    notifications_to_create_list: List[Notification] = []
-
-    for stylist in eligible_stylists.select_for_update(skip_locked=True):
-        # we can safely set start time window to now, since we've verified the condition
-        # in the main query
-        current_now: datetime.datetime = stylist.with_salon_tz(
-            timezone.now()
-        )
-        send_time_window_start = current_now.time()
-        send_time_window_end = datetime.time(23, 59, 59)
-        send_time_window_tz = stylist.salon.timezone
-        tomorrow_date_iso_str: str = (
-            current_now.date() + datetime.timedelta(days=1)
-        ).isoformat()
-
-        # set discard_after to today's midnight in stylist's timezone
-        discard_after = stylist.salon.timezone.localize(
-            datetime.datetime.combine(
-                current_now.date(), datetime.time(0, 0)
-            )
-        ) + datetime.timedelta(days=1)
-
-        notifications_to_create_list.append(
-            Notification(
-                user=stylist.user,
-                code=code,
-                target=target,
-                message=message,
-                send_time_window_start=send_time_window_start,
-                send_time_window_end=send_time_window_end,
-                send_time_window_tz=send_time_window_tz,
-                discard_after=discard_after,
-                data={'date': tomorrow_date_iso_str}
-            )
-        )
-    # if any notifications were generated - bulk created them
-    if notifications_to_create_list and not dry_run:
-        Notification.objects.bulk_create(notifications_to_create_list)
-    return len(notifications_to_create_list)
 
 
 @transaction.atomic
@@ -1725,7 +1669,10 @@ def generate_follow_up_invitation_sms(dry_run=False) -> int:
         )
         try:
             if not dry_run:
-                send_sms_message(to_phone=invite.phone, body=message, role=UserRole.CLIENT)
+                send_sms_message(
+                    to_phone=invite.phone, body=message, role=UserRole.CLIENT,
+                    rate_limited=True
+                )
                 invite.followup_sent_at = timezone.now()
                 invite.followup_count += 1
                 invite.save(update_fields=['followup_sent_at', 'followup_count', ])
@@ -1832,6 +1779,9 @@ def generate_deal_of_week_notifications(dry_run=False) -> int:
     3. Last notification of any type was sent more than 24 hours ago to this client
     4. Stylist should be generally bookable
 
+    Messages are rendered by the database, so notifications are created
+    with a single INSERT ... SELECT statement.
+
     :param dry_run: if set to True, don't actually create notifications
     :return: number of notifications created
     """
@@ -1839,150 +1789,122 @@ def generate_deal_of_week_notifications(dry_run=False) -> int:
     target = UserRole.CLIENT
     send_time_window_start = datetime.time(11, 0)
     send_time_window_end = datetime.time(18, 0)
+    # template of postgres `format` function: stylist name, weekday, deal percent
     message = (
-        'Great news, {stylist_name} on Made has added a "Deal of the Week" on '
-        '{weekday} with {deal_percent}% discount! Check them out in Made app.'
+        'Great news, %s on Made has added a "Deal of the Week" on '
+        '%s with %s%% discount! Check them out in Made app.'
     )
 
     minimum_distance_miles = 10
     minimum_distance_meters = minimum_distance_miles * 1609
 
-    eligible_clients_queryset = Client.objects.raw(
-        '''
+    return insert_notifications(
+        code=code, target=target, eligible_sql='''
   SELECT
-    DISTINCT ON (id)
-    id,
-    client_user_id,
-    stylist_first_name,
-    stylist_uuid,
-    deal_percent,
-    deal_weekday,
-    days_before_discount,
-    salon_timezone
+    client_user_id user_id,
+    format(
+      %(message)s, stylist_first_name, to_char(deal_date, 'FMDay'), deal_percent
+    ) message,
+    time %(send_time_window_start)s send_time_window_start,
+    time %(send_time_window_end)s send_time_window_end,
+    salon_timezone send_time_window_tz,
+    -- deal date's midnight in salon's timezone
+    (deal_date + time '00:00') AT TIME ZONE salon_timezone discard_after,
+    jsonb_build_object(
+      'stylist_uuid', cast(stylist_uuid AS text),
+      'deal_weekday', deal_weekday,
+      'deal_date', cast(deal_date AS text)
+    ) data,
+    -- one notification per client and deal date
+    cast(deal_date AS text) dedupe_bucket
   FROM (
-     SELECT
-       *,
-       CASE WHEN deal_weekday > current_weekday
-         THEN deal_weekday - current_weekday
-       ELSE deal_weekday - current_weekday + 7
-       END days_before_discount
-     FROM (
-        SELECT
-          cl.id id,
-          cu.id client_user_id,
-          swd.weekday deal_weekday,
-          swd.discount_percent deal_percent,
-          ST_DISTANCE(sl.location, cl.location) distance,
-          extract(
-             ISODOW FROM TIMESTAMPTZ %(current_now_with_tz)s
-             AT TIME ZONE sl.timezone) current_weekday,
-          su.first_name stylist_first_name,
-          st.uuid stylist_uuid,
-          sl.timezone salon_timezone,
-          sad.is_available
-        FROM
-          public.client cl
-          INNER JOIN public.preferred_stylist ps ON ps.client_id = cl.id
-          INNER JOIN public.stylist st ON ps.stylist_id = st.id
-          INNER JOIN public.user cu ON cu.id = cl.user_id
-          INNER JOIN public.user su ON su.id = st.user_id
-          INNER JOIN public.salon sl ON sl.id = st.salon_id
-          LEFT OUTER JOIN public.stylist_weekday_discount swd ON swd.stylist_id = st.id
-          LEFT OUTER JOIN public.stylist_available_day sad ON sad.stylist_id = st.id AND
-                                                              sad.weekday = swd.weekday
-        WHERE
-          ps.deleted_at ISNULL AND
-          -- stylist is generally bookable
-          su.phone IS NOT NULL AND
-          EXISTS(SELECT 1
-                 FROM public.stylist_service
-                 WHERE cu.is_active IS TRUE AND stylist_service.stylist_id = st.id) AND
-          -- deal of the week is defined
-          swd.is_deal_of_week = TRUE AND
-          swd.discount_percent > 0 AND
-          -- locations of stylist and client are known
-          sl.location IS NOT NULL AND
-          cl.location IS NOT NULL AND
-          sad.is_available IS TRUE AND
-          -- no previous notification was sent in the last 24 hours
-          NOT EXISTS(SELECT 1
-                     FROM public.notification
-                     WHERE user_id = cu.id AND
-                           target = %(target)s AND
-                           code != %(code)s AND
-                           ((TIMESTAMPTZ %(current_now_with_tz)s
-                           AT TIME ZONE sl.timezone) - created_at) <=
-                           INTERVAL '24 hours')
-          AND
-          -- no notification of the same type was sent in the last 4 weeks
-          NOT EXISTS(SELECT 1
-                     FROM public.notification
-                     WHERE user_id = cu.id AND
-                           target = %(target)s AND
-                           code = %(code)s AND
-                           ((TIMESTAMPTZ %(current_now_with_tz)s
-                           AT TIME ZONE sl.timezone) - created_at) <=
-                           INTERVAL '4 weeks')
-          ) main
-     WHERE distance < %(minimum_distance_meters)s
-     FOR UPDATE SKIP LOCKED
-   ) main_with_time_diff
-  WHERE
-    days_before_discount BETWEEN 1 AND 2
-  ORDER BY
-    id, days_before_discount
-      ''',
-        {
-            'current_now_with_tz': timezone.now().isoformat(),
+    SELECT
+      DISTINCT ON (id)
+      id,
+      client_user_id,
+      stylist_first_name,
+      stylist_uuid,
+      deal_percent,
+      deal_weekday,
+      salon_current_date + days_before_discount deal_date,
+      salon_timezone
+    FROM (
+       SELECT
+         *,
+         CAST(CASE WHEN deal_weekday > current_weekday
+           THEN deal_weekday - current_weekday
+         ELSE deal_weekday - current_weekday + 7
+         END AS integer) days_before_discount
+       FROM (
+          SELECT
+            cl.id id,
+            cu.id client_user_id,
+            swd.weekday deal_weekday,
+            swd.discount_percent deal_percent,
+            ST_DISTANCE(sl.location, cl.location) distance,
+            extract(
+               ISODOW FROM %(now)s AT TIME ZONE sl.timezone) current_weekday,
+            CAST(%(now)s AT TIME ZONE sl.timezone AS date) salon_current_date,
+            su.first_name stylist_first_name,
+            st.uuid stylist_uuid,
+            sl.timezone salon_timezone,
+            sad.is_available
+          FROM
+            public.client cl
+            INNER JOIN public.preferred_stylist ps ON ps.client_id = cl.id
+            INNER JOIN public.stylist st ON ps.stylist_id = st.id
+            INNER JOIN public.user cu ON cu.id = cl.user_id
+            INNER JOIN public.user su ON su.id = st.user_id
+            INNER JOIN public.salon sl ON sl.id = st.salon_id
+            LEFT OUTER JOIN public.stylist_weekday_discount swd ON swd.stylist_id = st.id
+            LEFT OUTER JOIN public.stylist_available_day sad ON sad.stylist_id = st.id AND
+                                                                sad.weekday = swd.weekday
+          WHERE
+            ps.deleted_at ISNULL AND
+            -- stylist is generally bookable
+            su.phone IS NOT NULL AND
+            EXISTS(SELECT 1
+                   FROM public.stylist_service
+                   WHERE cu.is_active IS TRUE AND stylist_service.stylist_id = st.id) AND
+            -- deal of the week is defined
+            swd.is_deal_of_week = TRUE AND
+            swd.discount_percent > 0 AND
+            -- locations of stylist and client are known
+            sl.location IS NOT NULL AND
+            cl.location IS NOT NULL AND
+            sad.is_available IS TRUE AND
+            -- no previous notification was sent in the last 24 hours
+            NOT EXISTS(SELECT 1
+                       FROM public.notification
+                       WHERE user_id = cu.id AND
+                             target = %(target)s AND
+                             code != %(code)s AND
+                             ((%(now)s AT TIME ZONE sl.timezone) - created_at) <=
+                             INTERVAL '24 hours')
+            AND
+            -- no notification of the same type was sent in the last 4 weeks
+            NOT EXISTS(SELECT 1
+                       FROM public.notification
+                       WHERE user_id = cu.id AND
+                             target = %(target)s AND
+                             code = %(code)s AND
+                             ((%(now)s AT TIME ZONE sl.timezone) - created_at) <=
+                             INTERVAL '4 weeks')
+            ) main
+       WHERE distance < %(minimum_distance_meters)s
+     ) main_with_time_diff
+    WHERE
+      days_before_discount BETWEEN 1 AND 2
+    ORDER BY
+      id, days_before_discount
+  ) deals
+      ''', params={
+            'message': message,
+            'send_time_window_start': send_time_window_start.isoformat(),
+            'send_time_window_end': send_time_window_end.isoformat(),
             'minimum_distance_meters': minimum_distance_meters,
-            'code': code,
-            'target': target
-
-        }
+        }, dry_run=dry_run
     )
-    notifications_to_create_list: List[Notification] = []
-    for client in eligible_clients_queryset:
-        salon_timezone = pytz.timezone(client.salon_timezone)
-        current_salon_date = timezone.now().astimezone(salon_timezone).date()
-        current_weekday = current_salon_date.isoweekday()
-        deal_weekday = client.deal_weekday
-        days_delta = deal_weekday - current_weekday
-        if days_delta < 0:
-            days_delta += 7
-        deal_date = current_salon_date + datetime.timedelta(days=days_delta)
-        deal_weekday_str = deal_date.strftime('%A')
-        message = message.format(
-            stylist_name=client.stylist_first_name,
-            weekday=deal_weekday_str,
-            deal_percent=client.deal_percent
-        )
-        discard_after = salon_timezone.localize(
-            datetime.datetime.combine(
-                deal_date,
-                datetime.time(0, 0)
-            )
-        )
-        notifications_to_create_list.append(
-            Notification(
-                user_id=client.client_user_id,
-                code=code,
-                target=target,
-                message=message,
-                send_time_window_start=send_time_window_start,
-                send_time_window_end=send_time_window_end,
-                send_time_window_tz=salon_timezone,
-                discard_after=discard_after,
-                data={
-                    'stylist_uuid': str(client.stylist_uuid),
-                    'deal_weekday': client.deal_weekday,
-                    'deal_date': deal_date.isoformat()
-                }
-            )
-        )
-    # if any notifications were generated - bulk created them
-    if notifications_to_create_list and not dry_run:
-        Notification.objects.bulk_create(notifications_to_create_list)
-    return len(notifications_to_create_list)
 
 
 @transaction.atomic
@@ -19,3 +19,16 @@ DEFAULT_WORKING_HOURS = {
     6: (NINE_AM, FIVE_PM, True),
     7: (NINE_AM, FIVE_PM, True)
 }
+
+# Stylist fields which affect whether and how a stylist is returned by search;
+# saving any of them invalidates cached search results around stylist's salon
+STYLIST_SEARCHABLE_FIELDS = [
+    'deactivated_at', 'salon', 'salon_id', 'website_url', 'instagram_url',
+    'instagram_access_token', 'has_business_hours_set',
+]
+
+# User fields which stylists are found by in search
+USER_SEARCHABLE_FIELDS = ['first_name', 'last_name']
+
+# StylistService fields which stylists are found by in search
+STYLIST_SERVICE_SEARCHABLE_FIELDS = ['stylist', 'stylist_id', 'name', 'is_enabled', 'deleted_at']
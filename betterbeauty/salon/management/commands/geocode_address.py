@@ -1,9 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
 from io import TextIOBase
+from typing import Callable, List, Optional, Tuple
 
 from django.core.management import BaseCommand
-from django.db import transaction
+from django.db import connection, models, transaction
 
 from client.models import Client
+from integrations.gmaps import (
+    GeoCode,
+    GeoCodedAddress,
+    GeocodeValidAddress,
+    geocoding_rate_limiter,
+    GeocodingError,
+)
 from salon.models import Salon
 
 
@@ -40,6 +49,95 @@ def geocode_client_zipcode(stdout: TextIOBase, dry_run: bool):
             client.geo_code_address()
 
 
+def geo_code_chunk(
+        objects: List[models.Model], geo_code: Callable[[models.Model], Optional[GeoCodedAddress]]
+) -> List[Tuple[models.Model, Optional[GeoCodedAddress], Optional[str]]]:
+    """
+    Geocode objects one by one in a worker thread.
+
+    :return: list of (object, geocoded address, error) tuples
+    """
+    results = []
+    try:
+        for obj in objects:
+            try:
+                results.append((obj, geo_code(obj), None))
+            except GeocodingError as e:
+                results.append((obj, None, str(e)))
+    finally:
+        # worker thread has its own DB connection (used for the geocode cache)
+        connection.close()
+    return results
+
+
+def geocode_in_batches(
+        queryset: models.QuerySet,
+        geo_code: Callable[[models.Model], Optional[GeoCodedAddress]],
+        stdout: TextIOBase, dry_run: bool, batch_size: int, concurrency: int
+) -> int:
+    """
+    Geocode objects of the queryset in batches of `batch_size`, each batch in its own
+    transaction, calling geocoding API from `concurrency` threads. Objects are taken
+    in id order and marked with last_geo_coded as they are processed, so interrupted
+    run can be resumed by simply running the command again. Objects which failed
+    with transient errors are left for the next run.
+
+    :return: number of geocoded objects
+    """
+    last_id = 0
+    processed_count = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            with transaction.atomic():
+                objects = list(queryset.filter(id__gt=last_id).order_by(
+                    'id').select_for_update(skip_locked=True)[:batch_size])
+                if not objects:
+                    break
+                last_id = objects[-1].id
+                if dry_run:
+                    stdout.write('Would geocode {0} objects up to id {1}'.format(
+                        len(objects), last_id))
+                    continue
+                chunks = [objects[i::concurrency] for i in range(concurrency)]
+                futures = [
+                    executor.submit(geo_code_chunk, chunk, geo_code) for chunk in chunks if chunk
+                ]
+                for future in futures:
+                    for obj, geo_coded_address, error in future.result():
+                        if error:
+                            stdout.write('Could not geocode {0}, will retry later: {1}'.format(
+                                obj, error))
+                            continue
+                        obj.apply_geo_coded_address(geo_coded_address)
+                        processed_count += 1
+            stdout.write('Geocoded {0} objects so far, up to id {1}'.format(
+                processed_count, last_id))
+    return processed_count
+
+
+def geocode_stylist_address_in_batches(
+        stdout: TextIOBase, dry_run: bool, batch_size: int, concurrency: int
+):
+    geocoded_count = geocode_in_batches(
+        queryset=Salon.objects.filter(last_geo_coded=None),
+        geo_code=lambda salon: GeocodeValidAddress(salon.address).geo_code(),
+        stdout=stdout, dry_run=dry_run, batch_size=batch_size, concurrency=concurrency
+    )
+    stdout.write('{0} salon addresses geocoded'.format(geocoded_count))
+
+
+def geocode_client_zipcode_in_batches(
+        stdout: TextIOBase, dry_run: bool, batch_size: int, concurrency: int
+):
+    geocoded_count = geocode_in_batches(
+        queryset=Client.objects.filter(last_geo_coded=None).exclude(
+            zip_code__isnull=True).exclude(zip_code=""),
+        geo_code=lambda client: GeoCode(client.zip_code).geo_code(country=client.country),
+        stdout=stdout, dry_run=dry_run, batch_size=batch_size, concurrency=concurrency
+    )
+    stdout.write('{0} client zipcodes geocoded'.format(geocoded_count))
+
+
 class Command(BaseCommand):
 
     def add_arguments(self, parser):
@@ -50,8 +148,50 @@ class Command(BaseCommand):
             dest='dry_run',
             help="Dry-run. Don't actually do anything.",
         )
+        parser.add_argument(
+            '-b',
+            '--batched',
+            action='store_true',
+            dest='batched',
+            help='Geocode in batches, calling geocoding API concurrently.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            dest='batch_size',
+            help='Number of addresses geocoded (and committed) at a time in batched mode.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            dest='concurrency',
+            help='Number of concurrent geocoding API requests in batched mode.',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=None,
+            dest='rate',
+            help='Maximum number of geocoding API requests per second.',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
-        geocode_stylist_address(stdout=self.stdout, dry_run=dry_run)
-        geocode_client_zipcode(stdout=self.stdout, dry_run=dry_run)
+        if options['rate']:
+            geocoding_rate_limiter.set_rate(options['rate'])
+        if not options['batched']:
+            geocode_stylist_address(stdout=self.stdout, dry_run=dry_run)
+            geocode_client_zipcode(stdout=self.stdout, dry_run=dry_run)
+            return
+        batch_size = options['batch_size']
+        concurrency = options['concurrency']
+        geocode_stylist_address_in_batches(
+            stdout=self.stdout, dry_run=dry_run, batch_size=batch_size,
+            concurrency=concurrency
+        )
+        geocode_client_zipcode_in_batches(
+            stdout=self.stdout, dry_run=dry_run, batch_size=batch_size,
+            concurrency=concurrency
+        )
@@ -11,6 +11,8 @@ from django.contrib.postgres.fields import ArrayField, DateRangeField
 from django.core.validators import MaxValueValidator
 from django.db import models, transaction
 from django.db.models import Avg, Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.utils import timezone
 
 from timezone_field import TimeZoneField
@@ -22,9 +24,17 @@ from core.choices import CLIENT_OR_STYLIST_ROLE, WEEKDAY
 from core.constants import DEFAULT_CARD_FEE, DEFAULT_TAX_RATE
 from core.models import User
 from core.types import UserRole, Weekday
-from integrations.gmaps import GeocodeValidAddress
+from integrations.gmaps import GeoCodedAddress, GeocodeValidAddress
 from .choices import INVITATION_STATUS_CHOICES
-from .contstants import DEFAULT_SERVICE_GAP_TIME_MINUTES, DEFAULT_WORKING_HOURS
+from .contstants import (
+    DEFAULT_SERVICE_GAP_TIME_MINUTES,
+    DEFAULT_WORKING_HOURS,
+    STYLIST_SEARCHABLE_FIELDS,
+    STYLIST_SERVICE_SEARCHABLE_FIELDS,
+    USER_SEARCHABLE_FIELDS,
+)
+from .search import invalidate_search_cache_for_stylist, invalidate_search_cell
+from .service_templates import invalidate_service_template_catalog
 from .types import DealOfWeekError, InvitationStatus, TimeSlot, TimeSlotAvailability
 
 logger = logging.getLogger(__name__)
@@ -66,8 +76,19 @@ class Salon(models.Model):
         # TODO: change this to proper address generation
         return self.address
 
+    def save(self, *args, **kwargs):
+        if self.pk and settings.STYLIST_SEARCH_CACHE_ENABLED:
+            # stylists of the salon disappear from the old location's search results
+            previous_location = Salon.objects.filter(
+                pk=self.pk).values_list('location', flat=True).first()
+            invalidate_search_cell(previous_location)
+        super(Salon, self).save(*args, **kwargs)
+        invalidate_search_cell(self.location)
+
     def geo_code_address(self):
-        geo_coded_address = GeocodeValidAddress(self.address).geo_code()
+        self.apply_geo_coded_address(GeocodeValidAddress(self.address).geo_code())
+
+    def apply_geo_coded_address(self, geo_coded_address: Optional[GeoCodedAddress]):
         if geo_coded_address:
             self.city = geo_coded_address.city
             self.state = geo_coded_address.state
@@ -348,6 +369,23 @@ class Stylist(models.Model):
     def __str__(self):
         return '{0} ({1})'.format(self.user.get_full_name(), self.user.phone)
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields', None)
+        previous_location = None
+        if self.pk and settings.STYLIST_SEARCH_CACHE_ENABLED and (
+            update_fields is None or {'salon', 'salon_id'} & set(update_fields)
+        ):
+            # stylist disappears from search results around the previous salon
+            previous_location = Stylist.objects.filter(
+                pk=self.pk).values_list('salon__location', flat=True).first()
+        super(Stylist, self).save(*args, **kwargs)
+        if update_fields is None or set(update_fields) & set(STYLIST_SEARCHABLE_FIELDS):
+            invalidate_search_cache_for_stylist(self)
+            if previous_location and previous_location != getattr(
+                    self.salon, 'location', None
+            ):
+                invalidate_search_cell(previous_location)
+
     @property
     def phone(self) -> Optional[str]:
         return self.user.phone
@@ -378,6 +416,9 @@ class Stylist(models.Model):
     @property
     def has_services_set(self):
         """Return True if at least one service exists and enabled"""
+        # may be annotated, see api.v1.common.views.CommonStylistDetailView
+        if hasattr(self, 'has_enabled_services'):
+            return self.has_enabled_services
         return self.services.filter(
             is_enabled=True, deleted_at__isnull=True
         ).exists()
@@ -396,6 +437,8 @@ class Stylist(models.Model):
 
     @property
     def has_deal_of_week_set(self):
+        if hasattr(self, 'has_deal_of_week_discount'):
+            return self.has_deal_of_week_discount
         return self.weekday_discounts.filter(
             is_deal_of_week=True
         ).exists()
@@ -511,6 +554,28 @@ class Stylist(models.Model):
             "is_available": is_available
         })[0]
 
+    def get_weekday_availability_with_defaults(self) -> List[StylistAvailableWeekDay]:
+        """
+        Return availability of every weekday from Monday to Sunday. Weekdays which
+        stylist hasn't set up yet get default (unsaved) availability, so that unlike
+        `get_or_create_weekday_availability` nothing is written to the DB. Reads
+        `available_days` with `all()`, so it may be prefetched
+        """
+        available_days = {
+            available_day.weekday: available_day for available_day in self.available_days.all()
+        }
+        weekday_availability: List[StylistAvailableWeekDay] = []
+        for weekday in range(1, 8):
+            available_day = available_days.get(weekday, None)
+            if available_day is None:
+                start, end, is_available = DEFAULT_WORKING_HOURS[weekday]
+                available_day = StylistAvailableWeekDay(
+                    stylist=self, weekday=weekday, work_start_at=start, work_end_at=end,
+                    is_available=is_available
+                )
+            weekday_availability.append(available_day)
+        return weekday_availability
+
     def get_or_create_weekday_discount(
             self, weekday: Weekday
     ) -> StylistWeekdayDiscount:
@@ -699,10 +764,14 @@ class Stylist(models.Model):
         ])
 
     def get_rating_percentage(self) -> Optional[int]:
-        appointments = self.appointments.filter(
-            rating__isnull=False,).aggregate(avg_rating=Avg('rating'))
-        if (appointments['avg_rating']):
-            return round(appointments['avg_rating'] * 100)
+        # may be annotated, see api.v1.common.views.CommonStylistDetailView
+        if hasattr(self, 'avg_rating'):
+            avg_rating = self.avg_rating
+        else:
+            avg_rating = self.appointments.filter(
+                rating__isnull=False,).aggregate(avg_rating=Avg('rating'))['avg_rating']
+        if (avg_rating):
+            return round(avg_rating * 100)
         else:
             return None
 
@@ -719,7 +788,20 @@ class Stylist(models.Model):
         return 0
 
 
-class ServiceCategory(models.Model):
+class ServiceTemplateCatalogModelMixin(object):
+    """Invalidates service template catalog snapshots when the row changes"""
+
+    def save(self, *args, **kwargs):
+        super(ServiceTemplateCatalogModelMixin, self).save(*args, **kwargs)
+        invalidate_service_template_catalog()
+
+    def delete(self, *args, **kwargs):
+        result = super(ServiceTemplateCatalogModelMixin, self).delete(*args, **kwargs)
+        invalidate_service_template_catalog()
+        return result
+
+
+class ServiceCategory(ServiceTemplateCatalogModelMixin, models.Model):
     name = models.CharField(max_length=255, unique=True)
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     category_code = models.CharField(max_length=25, blank=True, null=True)
@@ -732,7 +814,7 @@ class ServiceCategory(models.Model):
         return self.name
 
 
-class ServiceTemplateSet(models.Model):
+class ServiceTemplateSet(ServiceTemplateCatalogModelMixin, models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     name = models.CharField(max_length=255, unique=True)
     image = models.ImageField(upload_to='template_set_images', null=True, blank=True)
@@ -756,7 +838,7 @@ class ServiceTemplateSet(models.Model):
         return None
 
 
-class ServiceTemplate(models.Model):
+class ServiceTemplate(ServiceTemplateCatalogModelMixin, models.Model):
     """Base service template; StylistService object will be copied from this one"""
     category = models.ForeignKey(
         ServiceCategory, on_delete=models.PROTECT, related_name='templates'
@@ -863,3 +945,64 @@ class Invitation(models.Model):
             raise ValidationError({
                 NON_FIELD_ERRORS: ['Only stylist or client only should be linked', ],
             })
+
+
+@receiver(post_save, sender=User)
+def invalidate_search_cache_on_user_save(sender, instance: User, update_fields=None, **kwargs):
+    """Stylists are found by user's name, so name changes invalidate search results"""
+    if not settings.STYLIST_SEARCH_CACHE_ENABLED or not instance.role or \
+            not instance.is_stylist():
+        return
+    if update_fields is not None and not set(update_fields) & set(USER_SEARCHABLE_FIELDS):
+        return
+    stylist = Stylist.objects.filter(user=instance).select_related('salon').first()
+    if stylist:
+        invalidate_search_cache_for_stylist(stylist)
+
+
+@receiver(post_save, sender=StylistService)
+def invalidate_search_cache_on_service_save(
+        sender, instance: StylistService, update_fields=None, **kwargs
+):
+    """Stylists are found by names of their enabled services"""
+    if update_fields is not None and not (
+        set(update_fields) & set(STYLIST_SERVICE_SEARCHABLE_FIELDS)
+    ):
+        return
+    invalidate_search_cache_for_stylist(instance.stylist)
+
+
+@receiver(post_delete, sender=StylistService)
+def invalidate_search_cache_on_service_delete(sender, instance: StylistService, **kwargs):
+    invalidate_search_cache_for_stylist(instance.stylist)
+
+
+@receiver(post_save, sender=Speciality)
+@receiver(pre_delete, sender=Speciality)
+def invalidate_search_cache_on_speciality_change(sender, instance: Speciality, **kwargs):
+    """
+    Stylists are found by names of their specialities. On deletion stylists of
+    the speciality are only known before it's deleted
+    """
+    if not settings.STYLIST_SEARCH_CACHE_ENABLED:
+        return
+    for stylist in instance.stylist_set.select_related('salon'):
+        invalidate_search_cache_for_stylist(stylist)
+
+
+@receiver(m2m_changed, sender=Stylist.specialities.through)
+def invalidate_search_cache_on_specialities_change(
+        sender, instance, action: str, reverse: bool, pk_set=None, **kwargs
+):
+    # stylists of a cleared speciality are only known before clearing
+    if action not in ['post_add', 'post_remove', 'pre_clear']:
+        return
+    if not reverse:
+        invalidate_search_cache_for_stylist(instance)
+        return
+    if not settings.STYLIST_SEARCH_CACHE_ENABLED:
+        return
+    stylists = instance.stylist_set.all() if action == 'pre_clear' else Stylist.objects.filter(
+        pk__in=pk_set)
+    for stylist in stylists.select_related('salon'):
+        invalidate_search_cache_for_stylist(stylist)
@@ -0,0 +1,115 @@
+import hashlib
+import logging
+from typing import List, Optional
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.cache import caches
+from django.db import transaction
+
+from core.utils.cache import bump_cache_version, get_cache_version, LRUCache
+from core.utils.geohash import encode_geohash, get_geohash_cells_around
+
+logger = logging.getLogger(__name__)
+
+# Per-process tier of the stylist search cache. It only holds ranked stylist id
+# lists; cell versions are always read from the shared tier, so that version bumps
+# made by other processes are honored immediately
+_local_search_cache = LRUCache(
+    max_size=settings.STYLIST_SEARCH_CACHE_LOCAL_MAX_SIZE,
+    ttl=settings.STYLIST_SEARCH_CACHE_TTL_SECONDS
+)
+
+
+def get_shared_search_cache():
+    return caches[settings.STYLIST_SEARCH_CACHE_ALIAS]
+
+
+def normalize_search_term(term: Optional[str]) -> str:
+    """Lowercase the term and collapse all whitespace, so that equal queries share a key"""
+    return ' '.join((term or '').lower().split())
+
+
+def get_search_cell(location: Point) -> str:
+    """Return geohash of the cell (of configured precision) containing the location"""
+    return encode_geohash(
+        latitude=location.y, longitude=location.x,
+        precision=settings.STYLIST_SEARCH_CACHE_GEOHASH_PRECISION
+    )
+
+
+def get_cell_version_key(cell: str) -> str:
+    return 'stylist-search:cell-version:{0}'.format(cell)
+
+
+def get_cell_version(cell: str) -> int:
+    return get_cache_version(get_shared_search_cache(), get_cell_version_key(cell))
+
+
+def build_search_cache_key(
+        query: str, address_query: str, location: Point, country: str
+) -> str:
+    cell = get_search_cell(location)
+    terms_hash = hashlib.sha1('{0}|{1}'.format(
+        normalize_search_term(query), normalize_search_term(address_query)
+    ).encode('utf-8')).hexdigest()
+    return 'stylist-search:{cell}:{version}:{country}:{terms_hash}'.format(
+        cell=cell, version=get_cell_version(cell),
+        country=normalize_search_term(country), terms_hash=terms_hash
+    )
+
+
+def get_cached_stylist_ids(cache_key: str) -> Optional[List[int]]:
+    """Return ranked list of stylist ids from the local, then from the shared tier"""
+    stylist_ids = _local_search_cache.get(cache_key, None)
+    if stylist_ids is not None:
+        return stylist_ids
+    stylist_ids = get_shared_search_cache().get(cache_key)
+    if stylist_ids is not None:
+        _local_search_cache.set(cache_key, stylist_ids)
+    return stylist_ids
+
+
+def cache_stylist_ids(cache_key: str, stylist_ids: List[int]):
+    _local_search_cache.set(cache_key, stylist_ids)
+    get_shared_search_cache().set(
+        cache_key, stylist_ids, timeout=settings.STYLIST_SEARCH_CACHE_TTL_SECONDS
+    )
+
+
+def invalidate_search_cell(location: Optional[Point]):
+    """
+    Bump versions of the cell containing the location and of the cells around it,
+    so that all search results cached for them are ignored from now on. Searches
+    are not bounded by radius, so results of farther cells may still include the
+    location; these are only refreshed by TTL. Bump happens after the current
+    transaction commits, otherwise a concurrent search could re-cache stale results
+    """
+    if not settings.STYLIST_SEARCH_CACHE_ENABLED or location is None:
+        return
+    cells = get_geohash_cells_around(
+        latitude=location.y, longitude=location.x,
+        precision=settings.STYLIST_SEARCH_CACHE_GEOHASH_PRECISION
+    )
+
+    def bump_cell_versions():
+        shared_cache = get_shared_search_cache()
+        for cell in cells:
+            bump_cache_version(shared_cache, get_cell_version_key(cell))
+        logger.debug('Stylist search cache invalidated for cells {0}'.format(
+            ', '.join(cells)))
+
+    transaction.on_commit(bump_cell_versions)
+
+
+def invalidate_search_cache_for_stylist(stylist):
+    """Invalidate cached search results around stylist's salon"""
+    if not settings.STYLIST_SEARCH_CACHE_ENABLED:
+        return
+    salon = stylist.salon
+    if salon:
+        invalidate_search_cell(salon.location)
+
+
+def clear_local_search_cache():
+    _local_search_cache.clear()
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from core.utils.cache import bump_cache_version, get_cache_version
+
+SERVICE_TEMPLATE_CATALOG_VERSION_KEY = 'service-template-catalog:version'
+
+
+def get_service_template_catalog_version() -> int:
+    """
+    Return current version of service template catalog (i.e. of service template
+    sets, templates and categories). Version is bumped whenever any of these rows
+    change, so that catalog snapshots built from an older version are rebuilt
+    """
+    return get_cache_version(
+        caches[settings.SERVICE_TEMPLATE_CATALOG_CACHE_ALIAS],
+        SERVICE_TEMPLATE_CATALOG_VERSION_KEY
+    )
+
+
+def invalidate_service_template_catalog():
+    """Bump catalog version after the current transaction commits"""
+    transaction.on_commit(lambda: bump_cache_version(
+        caches[settings.SERVICE_TEMPLATE_CATALOG_CACHE_ALIAS],
+        SERVICE_TEMPLATE_CATALOG_VERSION_KEY
+    ))
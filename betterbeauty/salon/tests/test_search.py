@@ -0,0 +1,117 @@
+import pytest
+
+from django.contrib.gis.geos import Point
+from django.test import override_settings
+from django_dynamic_fixture import G
+
+from core.models import User
+from core.types import UserRole
+from salon.models import Salon, Speciality, Stylist, StylistService
+
+from salon.search import (
+    build_search_cache_key,
+    cache_stylist_ids,
+    clear_local_search_cache,
+    get_cached_stylist_ids,
+    get_search_cell,
+    get_shared_search_cache,
+    invalidate_search_cell,
+)
+
+LOCATION = Point(-122.1185007, 37.4009997, srid=4326)
+NEARBY_LOCATION = Point(-122.1186007, 37.4010997, srid=4326)
+FAR_LOCATION = Point(-74.0060, 40.7128, srid=4326)
+
+
+@pytest.fixture
+def search_cache():
+    clear_local_search_cache()
+    get_shared_search_cache().clear()
+    with override_settings(STYLIST_SEARCH_CACHE_ENABLED=True):
+        yield
+    clear_local_search_cache()
+    get_shared_search_cache().clear()
+
+
+class TestBuildSearchCacheKey(object):
+    def test_normalization(self, search_cache):
+        assert(
+            build_search_cache_key('Fred  McBob', 'Los Altos', LOCATION, 'US') ==
+            build_search_cache_key(' fred mcbob ', 'los altos', NEARBY_LOCATION, 'us')
+        )
+        assert(
+            build_search_cache_key('fred', '', LOCATION, 'US') !=
+            build_search_cache_key('', 'fred', LOCATION, 'US')
+        )
+        assert(
+            build_search_cache_key('fred', '', LOCATION, 'US') !=
+            build_search_cache_key('fred', '', LOCATION, 'CA')
+        )
+        assert(
+            build_search_cache_key('fred', '', LOCATION, 'US') !=
+            build_search_cache_key('fred', '', FAR_LOCATION, 'US')
+        )
+
+    def test_key_contains_cell(self, search_cache):
+        key = build_search_cache_key('', '', LOCATION, 'US')
+        assert(get_search_cell(LOCATION) in key)
+
+
+class TestCachedStylistIds(object):
+    def test_local_and_shared_tiers(self, search_cache):
+        key = build_search_cache_key('fred', '', LOCATION, 'US')
+        assert(get_cached_stylist_ids(key) is None)
+        cache_stylist_ids(key, [3, 1, 2])
+        assert(get_cached_stylist_ids(key) == [3, 1, 2])
+        # e.g. another process: local tier is empty, value comes from shared tier
+        clear_local_search_cache()
+        assert(get_cached_stylist_ids(key) == [3, 1, 2])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalidate_search_cell(self, search_cache):
+        key = build_search_cache_key('fred', '', LOCATION, 'US')
+        far_key = build_search_cache_key('fred', '', FAR_LOCATION, 'US')
+        cache_stylist_ids(key, [1])
+        cache_stylist_ids(far_key, [2])
+        invalidate_search_cell(NEARBY_LOCATION)
+        new_key = build_search_cache_key('fred', '', LOCATION, 'US')
+        assert(new_key != key)
+        assert(get_cached_stylist_ids(new_key) is None)
+        assert(build_search_cache_key('fred', '', FAR_LOCATION, 'US') == far_key)
+        assert(get_cached_stylist_ids(far_key) == [2])
+
+
+class TestSearchCacheInvalidation(object):
+    @pytest.mark.django_db(transaction=True)
+    def test_invalidated_by_searchable_changes(self, search_cache):
+        salon = G(Salon, location=LOCATION)
+        far_salon = G(Salon, location=FAR_LOCATION)
+        stylist = G(Stylist, salon=salon, user=G(User, role=[UserRole.STYLIST]))
+        speciality = G(Speciality, name='curls')
+
+        def assert_invalidated(change, location=LOCATION):
+            key = build_search_cache_key('fred', '', location, 'US')
+            change()
+            assert(build_search_cache_key('fred', '', location, 'US') != key)
+
+        assert_invalidated(lambda: User.objects.get(pk=stylist.user_id).save(
+            update_fields=['first_name']))
+        service = G(StylistService, stylist=stylist, name='Haircut')
+        assert_invalidated(lambda: service.save(update_fields=['name']))
+        assert_invalidated(service.delete)
+        assert_invalidated(lambda: stylist.specialities.add(speciality))
+        assert_invalidated(lambda: speciality.save())
+        assert_invalidated(lambda: speciality.stylist_set.clear())
+
+        # moving to another salon invalidates both old and new salon's cells
+        key = build_search_cache_key('fred', '', LOCATION, 'US')
+        far_key = build_search_cache_key('fred', '', FAR_LOCATION, 'US')
+        stylist.salon = far_salon
+        stylist.save(update_fields=['salon'])
+        assert(build_search_cache_key('fred', '', LOCATION, 'US') != key)
+        assert(build_search_cache_key('fred', '', FAR_LOCATION, 'US') != far_key)
+
+        # unrelated changes keep cached results
+        key = build_search_cache_key('fred', '', FAR_LOCATION, 'US')
+        User.objects.get(pk=stylist.user_id).save(update_fields=['last_login'])
+        assert(build_search_cache_key('fred', '', FAR_LOCATION, 'US') == key)
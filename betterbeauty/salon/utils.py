@@ -1,5 +1,6 @@
 import datetime
 import uuid
+from collections import defaultdict
 from decimal import Decimal, ROUND_HALF_UP
 from itertools import compress
 from typing import Dict, Iterable, List, Optional, Tuple
@@ -32,6 +33,7 @@ from pricing.constants import COMPLETELY_BOOKED_DEMAND, PRICE_BLOCK_SIZE
 from salon.models import (
     Invitation,
     Salon,
+    ServiceCategory,
     Stylist,
     StylistAvailableWeekDay,
     StylistService,
@@ -183,6 +185,53 @@ def get_last_appointment_for_client(
     return last_appointment
 
 
+def annotate_clients_with_booking_count(
+        clients: models.QuerySet, stylist: Stylist
+) -> models.QuerySet:
+    """
+    Annotate clients with `booking_count`, i.e. number of their appointments with
+    the stylist which were neither cancelled nor marked as no-show. Appointments
+    are joined directly, so soft-deleted ones are excluded explicitly.
+    """
+    return clients.annotate(booking_count=models.Count('appointment', filter=models.Q(
+        appointment__stylist=stylist, appointment__deleted_at__isnull=True
+    ) & ~models.Q(appointment__status__in=[
+        AppointmentStatus.NO_SHOW,
+        AppointmentStatus.CANCELLED_BY_CLIENT,
+        AppointmentStatus.CANCELLED_BY_STYLIST
+    ])))
+
+
+def annotate_clients_with_last_visit(
+        clients: models.QuerySet, stylist: Stylist
+) -> models.QuerySet:
+    """
+    Annotate clients with `last_visit_datetime` of their last checked out appointment
+    with the stylist (see `get_last_appointment_for_client`), and prefetch that
+    appointment with its services into `last_appointments` list, which is empty
+    for clients who have not visited the stylist yet
+    """
+    now = timezone.now()
+
+    def last_appointment_of(client_ref: models.OuterRef) -> models.QuerySet:
+        return Appointment.objects.filter(
+            status__in=[AppointmentStatus.CHECKED_OUT],
+            stylist=stylist,
+            client=client_ref,
+            datetime_start_at__lte=now
+        ).order_by('-datetime_start_at', '-id')
+
+    return clients.annotate(last_visit_datetime=models.Subquery(
+        last_appointment_of(models.OuterRef('pk')).values('datetime_start_at')[:1]
+    )).prefetch_related(models.Prefetch(
+        'appointments',
+        queryset=Appointment.objects.filter(id=models.Subquery(
+            last_appointment_of(models.OuterRef('client_id')).values('id')[:1]
+        )).prefetch_related('services'),
+        to_attr='last_appointments'
+    ))
+
+
 def get_last_visit_date_for_client(
         stylist: Stylist, client: Client
 ) -> Optional[datetime.date]:
@@ -324,25 +373,54 @@ def calculate_price_and_discount_for_client_on_date(
     :param date: Date on which service will happen
     :return:
     """
+    return calculate_prices_and_discounts_for_client_on_date(
+        stylist=service.stylist, services=[service, ], client=client, date=date
+    )[0]
 
-    price_on_dates: Iterable[PriceOnDate] = (
-        generate_prices_for_stylist_service(
-            services=[service, ], client=client,
-            exclude_fully_booked=False,
-            exclude_unavailable_days=False
-        ))
 
-    prices: Dict[datetime.date, CalculatedPrice] = dict(
-        (m.date, m.calculated_price) for m in price_on_dates)
+def calculate_prices_and_discounts_for_client_on_date(
+        stylist: Stylist, services: List[StylistService], client: Optional[Client],
+        date: datetime.date
+) -> List[CalculatedPrice]:
+    """
+    Calculate client's price and discount for each of the stylist's services on the
+    given date. Demand, discount settings and client's last visit are loaded once
+    for all the services
+    :param stylist: Stylist whose services are priced
+    :param services: Services to calculate prices for
+    :param client: Client for whom prices are calculated
+    :param date: Date on which services will happen
+    :return: list of prices in the order of services
+    """
+    today = stylist.get_current_now().date()
+    day_index = (date - today).days
+    if not services or not 0 <= day_index < PRICE_BLOCK_SIZE:
+        # Return base prices if day is not within pricing block, i.e. does not
+        # appear to be available for booking
+        return [
+            CalculatedPrice.build(
+                price=float(Decimal(service.regular_price).quantize(0, ROUND_HALF_UP)),
+                applied_discount=None, discount_percentage=0
+            ) for service in services
+        ]
 
-    if date in prices:
-        return prices[date]
-    # Return base price if day does not appear to be available for booking
-    calculated_price = CalculatedPrice.build(
-        price=float(Decimal(service.regular_price).quantize(0, ROUND_HALF_UP)),
-        applied_discount=None, discount_percentage=0
-    )
-    return calculated_price
+    last_visit_date = get_last_visit_date_for_client(
+        stylist, client
+    ) if client else None
+    dates_list = [today + datetime.timedelta(days=i) for i in range(0, PRICE_BLOCK_SIZE)]
+    demand_list = [
+        x.demand for x in generate_demand_list_for_stylist(stylist=stylist, dates=dates_list)
+    ]
+    discounts = generate_discount_settings_for_stylist(stylist)
+    return [
+        calc_client_prices(
+            stylist.salon.timezone,
+            discounts,
+            last_visit_date,
+            [float(service.regular_price)],
+            demand_list
+        )[day_index] for service in services
+    ]
 
 
 def create_stylist_profile_for_user(user: User, **kwargs) -> Stylist:
@@ -399,6 +477,28 @@ def get_most_popular_service(stylist: Stylist) -> Optional[StylistService]:
     return None
 
 
+def get_stylist_services_grouped_by_category(
+        stylist: Stylist
+) -> Tuple[List[ServiceCategory], Dict[int, List[StylistService]]]:
+    """
+    Load all service categories and all stylist's services with their photo samples
+    in 3 queries.
+
+    :return: tuple of categories (in API output order), and of stylist's services
+      grouped by category id, most expensive first
+    """
+    categories = list(ServiceCategory.objects.all().order_by(
+        '-weight', 'name', 'uuid'
+    ).distinct('weight', 'name', 'uuid'))
+    services = stylist.services.select_related('category').prefetch_related(
+        'photo_samples'
+    ).order_by('-regular_price')
+    services_by_category: Dict[int, List[StylistService]] = defaultdict(list)
+    for service in services:
+        services_by_category[service.category_id].append(service)
+    return categories, services_by_category
+
+
 def get_default_service_uuids(
         stylist: Stylist, client: Optional[Client]
 ) -> List[uuid.UUID]: